@@ -1,18 +1,58 @@
+import asyncio
 import os
-import shutil
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status, UploadFile, File, Form
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import delete, select
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 import logging
-from io import BytesIO
+from datetime import datetime
+from functools import partial
 
-from app.core.database import get_db
+from app.core.background import run_in_background
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
 from app.core.sentry import add_breadcrumb, capture_message_with_context, capture_custom_error
 from app.models.user import User
-from app.models.product import Product
-from app.schemas.product import ProductCreateRequest, ProductUpdateRequest, ProductResponse, ClickTrackingResponse, ErrorResponse
+from app.models.product import Product, generate_product_id
+from app.schemas.product import (
+    ProductCreateRequest,
+    ProductUpdateRequest,
+    ProductResponse,
+    ClickTrackingResponse,
+    ProductClicksResponse,
+    BulkImportResponse,
+    BulkProductUpdateRequest,
+    BulkUpdateResponse,
+    BulkDeleteRequest,
+    BulkDeleteResponse,
+    ErrorResponse,
+)
 from app.api.deps import get_current_user
+from app.services.image_blobs import release_image_urls, store_image_blob
+from app.services.image_storage import MAX_PRODUCT_IMAGE_BYTES, ensure_upload_size, s3_key_from_url
+from app.services.image_variants import drop_slot_variants, schedule_image_variants, variant_urls
+from app.services.click_analytics import click_series_range, get_click_series
+from app.services.click_counter import flush_product_clicks, get_click_aggregator
 from app.services.s3_manager import get_s3_manager
+from app.services.product_bulk import (
+    BULK_MAX_BYTES,
+    bulk_update_products,
+    insert_products,
+    parse_product_rows,
+    validate_product_rows,
+)
+from app.services.product_fields import IMAGE_URL_COLUMNS, PRODUCT_FIELDS, parse_fields, product_projection
+from app.services.product_listing import (
+    DEFAULT_LIST_SIZE,
+    MAX_LIST_SIZE,
+    count_vendor_products,
+    list_vendor_products,
+    vendor_products_query,
+)
+from app.services.storefront import DEFAULT_SORT, STOREFRONT_SORTS, decode_storefront_cursor, refresh_storefront
+from app.services.streaming import NDJSON_MEDIA_TYPE, iter_rows, stream_ndjson, wants_ndjson
 
 router = APIRouter()
 
@@ -21,27 +61,16 @@ UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
-async def save_uploaded_file(file: UploadFile, product_id: str) -> str:
-    """Save uploaded file and return URL path"""
-    if file and file.filename:
-        # Ensure the upload directory exists
-        os.makedirs(UPLOAD_DIR, exist_ok=True)
-        
-        # Generate filename with product ID to avoid conflicts
-        file_extension = os.path.splitext(file.filename)[1]
-        filename = f"{product_id}{file_extension}"
-        file_path = os.path.join(UPLOAD_DIR, filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Construct full URL for production or relative path for development
-        from app.core.config import settings
-        if settings.BASE_URL:
-            return f"{settings.BASE_URL}/uploads/{filename}"
-        else:
-            return f"/uploads/{filename}"
-    return None
+async def store_product_image(
+    image: UploadFile,
+    s3_manager,
+    upload_limit: asyncio.Semaphore
+) -> str:
+    """Store one product image (S3 first, falling back to local storage); returns its URL"""
+    async with upload_limit:
+        # Identical bytes already stored are reused without uploading again
+        image.file.seek(0)
+        return await store_image_blob(image.file, image.filename, image.content_type, s3_manager)
 
 
 @router.post(
@@ -54,6 +83,7 @@ async def save_uploaded_file(file: UploadFile, product_id: str) -> str:
     }
 )
 async def create_product(
+    background_tasks: BackgroundTasks,
     name: str = Form(...),
     price: float = Form(...),
     description: Optional[str] = Form(None),
@@ -78,6 +108,9 @@ async def create_product(
     - **image_3**: Third product image file (optional)
     - **image_4**: Fourth product image file (optional)
     - **image_5**: Fifth product image file (optional)
+    
+    Resized variants of the images are generated after the response and
+    appear in `image_variants` once ready.
     """
     # Add breadcrumb for product creation attempt
     add_breadcrumb(
@@ -106,58 +139,48 @@ async def create_product(
             detail="Price must be greater than 0"
         )
     
-    # Create product
-    new_product = Product(
-        name=name,
-        description=description,
-        price=price,
-        is_available=is_available,
-        user_id=current_user.id
-    )
+    # Store the images first so the product is inserted with one commit
+    product_id = generate_product_id()
+    images = [image_1, image_2, image_3, image_4, image_5]
+    image_slots = [i for i, image in enumerate(images, 1) if image and image.filename]
+    for i in image_slots:
+        ensure_upload_size(images[i - 1], MAX_PRODUCT_IMAGE_BYTES)
+    upload_limit = asyncio.Semaphore(max(1, settings.IMAGE_UPLOAD_CONCURRENCY))
+    s3_manager = get_s3_manager()
+    
+    results = await asyncio.gather(*(
+        store_product_image(images[i - 1], s3_manager, upload_limit)
+        for i in image_slots
+    ), return_exceptions=True)
+    image_urls = {
+        f'image_url_{i}': url for i, url in zip(image_slots, results) if not isinstance(url, BaseException)
+    }
     
     try:
+        failed = next((result for result in results if isinstance(result, BaseException)), None)
+        if failed is not None:
+            raise failed
+        
+        # Create product
+        new_product = Product(
+            id=product_id,
+            name=name,
+            description=description,
+            price=price,
+            is_available=is_available,
+            user_id=current_user.id,
+            **image_urls
+        )
         db.add(new_product)
         db.commit()
         db.refresh(new_product)
         
-        # Handle multiple image uploads
-        images = [image_1, image_2, image_3, image_4, image_5]
-        s3_manager = get_s3_manager()
+        refresh_storefront(db, current_user.id)
         
-        for i, image in enumerate(images, 1):
-            if image and image.filename:
-                # Try S3 upload first if configured
-                if s3_manager.is_s3_configured():
-                    try:
-                        # Read file content
-                        file_content = await image.read()
-                        file_like = BytesIO(file_content)
-                        
-                        # Upload to S3
-                        upload_result = await s3_manager.upload_product_image(
-                            file_content=file_like,
-                            filename=image.filename,
-                            product_id=new_product.id,
-                            content_type=image.content_type
-                        )
-                        
-                        # Save S3 URL to database
-                        setattr(new_product, f'image_url_{i}', upload_result["url"])
-                        logging.info(f"Uploaded image {i} to S3 for product {new_product.id}")
-                    except Exception as e:
-                        logging.error(f"S3 upload failed, falling back to local: {str(e)}")
-                        # Reset file pointer and fall back to local storage
-                        image.file.seek(0)
-                        image_url = await save_uploaded_file(image, f"{new_product.id}_img{i}")
-                        setattr(new_product, f'image_url_{i}', image_url)
-                else:
-                    # Use local storage
-                    image_url = await save_uploaded_file(image, f"{new_product.id}_img{i}")
-                    setattr(new_product, f'image_url_{i}', image_url)
-        
-        if any(image and image.filename for image in images):
-            db.commit()
-            db.refresh(new_product)
+        for i in image_slots:
+            await schedule_image_variants(
+                background_tasks, product_id, i, image_urls.get(f'image_url_{i}'), images[i - 1]
+            )
         
         # Log successful product creation
         logging.info(f"Product created successfully: {new_product.id} by user {current_user.id}")
@@ -189,6 +212,10 @@ async def create_product(
         db.rollback()
         logging.error(f"Failed to create product for user {current_user.id}: {str(e)}")
         
+        # Do not leave images behind for a product that was never saved
+        if image_urls and not db.query(Product.id).filter(Product.id == product_id).first():
+            await asyncio.to_thread(release_image_urls, image_urls.values())
+        
         # Capture error with context
         capture_custom_error(e, {
             "operation": "create_product",
@@ -203,24 +230,203 @@ async def create_product(
         )
 
 
+@router.post(
+    "/bulk",
+    response_model=BulkImportResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Unreadable body or too many rows"},
+        401: {"model": ErrorResponse, "description": "Authentication required"},
+        413: {"model": ErrorResponse, "description": "Body too large"}
+    }
+)
+async def bulk_import_products(
+    request: Request,
+    atomic: bool = Query(False, description="Import nothing if any row is invalid"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create many products from a CSV or JSON body.
+    
+    Send `Content-Type: text/csv` with a header row (name, price,
+    description, is_available) or `application/json` with a list of
+    `ProductCreateRequest` objects. Up to 5000 rows are accepted.
+    
+    Each row is validated on its own. Valid rows are inserted in one
+    transaction and invalid ones are reported by row number (1 = first data
+    row). With **atomic** nothing is inserted if any row is invalid.
+    Images can be added afterwards with the upload endpoints.
+    """
+    body = await request.body()
+    if len(body) > BULK_MAX_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Body must be at most {BULK_MAX_BYTES // (1024 * 1024)}MB"
+        )
+    
+    try:
+        rows = parse_product_rows(body, request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    products, errors = validate_product_rows(rows)
+    if atomic and errors:
+        products = []
+    
+    product_ids = []
+    if products:
+        try:
+            product_ids = insert_products(db, current_user.id, products)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logging.error(f"Bulk import failed for user {current_user.id}: {str(e)}")
+            capture_custom_error(e, {
+                "operation": "bulk_import_products",
+                "user_id": str(current_user.id),
+                "rows": len(products)
+            })
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Failed to import products"
+            )
+        
+        refresh_storefront(db, current_user.id)
+        logging.info(f"Bulk imported {len(product_ids)} products for user {current_user.id}")
+    
+    return BulkImportResponse(created=len(product_ids), product_ids=product_ids, errors=errors)
+
+
+@router.patch(
+    "/bulk",
+    response_model=BulkUpdateResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Update failed"},
+        401: {"model": ErrorResponse, "description": "Authentication required"}
+    }
+)
+async def bulk_update(
+    update_request: BulkProductUpdateRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Apply one change to all of the authenticated user's products matching a filter.
+    
+    - **filter**: Any of product_ids, is_available, min_price, max_price
+      (all products if empty)
+    - **set**: is_available, and either a new price or a price_multiplier
+      (e.g. 1.1 for +10%, rounded to 2 decimals)
+    
+    Runs as a single UPDATE statement.
+    """
+    product_filter = update_request.filter
+    changes = update_request.set
+    
+    try:
+        updated = bulk_update_products(
+            db, current_user.id,
+            product_ids=product_filter.product_ids,
+            where_available=product_filter.is_available,
+            min_price=product_filter.min_price,
+            max_price=product_filter.max_price,
+            is_available=changes.is_available,
+            price=changes.price,
+            price_multiplier=changes.price_multiplier
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Bulk update failed for user {current_user.id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to update products"
+        )
+    
+    if updated:
+        refresh_storefront(db, current_user.id)
+    
+    return BulkUpdateResponse(updated=updated)
+
+
 @router.get(
     "/",
     response_model=List[ProductResponse],
     responses={
+        400: {"model": ErrorResponse, "description": "Unknown fields or invalid cursor"},
         401: {"model": ErrorResponse, "description": "Authentication required"}
     }
 )
 async def get_my_products(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIST_SIZE, description="Products per page (default 50 once paginating)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    sort: str = Query(DEFAULT_SORT, pattern="^(" + "|".join(STOREFRONT_SORTS) + ")$", description="Sort order"),
+    is_available: Optional[bool] = Query(None, description="Only products with this availability"),
+    include_total: bool = Query(False, description="Return the number of matching products in X-Total-Count"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,price,image_urls"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Get all products owned by the authenticated user.
+    Get products owned by the authenticated user, one page at a time.
+    
+    Without `limit` or `cursor` every product is returned in one response,
+    as before pagination was added; pass `limit` to page through them.
     
-    Returns a list of all products created by the current user.
+    - **limit**: Page size (default 50 when only a cursor is given, max 200)
+    - **cursor**: Value of the `X-Next-Cursor` header from the previous page;
+      the header is absent on the last page
+    - **sort**: newest (default), price_asc, price_desc or popular (clicks)
+    - **is_available**: Only available (true) or unavailable (false) products
+    - **include_total**: Also count all matching products (`X-Total-Count`)
+    - **fields**: Optional comma-separated subset of `ProductResponse` fields;
+      only these columns are loaded and returned
+    
+    With `Accept: application/x-ndjson` all matching products (after the
+    cursor) are streamed one per line instead of a single page.
     """
-    products = db.query(Product).filter(Product.user_id == current_user.id).all()
-    return [ProductResponse.from_db_model(product) for product in products]
+    try:
+        product_fields = parse_fields(fields, PRODUCT_FIELDS)
+        cursor_values = decode_storefront_cursor(cursor, sort) if cursor else None
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    columns, build = product_projection(product_fields or list(PRODUCT_FIELDS))
+    
+    if wants_ndjson(request):
+        stmt = vendor_products_query(db, current_user.id, columns, sort, is_available, cursor_values)
+        return StreamingResponse(
+            stream_ndjson(SessionLocal, lambda session: (build(row[:-1]) for row in iter_rows(session, stmt))),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"Vary": "Accept"}
+        )
+    
+    if limit is None and cursor is not None:
+        limit = DEFAULT_LIST_SIZE
+    rows, next_cursor = list_vendor_products(
+        db, current_user.id, columns, limit, sort, is_available, cursor_values
+    )
+    
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if include_total:
+        headers["X-Total-Count"] = str(count_vendor_products(db, current_user.id, is_available))
+    
+    products = [build(row) for row in rows]
+    if product_fields is not None:
+        return JSONResponse(content=jsonable_encoder(products), headers=headers)
+    
+    response.headers.update(headers)
+    return products
 
 
 @router.put(
@@ -234,6 +440,7 @@ async def get_my_products(
 )
 async def update_product(
     product_id: str,
+    background_tasks: BackgroundTasks,
     name: Optional[str] = Form(None),
     price: Optional[float] = Form(None),
     description: Optional[str] = Form(None),
@@ -291,27 +498,59 @@ async def update_product(
     
     # Handle multiple image uploads
     images = [image_1, image_2, image_3, image_4, image_5]
-    for i, image in enumerate(images, 1):
+    for image in images:
         if image and image.filename:
-            # Delete old image if exists
-            old_image_url = getattr(product, f'image_url_{i}', None)
-            if old_image_url and os.path.exists(old_image_url.lstrip('/')):
-                os.remove(old_image_url.lstrip('/'))
-            
-            # Save new image
-            image_url = await save_uploaded_file(image, f"{product.id}_img{i}")
-            setattr(product, f'image_url_{i}', image_url)
+            ensure_upload_size(image, MAX_PRODUCT_IMAGE_BYTES)
+    image_slots = [i for i, image in enumerate(images, 1) if image and image.filename]
+    upload_limit = asyncio.Semaphore(max(1, settings.IMAGE_UPLOAD_CONCURRENCY))
+    s3_manager = get_s3_manager()
+    
+    # Save new images the same way as on create (S3 first, shared with identical uploads)
+    results = await asyncio.gather(*(
+        store_product_image(images[i - 1], s3_manager, upload_limit)
+        for i in image_slots
+    ), return_exceptions=True)
+    new_urls = [url for url in results if not isinstance(url, BaseException)]
+    failed = next((result for result in results if isinstance(result, BaseException)), None)
+    if failed is not None:
+        db.rollback()
+        await asyncio.to_thread(release_image_urls, new_urls)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to update product"
+        )
+    
+    replaced_urls = []
+    for i, image_url in zip(image_slots, results):
+        old_image_url = getattr(product, f'image_url_{i}', None)
+        setattr(product, f'image_url_{i}', image_url)
+        
+        # Each stored URL holds a reference, even if it is unchanged
+        if old_image_url:
+            replaced_urls.append(old_image_url)
+        replaced_urls += drop_slot_variants(product, i)
     
     try:
         db.commit()
         db.refresh(product)
-        return ProductResponse.from_db_model(product)
     except Exception as e:
         db.rollback()
+        await asyncio.to_thread(release_image_urls, new_urls)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Failed to update product"
         )
+    
+    refresh_storefront(db, current_user.id)
+    # Release replaced images only once nothing refers to them
+    if replaced_urls:
+        await asyncio.to_thread(release_image_urls, replaced_urls)
+    for i, image in enumerate(images, 1):
+        if image and image.filename:
+            await schedule_image_variants(
+                background_tasks, product.id, i, getattr(product, f'image_url_{i}'), image
+            )
+    return ProductResponse.from_db_model(product)
 
 
 @router.delete(
@@ -344,67 +583,158 @@ async def delete_product(
             detail="Product not found"
         )
     
+    image_urls = [getattr(product, f'image_url_{i}', None) for i in range(1, 6)]
+    image_urls += variant_urls(product.image_variants)
+    
     try:
-        # Delete associated image files if they exist
-        for i in range(1, 6):  # image_url_1 through image_url_5
-            image_url = getattr(product, f'image_url_{i}', None)
-            if image_url:
-                # Handle both relative and absolute URLs
-                file_path = image_url.lstrip('/') if image_url.startswith('/') else image_url
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-        
         db.delete(product)
         db.commit()
-        return None
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to delete product: {str(e)}"
         )
+    
+    refresh_storefront(db, current_user.id)
+    # Release the image files (S3 and local) only once the row is gone
+    await asyncio.to_thread(release_image_urls, image_urls)
+    return None
 
 
 @router.post(
-    "/{product_id}/track-click",
-    response_model=ClickTrackingResponse,
+    "/bulk-delete",
+    response_model=BulkDeleteResponse,
     responses={
-        404: {"model": ErrorResponse, "description": "Product not found"}
+        400: {"model": ErrorResponse, "description": "Deletion failed"},
+        401: {"model": ErrorResponse, "description": "Authentication required"}
     }
 )
-async def track_product_click(
-    product_id: str,
+async def bulk_delete_products(
+    delete_request: BulkDeleteRequest,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    """
+    Delete up to 1000 products owned by the authenticated user in one transaction.
+    
+    After the transaction commits, their images are released; files no
+    other product uses are removed from storage (S3 objects with batched
+    DeleteObjects requests, local uploads with unlinks). IDs that do not exist or belong to another vendor are
+    returned in `not_found`.
+    """
+    product_ids = list(dict.fromkeys(delete_request.product_ids))
+    owned = Product.user_id == current_user.id
+    
+    try:
+        rows = db.connection().execute(
+            select(Product.id, *IMAGE_URL_COLUMNS, Product.image_variants).where(owned, Product.id.in_(product_ids))
+        ).all()
+        if rows:
+            db.execute(delete(Product.__table__).where(owned, Product.id.in_([row[0] for row in rows])))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Bulk delete failed for user {current_user.id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to delete products"
+        )
+    
+    deleted_ids = {row[0] for row in rows}
+    images_removed = 0
+    if rows:
+        refresh_storefront(db, current_user.id)
+        removed = await asyncio.to_thread(release_image_urls, [
+            url for row in rows for url in [*row[1:-1], *variant_urls(row[-1])]
+        ])
+        images_removed = removed["s3_deleted"] + removed["local_deleted"]
+        logging.info(f"Bulk deleted {len(rows)} products for user {current_user.id}")
+    
+    return BulkDeleteResponse(
+        deleted=len(deleted_ids),
+        not_found=[product_id for product_id in product_ids if product_id not in deleted_ids],
+        images_removed=images_removed
+    )
+
+
+@router.post(
+    "/{product_id}/track-click",
+    response_model=ClickTrackingResponse
+)
+async def track_product_click(product_id: str):
     """
     Track a click on a product by incrementing its click counter.
     
     This is a public endpoint that can be used to track customer interest
     in products without requiring authentication.
     
+    Clicks are buffered in memory and added to the stored count in batches
+    (every CLICK_FLUSH_INTERVAL_MS or CLICK_FLUSH_MAX_PENDING clicks), so
+    the request does not touch the database. Clicks on unknown products
+    are discarded when the batch is written.
+    
     - **product_id**: ID of the product to track click for
     """
-    # Find the product
-    product = db.query(Product).filter(Product.id == product_id).first()
+    if get_click_aggregator().record(product_id):
+        # Buffer is full: write it out without holding up the response
+        run_in_background("product-click-flush", partial(flush_product_clicks, wait=False))
     
-    if not product:
+    return ClickTrackingResponse(message="Click tracked successfully")
+
+
+@router.get(
+    "/{product_id}/clicks",
+    response_model=ProductClicksResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid time range"},
+        401: {"model": ErrorResponse, "description": "Authentication required"},
+        404: {"model": ErrorResponse, "description": "Product not found"}
+    }
+)
+async def get_product_clicks(
+    product_id: str,
+    granularity: str = Query("hour", pattern="^(hour|day)$", description="Bucket size: hour or day"),
+    from_: Optional[datetime] = Query(None, alias="from", description="First bucket (UTC if no offset)"),
+    to: Optional[datetime] = Query(None, description="Last bucket, inclusive (defaults to now)"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get click counts per hour or day for a product owned by the authenticated user.
+    
+    Counts come from rollup tables, so the latest clicks can take a couple
+    of minutes to appear. Buckets without clicks are included. Up to 31
+    days of hourly or 366 days of daily buckets can be requested at once.
+    
+    - **granularity**: hour or day
+    - **from** / **to**: ISO 8601 timestamps; defaults to the last 24 hours
+      or 30 days
+    """
+    owned = db.execute(
+        select(Product.id).where(Product.id == product_id, Product.user_id == current_user.id)
+    ).scalar()
+    if not owned:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
     
     try:
-        # Increment click count
-        product.click_count += 1
-        db.commit()
-        
-        return ClickTrackingResponse(message="Click tracked successfully")
-    except Exception as e:
-        db.rollback()
+        first, last = click_series_range(granularity, from_, to)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Failed to track click"
+            detail=str(e)
         )
+    
+    buckets = get_click_series(db, product_id, granularity, first, last)
+    return ProductClicksResponse(
+        product_id=product_id,
+        granularity=granularity,
+        buckets=buckets,
+        total=sum(bucket["clicks"] for bucket in buckets)
+    )
 
 
 # ========================= S3 Image Upload Endpoints =========================
@@ -422,6 +752,7 @@ async def track_product_click(
 )
 async def upload_product_image_to_s3(
     product_id: str,
+    background_tasks: BackgroundTasks,
     image: UploadFile = File(..., description="Product image file to upload"),
     image_slot: int = Form(1, ge=1, le=5, description="Image slot number (1-5)"),
     current_user: User = Depends(get_current_user),
@@ -431,7 +762,8 @@ async def upload_product_image_to_s3(
     Upload a product image to AWS S3.
     
     This endpoint uploads product images directly to S3 and returns the public URL.
-    Images are stored in a structured format: product-images/{product_id}/{unique_filename}
+    Images are stored by content: qv-products-img/blobs/{sha256}{extension}.
+    Uploading bytes that are already stored reuses the existing object.
     
     - **product_id**: ID of the product to upload image for
     - **image**: Image file to upload (JPEG, PNG, GIF, WebP, BMP)
@@ -440,7 +772,7 @@ async def upload_product_image_to_s3(
     Returns:
     - **url**: Public S3 URL of the uploaded image
     - **key**: S3 object key
-    - **filename**: Generated unique filename
+    - **filename**: Stored file name (content hash and extension)
     - **product_id**: Product ID
     - **image_slot**: Image slot number used
     """
@@ -471,20 +803,8 @@ async def upload_product_image_to_s3(
             detail="Product not found or you don't have permission to modify it"
         )
     
-    # Check file size (limit to 10MB)
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB in bytes
-    file_content = await image.read()
-    file_size = len(file_content)
-    
-    if file_size > MAX_FILE_SIZE:
-        logging.warning(f"File size exceeded for product {product_id}: {file_size} bytes")
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File size exceeds maximum allowed size of 10MB. Your file: {file_size / (1024*1024):.2f}MB"
-        )
-    
-    # Reset file pointer for S3 upload
-    file_like = BytesIO(file_content)
+    # Check file size (limit to 10MB) without reading the spooled file
+    file_like = ensure_upload_size(image, MAX_PRODUCT_IMAGE_BYTES)
     
     try:
         # Initialize S3 manager
@@ -494,23 +814,19 @@ async def upload_product_image_to_s3(
         if not s3_manager.is_s3_configured():
             logging.warning(f"S3 not configured, falling back to local storage for product {product_id}")
             
-            # Reset file pointer for local storage
-            image.file.seek(0)
-            
-            # Save to local storage using existing function
-            image_url = await save_uploaded_file(image, f"{product_id}_img{image_slot}")
-            
-            if not image_url:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Failed to save image to local storage."
-                )
+            # Save to local storage (shared with identical uploads)
+            image_url = await store_image_blob(file_like, image.filename, image.content_type)
             
             # Update product with local image URL
             image_field = f"image_url_{image_slot}"
+            old_urls = [getattr(product, image_field, None)]
             setattr(product, image_field, image_url)
+            old_urls += drop_slot_variants(product, image_slot)
             db.commit()
             db.refresh(product)
+            refresh_storefront(db, current_user.id)
+            await asyncio.to_thread(release_image_urls, old_urls)
+            await schedule_image_variants(background_tasks, product_id, image_slot, image_url, image)
             
             logging.info(f"Successfully uploaded image to local storage for product {product_id}, slot {image_slot}")
             
@@ -522,28 +838,29 @@ async def upload_product_image_to_s3(
                 "storage_type": "local"
             }
         
-        # Upload to S3
-        upload_result = await s3_manager.upload_product_image(
-            file_content=file_like,
-            filename=image.filename,
-            product_id=product_id,
-            content_type=image.content_type
+        # Upload to S3 under the content hash; identical bytes are not uploaded again
+        image_url = await store_image_blob(
+            file_like, image.filename, image.content_type, s3_manager, local_fallback=False
         )
+        s3_key = s3_key_from_url(image_url)
+        upload_result = {
+            "url": image_url,
+            "key": s3_key,
+            "filename": os.path.basename(s3_key or image_url),
+            "product_id": product_id,
+            "upload_timestamp": datetime.utcnow().isoformat()
+        }
         
-        # Update product with new image URL
+        # Update product with new S3 URL; the replaced image loses its reference
         image_field = f"image_url_{image_slot}"
-        
-        # Delete old S3 image if exists (optional - uncomment if you want to clean up old images)
-        # old_url = getattr(product, image_field, None)
-        # if old_url and old_url.startswith("https://") and ".s3." in old_url:
-        #     # Extract S3 key from URL and delete
-        #     old_key = old_url.split(".amazonaws.com/")[-1]
-        #     await s3_manager.delete_product_image(old_key)
-        
-        # Update product with new S3 URL
+        old_urls = [getattr(product, image_field, None)]
         setattr(product, image_field, upload_result["url"])
+        old_urls += drop_slot_variants(product, image_slot)
         db.commit()
         db.refresh(product)
+        refresh_storefront(db, current_user.id)
+        await asyncio.to_thread(release_image_urls, old_urls)
+        await schedule_image_variants(background_tasks, product_id, image_slot, upload_result["url"], image)
         
         # Log successful upload
         logging.info(f"Successfully uploaded image to S3 for product {product_id}, slot {image_slot}")
@@ -620,7 +937,8 @@ async def delete_product_image_from_s3(
     """
     Delete a product image from AWS S3.
     
-    This endpoint deletes a specific product image from S3 and removes the URL from the database.
+    This endpoint removes the image URL from the database and deletes the file
+    from S3 (or local storage) unless another product uses the same image.
     
     - **product_id**: ID of the product
     - **image_slot**: Image slot number (1-5) to delete
@@ -654,24 +972,15 @@ async def delete_product_image_from_s3(
             detail=f"No image found in slot {image_slot}"
         )
     
-    # Check if it's an S3 URL
-    if image_url.startswith("https://") and ".s3." in image_url:
-        try:
-            # Extract S3 key from URL
-            s3_key = image_url.split(".amazonaws.com/")[-1]
-            
-            # Initialize S3 manager and delete from S3
-            s3_manager = get_s3_manager()
-            await s3_manager.delete_product_image(s3_key)
-            
-            logging.info(f"Deleted S3 image for product {product_id}, slot {image_slot}")
-        except Exception as e:
-            logging.error(f"Error deleting S3 image: {str(e)}")
-            # Continue to remove from database even if S3 deletion fails
-    
-    # Remove URL from database
+    # Remove URL (and its resized variants) from database
     setattr(product, image_field, None)
+    old_urls = [image_url] + drop_slot_variants(product, image_slot)
     db.commit()
+    refresh_storefront(db, current_user.id)
+    
+    # The files (S3 or local) are deleted once no product refers to them
+    await asyncio.to_thread(release_image_urls, old_urls)
+    logging.info(f"Removed image for product {product_id}, slot {image_slot}")
     
     return None
 
@@ -1,25 +1,268 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import partial
+from typing import Any, Dict, Optional
+import json
 import logging
 
-from app.core.database import get_db
-from app.core.sentry import add_breadcrumb, capture_message_with_context
-from app.models.user import User
-from app.models.product import Product
-from app.schemas.storefront import StorefrontResponse, PublicProductResponse, ErrorResponse
+from app.core.config import settings
+from app.core.database import SessionLocal, get_db
+from app.core.sentry import add_breadcrumb
+from app.schemas.storefront import (
+    StorefrontResponse,
+    StorefrontBatchRequest,
+    StorefrontBatchResponse,
+    ProductSearchResponse,
+    ErrorResponse
+)
+from app.services.product_fields import PUBLIC_PRODUCT_FIELDS, parse_fields
+from app.services.product_search import decode_search_cursor, search_store_products
+from app.services.storefront import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    DEFAULT_SORT,
+    STOREFRONT_SORTS,
+    page_variant,
+    decode_storefront_cursor,
+    get_storefront_version,
+    find_store_owner,
+    load_storefront,
+    load_storefronts,
+    iter_storefront_products,
+    load_storefront_snapshot,
+    save_storefront_snapshot
+)
+from app.services.store_directory import (
+    sitemap_page_count,
+    sitemap_page_range,
+    stream_directory,
+    stream_sitemap,
+    stream_sitemap_index
+)
+from app.services.storefront_cache import get_storefront_cache, get_storefront_loads
+from app.services.storefront_views import record_storefront_view
+from app.services.streaming import NDJSON_MEDIA_TYPE, stream_ndjson, wants_ndjson
 
 router = APIRouter()
 
 
+def _validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    """Build caching headers shared by 200 and 304 storefront responses."""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.STOREFRONT_HTTP_MAX_AGE}",
+        "Vary": "Accept, Accept-Encoding"
+    }
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def _is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against the current validators."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or any(
+            tag.removeprefix("W/") == etag for tag in candidates
+        )
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    
+    return False
+
+
+def _store_url_prefix(request: Request) -> str:
+    """Base URL public storefront links are built from."""
+    if settings.STOREFRONT_PUBLIC_URL:
+        return settings.STOREFRONT_PUBLIC_URL.rstrip("/") + "/"
+    return str(request.url_for("get_public_storefront", store_identifier="x"))[:-1]
+
+
+def _fill_storefront_cache(
+    cache_key: str,
+    store_identifier: str,
+    is_default_page: bool,
+    **page_options: Any
+) -> Optional[Dict[str, Any]]:
+    """
+    Load one storefront page and store it in the response cache.
+    
+    Runs in a worker thread (through SingleFlight) with its own session, so
+    it can also serve as a background refresh after the request finished.
+    `page_options` are passed on to load_storefront.
+    
+    Returns:
+        The cached entry, or None if the store does not exist
+    """
+    storefront_cache = get_storefront_cache()
+    generation = storefront_cache.generation
+    
+    db = SessionLocal()
+    try:
+        storefront = load_storefront_snapshot(db, store_identifier) if is_default_page else None
+        
+        if storefront is None:
+            # Find the store by store_slug (custom URL) or, for backward compatibility,
+            # by username handle (email prefix), and load its catalog version and one
+            # page of available products in the requested order, in a single query
+            storefront = load_storefront(db, store_identifier, **page_options)
+            if not storefront:
+                return None
+            
+            # Backfill the snapshot for stores that have not been written since
+            if is_default_page:
+                try:
+                    save_storefront_snapshot(db, storefront, replace=False)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    logging.debug(f"Storefront snapshot backfill skipped for {store_identifier}: {str(e)}")
+    finally:
+        db.close()
+    
+    logging.info(f"Storefront loaded for user: {storefront['vendor_email']} ({storefront['product_count']} products)")
+    
+    # Cache the serialized response; writes to this vendor invalidate it
+    cached = {
+        "body": storefront["body"],
+        "vendor_id": str(storefront["vendor_id"]),
+        "vendor_email": storefront["vendor_email"],
+        "product_count": storefront["product_count"],
+        "etag": storefront["etag"],
+        "last_modified": storefront["last_modified"]
+    }
+    storefront_cache.set(
+        cache_key, cached["vendor_id"], cached, generation=generation, store_identifier=store_identifier
+    )
+    return cached
+
+
+# Directory routes are declared before /{store_identifier} so they are not
+# treated as store identifiers
+
+@router.get("/sitemap.xml", response_class=StreamingResponse)
+async def get_store_sitemap_index(request: Request, db: Session = Depends(get_db)):
+    """
+    Sitemap index pointing at one sitemap file per 50,000 stores.
+    """
+    sitemap_urls = [
+        str(request.url_for("get_store_sitemap", page=page))
+        for page in range(sitemap_page_count(db))
+    ]
+    return StreamingResponse(
+        stream_sitemap_index(sitemap_urls),
+        media_type="application/xml",
+        headers={"Cache-Control": "public, max-age=3600"}
+    )
+
+
+@router.get(
+    "/sitemap-{page}.xml",
+    response_class=StreamingResponse,
+    responses={404: {"model": ErrorResponse, "description": "Sitemap page not found"}}
+)
+async def get_store_sitemap(page: int, request: Request, db: Session = Depends(get_db)):
+    """
+    One sitemap file listing up to 50,000 public storefront URLs.
+    
+    The body is streamed from keyset-paginated queries, so memory use does
+    not grow with the number of stores.
+    """
+    try:
+        start_after, end_at = sitemap_page_range(db, page)
+    except LookupError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Sitemap page not found"
+        )
+    
+    return StreamingResponse(
+        stream_sitemap(SessionLocal, _store_url_prefix(request), start_after, end_at),
+        media_type="application/xml",
+        headers={"Cache-Control": "public, max-age=3600"}
+    )
+
+
+@router.get("/directory.json", response_class=StreamingResponse)
+async def get_store_directory(request: Request):
+    """
+    JSON directory of every public store: identifier, name and URL.
+    
+    The body is streamed from keyset-paginated queries, so memory use does
+    not grow with the number of stores.
+    """
+    return StreamingResponse(
+        stream_directory(SessionLocal, _store_url_prefix(request)),
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=3600"}
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=StorefrontBatchResponse,
+    responses={
+        422: {"model": ErrorResponse, "description": "Too many or no identifiers"}
+    }
+)
+async def get_public_storefronts_batch(
+    batch: StorefrontBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the first page of up to 100 storefronts in one request.
+    
+    - **identifiers**: Store slugs or usernames (1-100)
+    - **limit**: Products per store (1-50, default 12)
+    
+    Returns a map of identifier to storefront data, or null for
+    identifiers that do not match a store. Use each store's
+    `next_cursor` with `GET /api/store/{store_identifier}` for more.
+    """
+    storefronts = load_storefronts(db, batch.identifiers, batch.limit)
+    
+    add_breadcrumb(
+        message="Storefront batch fetch",
+        category="storefront",
+        level="info",
+        data={
+            "requested": len(storefronts),
+            "found": sum(1 for storefront in storefronts.values() if storefront is not None)
+        }
+    )
+    
+    body = json.dumps({"stores": storefronts}, separators=(",", ":")).encode()
+    return Response(content=body, media_type="application/json")
+
+
 @router.get(
     "/{store_identifier}",
     response_model=StorefrontResponse,
     responses={
+        400: {"model": ErrorResponse, "description": "Invalid cursor, price range or fields"},
         404: {"model": ErrorResponse, "description": "Store not found"}
     }
 )
 async def get_public_storefront(
     store_identifier: str,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Products per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    sort: str = Query(DEFAULT_SORT, pattern="^(" + "|".join(STOREFRONT_SORTS) + ")$", description="Sort order"),
+    min_price: Optional[float] = Query(None, ge=0, description="Minimum product price"),
+    max_price: Optional[float] = Query(None, ge=0, description="Maximum product price"),
+    fields: Optional[str] = Query(None, description="Comma-separated product fields to return, e.g. id,name,price,image_urls"),
     db: Session = Depends(get_db)
 ):
     """
@@ -29,8 +272,23 @@ async def get_public_storefront(
     for a specific vendor's storefront.
     
     - **store_identifier**: The store's custom slug OR username (extracted from email before @)
+    - **limit**: Number of products per page (1-200, default 50)
+    - **cursor**: Opaque cursor returned as `next_cursor` by the previous page
+    - **sort**: `newest` (default), `price_asc`, `price_desc` or `popular`
+    - **min_price** / **max_price**: Optional inclusive price range
+    - **fields**: Optional comma-separated product fields (`id`, `name`, `price`,
+      `image_urls`, `image_variants`, `description`, `is_available`); only these are
+      loaded and returned
     
-    Returns vendor information and all available products.
+    With `Accept: application/x-ndjson` every matching product (from `cursor`
+    onwards, ignoring `limit`) is streamed as one JSON object per line.
+    
+    Returns vendor information and a page of available products in the
+    requested order. `next_cursor` is null on the last page and is only
+    valid with the same sort and price range.
+    
+    Responses carry ETag and Last-Modified validators; conditional requests
+    that still match are answered with 304 Not Modified.
     """
     # Add breadcrumb for storefront access
     add_breadcrumb(
@@ -40,90 +298,161 @@ async def get_public_storefront(
         data={"store_identifier": store_identifier}
     )
     
-    # First try to find by store_slug (custom URL)
-    user = db.query(User).filter(
-        User.store_slug == store_identifier
-    ).first()
+    # Validate the cursor up front so bad input never reaches the database
+    cursor_values = None
+    if cursor:
+        try:
+            cursor_values = decode_storefront_cursor(cursor, sort)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
     
-    # If not found, try to find by username (email prefix) for backward compatibility
-    if not user:
-        user = db.query(User).filter(
-            User.email.like(f"{store_identifier}@%")
-        ).first()
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_price cannot be greater than max_price"
+        )
     
-    if not user:
-        logging.warning(f"Storefront not found for: {store_identifier}")
-        add_breadcrumb(
-            message="Storefront not found",
-            category="storefront",
-            level="warning",
-            data={"store_identifier": store_identifier}
+    try:
+        product_fields = parse_fields(fields, PUBLIC_PRODUCT_FIELDS)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # NDJSON mode streams the whole catalog from a server-side cursor
+    if wants_ndjson(request):
+        user = find_store_owner(db, store_identifier)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Store not found"
+            )
+        record_storefront_view(user.id)
+        products = partial(
+            iter_storefront_products, vendor_id=user.id, cursor_values=cursor_values,
+            sort=sort, min_price=min_price, max_price=max_price, fields=product_fields
+        )
+        return StreamingResponse(
+            stream_ndjson(SessionLocal, products),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers={"Vary": "Accept, Accept-Encoding"}
         )
+    
+    # The default first page is materialized at write time, so most loads
+    # are a single primary-key fetch of a pre-serialized body
+    is_default_page = (
+        not cursor and limit == DEFAULT_PAGE_SIZE and sort == DEFAULT_SORT
+        and min_price is None and max_price is None and product_fields is None
+    )
+    page_key = page_variant(limit, cursor, sort, min_price, max_price, product_fields)
+    cache_key = f"{store_identifier}?{page_key}"
+    fill = partial(
+        _fill_storefront_cache, cache_key, store_identifier, is_default_page,
+        limit=limit, cursor_values=cursor_values, variant=page_key, sort=sort,
+        min_price=min_price, max_price=max_price, fields=product_fields
+    )
+    
+    # Serve from the in-process cache when possible. Expired entries are
+    # served stale while a single background task per key refreshes them
+    storefront_loads = get_storefront_loads()
+    entry = get_storefront_cache().get_entry(cache_key)
+    if entry is not None:
+        cached, is_fresh = entry
+        if not is_fresh:
+            storefront_loads.schedule(cache_key, fill)
+    else:
+        # Conditional requests resolve the vendor and catalog version first so
+        # that a 304 can be answered without loading any products
+        has_validators = request.headers.get("if-none-match") or request.headers.get("if-modified-since")
+        if has_validators and not is_default_page:
+            user = find_store_owner(db, store_identifier)
+            if user:
+                etag, last_modified = get_storefront_version(db, user, variant=page_key, sort=sort)
+                if _is_not_modified(request, etag, last_modified):
+                    record_storefront_view(user.id)
+                    return Response(
+                        status_code=status.HTTP_304_NOT_MODIFIED,
+                        headers=_validator_headers(etag, last_modified)
+                    )
+        
+        # Concurrent misses for the same page share one load
+        cached = await storefront_loads.run(cache_key, fill)
+        
+        if cached is None:
+            logging.warning(f"Storefront not found for: {store_identifier}")
+            add_breadcrumb(
+                message="Storefront not found",
+                category="storefront",
+                level="warning",
+                data={"store_identifier": store_identifier}
+            )
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Store not found"
+            )
+    
+    # Count the view; aggregated in memory and flushed as per-minute rollups
+    record_storefront_view(cached["vendor_id"])
+    
+    headers = _validator_headers(cached["etag"], cached["last_modified"])
+    if _is_not_modified(request, cached["etag"], cached["last_modified"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached["body"], media_type="application/json", headers=headers)
+
+
+@router.get(
+    "/{store_identifier}/search",
+    response_model=ProductSearchResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid cursor"},
+        404: {"model": ErrorResponse, "description": "Store not found"}
+    }
+)
+async def search_storefront(
+    store_identifier: str,
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Products per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db)
+):
+    """
+    Search a store's available products by name and description.
+    
+    - **store_identifier**: The store's custom slug OR username (extracted from email before @)
+    - **q**: Search text; every word must match (prefix matching)
+    - **limit**: Number of products per page (1-200, default 50)
+    - **cursor**: Opaque cursor returned as `next_cursor` by the previous page
+    
+    Results are ordered by relevance. `next_cursor` is null on the last page.
+    """
+    cursor_values = None
+    if cursor:
+        try:
+            cursor_values = decode_search_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    user = find_store_owner(db, store_identifier)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Store not found"
         )
     
-    # Get all available (in-stock) products for this user
-    available_products = db.query(Product).filter(
-        Product.user_id == user.id,
-        Product.is_available == True
-    ).all()
-    
-    # Convert products to public response format
-    public_products = []
-    for product in available_products:
-        # Collect all image URLs
-        image_urls = []
-        for i in range(1, 6):
-            image_url = getattr(product, f'image_url_{i}', None)
-            if image_url:
-                image_urls.append(image_url)
-        
-        public_products.append(PublicProductResponse(
-            id=product.id,
-            name=product.name,
-            price=product.price,
-            image_urls=image_urls,
-            description=product.description,
-            is_available=product.is_available
-        ))
-    
-    # Use custom store name if available, otherwise extract from email
-    if user.store_name:
-        vendor_name = user.store_name
-    else:
-        vendor_name = user.email.split('@')[0].replace('.', ' ').replace('_', ' ').replace('-', ' ').title()
+    products, next_cursor = search_store_products(db, user.id, q, limit, cursor_values)
     
-    # Log successful storefront access
-    logging.info(f"Storefront accessed successfully for user: {user.email} ({len(public_products)} products)")
     add_breadcrumb(
-        message="Storefront access successful",
+        message="Storefront search",
         category="storefront",
         level="info",
-        data={
-            "store_identifier": store_identifier,
-            "vendor_email": user.email,
-            "product_count": len(public_products)
-        }
+        data={"store_identifier": store_identifier, "results": len(products)}
     )
     
-    # Capture storefront view event
-    capture_message_with_context(
-        "Storefront viewed",
-        level="info",
-        context={
-            "store_identifier": store_identifier,
-            "vendor_id": str(user.id),
-            "vendor_email": user.email,
-            "product_count": len(public_products)
-        }
-    )
-    
-    return StorefrontResponse(
-        vendor_name=vendor_name,
-        whatsapp_number=user.whatsapp_number,
-        products=public_products,
-        banner_url=user.banner_url,
-        store_slug=user.store_slug
-    )
+    return ProductSearchResponse(products=products, next_cursor=next_cursor)
@@ -1,9 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 import logging
 import re
-from io import BytesIO
 from typing import Dict, Any, Optional
 
 from app.core.database import get_db
@@ -12,11 +11,36 @@ from app.core.sentry import set_user_context, add_breadcrumb, capture_message_wi
 from app.models.user import User
 from app.schemas.user import UserRegisterRequest, UserRegisterResponse, ErrorResponse, UserProfile, UpdateStoreRequest
 from app.api.deps import get_current_user
+from app.services.image_storage import MAX_BANNER_BYTES, ensure_upload_size
 from app.services.s3_manager import get_s3_manager
+from app.schemas.storefront import StorefrontViewsResponse
+from app.services.storefront import derive_store_handle, refresh_storefront
+from app.services.storefront_cache import invalidate_store_identifiers
+from app.services.storefront_views import get_daily_views
 
 router = APIRouter()
 
 
+def _assign_store_handle(db: Session, user: User) -> None:
+    """
+    Give a newly registered vendor the email-prefix store handle.
+    
+    Handles are unique; when the prefix is already taken the vendor keeps
+    a NULL handle and is reachable through a custom store slug instead.
+    """
+    handle = derive_store_handle(user.email)
+    if db.query(User.id).filter(User.store_handle == handle).first():
+        return
+    
+    try:
+        user.store_handle = handle
+        db.commit()
+    except IntegrityError:
+        # Another registration claimed the handle concurrently
+        db.rollback()
+        logging.info(f"Store handle '{handle}' already taken, leaving unset for {user.email}")
+
+
 @router.post(
     "/register",
     response_model=UserRegisterResponse,
@@ -74,6 +98,9 @@ async def register_user(
         db.commit()
         db.refresh(new_user)
         
+        # Claim the legacy store handle if no other vendor owns it yet
+        _assign_store_handle(db, new_user)
+        
         # Set user context in Sentry
         set_user_context(user_id=str(new_user.id), email=new_user.email)
         
@@ -137,6 +164,28 @@ async def get_current_user_profile(
     )
 
 
+@router.get("/me/storefront-views", response_model=StorefrontViewsResponse)
+async def get_storefront_views(
+    days: int = Query(30, ge=1, le=365, description="Number of days to return, ending today"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Get daily view counts for the current user's public storefront.
+    
+    Days are UTC and include days without views. Counts are written in
+    batches, so the most recent views can take up to a minute to appear.
+    
+    Requires authentication via Bearer token.
+    """
+    daily_views = get_daily_views(db, current_user.id, days)
+    
+    return StorefrontViewsResponse(
+        days=daily_views,
+        total=sum(day["views"] for day in daily_views)
+    )
+
+
 @router.put("/me/store", response_model=UserProfile)
 async def update_store_info(
     store_data: UpdateStoreRequest,
@@ -151,6 +200,7 @@ async def update_store_info(
     
     The store_slug must be unique and will be used in the store URL.
     """
+    previous_slug = current_user.store_slug
     try:
         # Update store name if provided
         if store_data.store_name is not None:
@@ -174,6 +224,10 @@ async def update_store_info(
         
         db.commit()
         db.refresh(current_user)
+        refresh_storefront(db, current_user.id)
+        if current_user.store_slug != previous_slug:
+            # Both slugs may now lead to another store (or none)
+            invalidate_store_identifiers(previous_slug, current_user.store_slug)
         
         logging.info(f"Store info updated for user {current_user.email}: name={current_user.store_name}, slug={current_user.store_slug}")
         
@@ -237,19 +291,8 @@ async def upload_store_banner(
     # Log the upload attempt
     logging.info(f"Banner upload attempt for user {current_user.email}: filename={uploaded_file.filename}, content_type={uploaded_file.content_type}")
     
-    # Check file size (limit to 5MB for banners)
-    MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB in bytes
-    file_content = await uploaded_file.read()
-    file_size = len(file_content)
-    
-    if file_size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File size exceeds maximum allowed size of 5MB. Your file: {file_size / (1024*1024):.2f}MB"
-        )
-    
-    # Reset file pointer for S3 upload
-    file_like = BytesIO(file_content)
+    # Check file size (limit to 5MB for banners) without reading the spooled file
+    file_like = ensure_upload_size(uploaded_file, MAX_BANNER_BYTES)
     
     try:
         # Initialize S3 manager
@@ -282,6 +325,7 @@ async def upload_store_banner(
         current_user.banner_url = upload_result["url"]
         db.commit()
         db.refresh(current_user)
+        refresh_storefront(db, current_user.id)
         
         logging.info(f"Banner uploaded successfully for user {current_user.email}")
         
@@ -351,6 +395,7 @@ async def delete_store_banner(
         # Clear banner URL from database only if S3 deletion succeeded
         current_user.banner_url = None
         db.commit()
+        refresh_storefront(db, current_user.id)
         
         logging.info(f"Banner deleted successfully for user {current_user.email}")
         
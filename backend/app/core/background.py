@@ -0,0 +1,73 @@
+"""
+Background tasks for the API process
+"""
+import asyncio
+import logging
+from typing import Callable, Dict, Set
+
+logger = logging.getLogger(__name__)
+
+# Running periodic tasks by name
+_tasks: Dict[str, asyncio.Task] = {}
+
+# One-off jobs still running (referenced so they are not garbage collected)
+_jobs: Set[asyncio.Task] = set()
+
+
+def start_periodic_task(name: str, interval_seconds: float, func: Callable[[], None]) -> None:
+    """
+    Run a blocking function every `interval_seconds` in a worker thread.
+
+    Does nothing if the interval is not positive or the task is already
+    running. Errors are logged and the task keeps going.
+
+    Args:
+        name: Unique task name (used for logging and de-duplication)
+        interval_seconds: Delay between runs
+        func: Function to call; runs off the event loop
+    """
+    if interval_seconds <= 0 or name in _tasks:
+        return
+
+    async def runner():
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await asyncio.to_thread(func)
+            except Exception as e:
+                logger.error(f"Background task {name} failed: {str(e)}")
+
+    _tasks[name] = asyncio.create_task(runner(), name=name)
+    logger.info(f"Started background task {name} (every {interval_seconds}s)")
+
+
+def run_in_background(name: str, func: Callable[[], None]) -> asyncio.Task:
+    """
+    Run a blocking function once in a worker thread without awaiting it.
+
+    The task is kept until it finishes and a failure is logged, so errors
+    of fire-and-forget work are never lost silently.
+
+    Args:
+        name: Job name (used for logging)
+        func: Function to call; runs off the event loop
+    """
+    task = asyncio.create_task(asyncio.to_thread(func), name=name)
+    _jobs.add(task)
+
+    def finished(done: asyncio.Task) -> None:
+        _jobs.discard(done)
+        if not done.cancelled() and done.exception() is not None:
+            logger.error(f"Background job {name} failed: {str(done.exception())}")
+
+    task.add_done_callback(finished)
+    return task
+
+
+async def stop_background_tasks() -> None:
+    """Cancel all periodic tasks and wait for them and running one-off jobs to exit."""
+    tasks = list(_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, *_jobs, return_exceptions=True)
+    _tasks.clear()
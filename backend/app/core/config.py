@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
@@ -30,6 +30,46 @@ class Settings(BaseSettings):
     AWS_REGION: Optional[str] = None
     S3_BUCKET_NAME: Optional[str] = None
     
+    # Storefront response cache (in-process, per worker)
+    STOREFRONT_CACHE_TTL_SECONDS: int = 60
+    STOREFRONT_CACHE_MAX_ENTRIES: int = 1024
+    STOREFRONT_CACHE_STALE_SECONDS: int = 300  # Serve expired entries while refreshing
+    STOREFRONT_HTTP_MAX_AGE: int = 30  # Cache-Control max-age for browsers/CDNs
+    
+    # Public storefront page URL prefix used in the sitemap and directory,
+    # e.g. https://quickvendor.app/store/ (defaults to the API storefront URL)
+    STOREFRONT_PUBLIC_URL: Optional[str] = None
+    
+    # Storefront view analytics (in-process aggregation, periodic flush)
+    STOREFRONT_VIEW_FLUSH_SECONDS: int = 30
+    
+    # Product click counting (write-behind, flushed every N ms or M clicks)
+    CLICK_FLUSH_INTERVAL_MS: int = 1000
+    CLICK_FLUSH_MAX_PENDING: int = 1000
+    
+    # Durability of local uploads: none, file (fsync before rename) or full (also fsync the directory)
+    LOCAL_STORAGE_FSYNC: Literal["none", "file", "full"] = "file"
+    
+    # Images of one product uploaded to storage at the same time
+    IMAGE_UPLOAD_CONCURRENCY: int = 3
+    
+    # Resized product image variants (needs Pillow), rendered in a process pool
+    IMAGE_VARIANTS_ENABLED: bool = True
+    IMAGE_VARIANT_FORMAT: Literal["webp", "jpeg"] = "webp"
+    IMAGE_VARIANT_QUALITY: int = 80
+    IMAGE_VARIANT_WORKERS: int = 2
+    
+    # Click analytics (hourly/daily rollups of raw click events)
+    CLICK_ROLLUP_INTERVAL_SECONDS: int = 60
+    CLICK_EVENT_RETENTION_DAYS: int = 30  # 0 keeps raw events forever
+    
+    # Static storefront export (see export_storefronts.py)
+    STOREFRONT_EXPORT_DIR: Optional[str] = None  # Local directory target
+    STOREFRONT_EXPORT_TO_S3: bool = False  # Upload to S3_BUCKET_NAME instead
+    STOREFRONT_EXPORT_HTML: bool = False  # Also render a minimal HTML page
+    STOREFRONT_EXPORT_INTERVAL_SECONDS: int = 0  # Background export (one worker at a time); 0 disables
+    STOREFRONT_EXPORT_CACHE_CONTROL: str = "public, max-age=300, s-maxage=86400, stale-while-revalidate=86400"
+    
     class Config:
         env_file = ".env"
 
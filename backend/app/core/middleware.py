@@ -1,9 +1,11 @@
 from fastapi import Request, HTTPException
 from fastapi.responses import JSONResponse
+import re
 import time
+import json
 import logging
 import uuid
-from typing import Callable
+from typing import Callable, Optional, Sequence, Tuple
 
 try:
     import sentry_sdk
@@ -86,6 +88,109 @@ class SentryMiddleware:
             raise
 
 
+class _BodyTooLarge(Exception):
+    """Raised from receive() once a request body passes its limit."""
+
+
+class BodySizeLimitMiddleware:
+    """
+    Reject request bodies over a per-path byte limit while they arrive.
+    
+    A Content-Length over the limit is answered with 413 before any of the
+    body is read. Otherwise (e.g. chunked uploads) bytes are counted as the
+    application receives them; once the limit is passed the body stops
+    being delivered and the client gets 413 instead of whatever response
+    the application produced, so oversized uploads are never fully
+    buffered or spooled.
+    """
+    
+    def __init__(self, app, limits: Sequence[Tuple[str, int]], default_limit: Optional[int] = None):
+        """
+        Args:
+            app: ASGI application
+            limits: (path regex, max bytes) pairs; the first match applies
+            default_limit: Limit for other paths (None for no limit)
+        """
+        self.app = app
+        self.limits = [(re.compile(pattern), limit) for pattern, limit in limits]
+        self.default_limit = default_limit
+    
+    def _limit_for(self, path: str) -> Optional[int]:
+        for pattern, limit in self.limits:
+            if pattern.match(path):
+                return limit
+        return self.default_limit
+    
+    async def _reject(self, send, limit: int) -> None:
+        body = json.dumps({"detail": f"Request body exceeds the maximum of {limit} bytes"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+        
+        limit = self._limit_for(scope.get("path", ""))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        
+        content_length = dict(scope.get("headers", [])).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            logging.warning(f"Rejected {scope.get('path')}: Content-Length {int(content_length)} over {limit}")
+            await self._reject(send, limit)
+            return
+        
+        received = 0
+        exceeded = False
+        response_started = False
+        
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                raise _BodyTooLarge()
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    logging.warning(f"Rejected {scope.get('path')}: body passed {limit} bytes")
+                    raise _BodyTooLarge()
+            return message
+        
+        async def guarded_send(message):
+            nonlocal response_started
+            if exceeded:
+                # The application saw a failed body read; answer 413 instead
+                if not response_started:
+                    response_started = True
+                    await self._reject(send, limit)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
+        except Exception:
+            if not exceeded:
+                raise
+        
+        if exceeded and not response_started:
+            await self._reject(send, limit)
+
+
 async def log_requests_middleware(request: Request, call_next):
     """Middleware to log all requests with timing."""
     
@@ -6,9 +6,13 @@ import logging
 
 from app.core.database import engine, Base
 from app.core.sentry import init_sentry
-from app.core.middleware import log_requests_middleware, SentryMiddleware
+from app.core.middleware import log_requests_middleware, SentryMiddleware, BodySizeLimitMiddleware
 from app.core.startup import run_startup_tasks
+from app.core.background import start_periodic_task, stop_background_tasks
+from app.core.config import settings
 from app.api import users, auth, products, store, feedback
+from app.services.image_storage import MAX_BANNER_BYTES, MAX_PRODUCT_IMAGE_BYTES, MULTIPART_OVERHEAD_BYTES
+from app.services.product_bulk import BULK_MAX_BYTES
 
 # Initialize Sentry before creating the app
 init_sentry()
@@ -38,6 +42,20 @@ app.add_middleware(SentryMiddleware)
 # Add request logging middleware
 app.middleware("http")(log_requests_middleware)
 
+# Reject oversized uploads while they stream in, before anything buffers a
+# body that will be refused. Middleware added later wraps this one, so it
+# must be added before CORSMiddleware for its 413s to carry CORS headers
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits=[
+        (r"^/api/products/bulk$", BULK_MAX_BYTES),
+        (r"^/api/products/[^/]+/images/upload$", MAX_PRODUCT_IMAGE_BYTES + MULTIPART_OVERHEAD_BYTES),
+        (r"^/api/users/me/banner$", MAX_BANNER_BYTES + MULTIPART_OVERHEAD_BYTES),
+        # Create/update take up to five images
+        (r"^/api/products(/[^/]+)?/?$", 5 * MAX_PRODUCT_IMAGE_BYTES + MULTIPART_OVERHEAD_BYTES),
+    ]
+)
+
 # Configure CORS - include production URLs
 allowed_origins = [
     "http://localhost:5173", 
@@ -58,7 +76,7 @@ allowed_origins.extend([
     "https://quick-vendor-app.onrender.com"  # Add the actual frontend URL
 ])
 
-# Single CORS configuration - combining all origins
+# Single CORS configuration - combining all origins (added last: outermost)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -72,10 +90,53 @@ app.add_middleware(
     ],
     allow_origin_regex=r"https://.*\.onrender\.com",
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # Pagination headers of the vendor product list
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
+# Background jobs
+@app.on_event("startup")
+async def start_background_jobs():
+    from app.services.storefront_export import run_configured_export
+    from app.services.storefront_views import flush_storefront_views
+    from app.services.click_counter import flush_product_clicks
+    from app.services.click_analytics import run_click_rollup
+    
+    start_periodic_task(
+        "storefront-export",
+        settings.STOREFRONT_EXPORT_INTERVAL_SECONDS,
+        run_configured_export
+    )
+    start_periodic_task(
+        "storefront-view-flush",
+        settings.STOREFRONT_VIEW_FLUSH_SECONDS,
+        flush_storefront_views
+    )
+    start_periodic_task(
+        "product-click-flush",
+        settings.CLICK_FLUSH_INTERVAL_MS / 1000,
+        flush_product_clicks
+    )
+    start_periodic_task(
+        "product-click-rollup",
+        settings.CLICK_ROLLUP_INTERVAL_SECONDS,
+        run_click_rollup
+    )
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    from app.services.storefront_views import flush_storefront_views
+    from app.services.click_counter import flush_product_clicks
+    from app.services.image_variants import shutdown_variant_pool
+    
+    await stop_background_tasks()
+    shutdown_variant_pool()
+    # Write out views and clicks counted since the last periodic flush
+    flush_storefront_views()
+    flush_product_clicks()
+
 # Include routers
 app.include_router(
     users.router,
@@ -117,6 +178,9 @@ async def root():
 async def health_check():
     """Health check endpoint with S3 status."""
     from app.services.s3_manager import get_s3_manager
+    from app.services.storefront_cache import get_storefront_cache
+    from app.services.storefront_views import get_view_aggregator
+    from app.services.click_counter import get_click_aggregator
     
     s3_manager = get_s3_manager()
     s3_configured = s3_manager.is_s3_configured()
@@ -140,6 +204,9 @@ async def health_check():
             "bucket": s3_manager.bucket_name if s3_configured else None,
             "region": s3_manager.aws_region if s3_configured else None
         },
+        "storefront_cache": get_storefront_cache().stats(),
+        "storefront_views": get_view_aggregator().stats(),
+        "product_clicks": get_click_aggregator().stats(),
         "environment": os.getenv("ENVIRONMENT", "unknown")
     }
 
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, JSON
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+# Values of ImageBlob.storage
+BLOB_STORAGE_S3 = "s3"
+BLOB_STORAGE_LOCAL = "local"
+
+
+class ImageBlob(Base):
+    """A stored image file, keyed by the SHA-256 of its bytes and its backend, and shared by every URL reference."""
+
+    __tablename__ = "image_blobs"
+
+    sha256 = Column(String(64), primary_key=True)  # Hex digest of the file contents
+    # Backend holding the file ("s3" or "local"); the same bytes may be stored on both
+    storage = Column(String(8), primary_key=True, default=BLOB_STORAGE_LOCAL)
+    url = Column(String, nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=True)
+    # Product image and variant slots pointing at the blob; removed at zero
+    ref_count = Column(Integer, nullable=False, default=1)
+    # Variant name -> URL of resized copies last generated from this image
+    # (a cache for reuse; references are held by the products using them)
+    variants = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,14 +1,32 @@
-from sqlalchemy import Column, String, Text, Float, Boolean, DateTime, ForeignKey, Integer
+from sqlalchemy import Column, String, Text, Float, Boolean, DateTime, ForeignKey, Integer, Index, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from typing import Any, Dict, List, Optional, Sequence
 import uuid
 
+# Image variant layout shared by the product schemas and services
+
+# Variant name -> maximum width in pixels (images are never upscaled)
+VARIANT_WIDTHS = {
+    "thumbnail": 200,
+    "medium": 600,
+    "full": 1200,
+}
+
+# Variants of an image nothing has been generated for yet. Shared by every
+# such image in a response, so it must never be mutated
+EMPTY_VARIANTS = dict.fromkeys(VARIANT_WIDTHS)
+
+
+def generate_product_id() -> str:
+    return f"product_{uuid.uuid4().hex}"
+
 
 class Product(Base):
     __tablename__ = "products"
 
-    id = Column(String, primary_key=True, default=lambda: f"product_{uuid.uuid4().hex}")
+    id = Column(String, primary_key=True, default=generate_product_id)
     name = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     price = Column(Float, nullable=False)
@@ -17,6 +35,8 @@ class Product(Base):
     image_url_3 = Column(String, nullable=True)
     image_url_4 = Column(String, nullable=True)
     image_url_5 = Column(String, nullable=True)
+    # Resized copies per image slot: {"1": {"thumbnail": url, "medium": url, "full": url}}
+    image_variants = Column(JSON, nullable=True)
     is_available = Column(Boolean, default=True)
     click_count = Column(Integer, default=0, nullable=False)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
@@ -25,3 +45,42 @@ class Product(Base):
 
     # Relationship with User
     owner = relationship("User", back_populates="products")
+
+    __table_args__ = (
+        # Keyset pagination of a storefront, newest first
+        Index("idx_products_storefront_created", "user_id", "is_available", "created_at", "id"),
+        # Storefront price and popularity sorts / price-range filters
+        Index("idx_products_storefront_price", "user_id", "is_available", "price", "id"),
+        Index("idx_products_storefront_popular", "user_id", "is_available", "click_count", "id"),
+        # Vendor product listing across both availability states
+        Index("idx_products_owner_created", "user_id", "created_at", "id"),
+        Index("idx_products_owner_price", "user_id", "price", "id"),
+        Index("idx_products_owner_popular", "user_id", "click_count", "id"),
+    )
+
+
+def image_variant_list(urls: Sequence[Optional[str]], variants: Optional[Dict[str, Any]]) -> List[Dict[str, Optional[str]]]:
+    """
+    Variant URLs for each stored image, aligned with the image_urls list.
+
+    Args:
+        urls: image_url_1 .. image_url_5 (empty slots are skipped)
+        variants: The product's image_variants column, keyed by slot
+
+    Returns:
+        One dict of VARIANT_WIDTHS name -> URL (None until generated) per
+        non-empty image URL; images without variants share EMPTY_VARIANTS
+    """
+    # Runs once per storefront row; most products have no variants at all
+    if not variants:
+        return [EMPTY_VARIANTS for url in urls if url]
+
+    result = []
+    for slot, url in enumerate(urls, 1):
+        if url:
+            slot_variants = variants.get(str(slot))
+            result.append(
+                {name: slot_variants.get(name) for name in VARIANT_WIDTHS}
+                if slot_variants else EMPTY_VARIANTS
+            )
+    return result
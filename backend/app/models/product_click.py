@@ -0,0 +1,49 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Date, DateTime, ForeignKey, Index
+from app.core.database import Base
+
+
+class ProductClickEvent(Base):
+    """One product click (append-only; pruned after the retention window)."""
+
+    __tablename__ = "product_click_events"
+
+    # Increasing ID; rollups track the last ID they have counted
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    product_id = Column(String, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    clicked_at = Column(DateTime(timezone=True), nullable=False)  # UTC
+
+    __table_args__ = (
+        # Retention pruning
+        Index("idx_product_click_events_clicked_at", "clicked_at"),
+        # Never reuse IDs of pruned events (they would fall behind the watermark)
+        {"sqlite_autoincrement": True},
+    )
+
+
+class ProductClickHourly(Base):
+    """Number of clicks on a product in one UTC hour."""
+
+    __tablename__ = "product_click_hourly"
+
+    product_id = Column(String, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)  # Start of the hour (UTC)
+    clicks = Column(Integer, nullable=False, default=0)
+
+
+class ProductClickDaily(Base):
+    """Number of clicks on a product on one UTC day."""
+
+    __tablename__ = "product_click_daily"
+
+    product_id = Column(String, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    clicks = Column(Integer, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    """Last event ID an incremental rollup job has processed."""
+
+    __tablename__ = "rollup_watermarks"
+
+    name = Column(String, primary_key=True)
+    last_event_id = Column(BigInteger, nullable=False, default=0)
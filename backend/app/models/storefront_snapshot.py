@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, Text, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class StorefrontSnapshot(Base):
+    """Pre-serialized first page of a vendor's public storefront."""
+
+    __tablename__ = "storefront_snapshots"
+
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    body = Column(Text, nullable=False)  # StorefrontResponse JSON
+    etag = Column(String, nullable=False)
+    last_modified = Column(DateTime(timezone=True), nullable=True)
+    product_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from app.core.database import Base
+
+
+class StorefrontViewRollup(Base):
+    """Number of storefront views for a vendor in one UTC minute."""
+
+    __tablename__ = "storefront_view_rollups"
+
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    minute = Column(DateTime(timezone=True), primary_key=True)  # Start of the minute (UTC)
+    views = Column(Integer, nullable=False, default=0)
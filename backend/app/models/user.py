@@ -15,9 +15,11 @@ class User(Base):
     store_url = Column(String, unique=True, nullable=True)
     store_name = Column(String, nullable=True)  # Custom store name
     store_slug = Column(String, unique=True, index=True, nullable=True)  # URL-friendly store identifier
+    store_handle = Column(String, unique=True, index=True, nullable=True)  # Email prefix for legacy store URLs
     banner_url = Column(String, nullable=True)  # S3 URL for store banner image
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    storefront_updated_at = Column(DateTime(timezone=True), nullable=True)  # Last change to the public storefront
 
     # Relationship with Products
     products = relationship("Product", back_populates="owner")
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, List
 from datetime import datetime
 
+from app.models.product import image_variant_list
+
 
 class ProductCreateRequest(BaseModel):
     name: str = Field(..., min_length=1, max_length=200)
@@ -39,12 +41,20 @@ class ProductUpdateRequest(BaseModel):
     }
 
 
+class ImageVariantUrls(BaseModel):
+    """Resized copies of one product image; None until generated."""
+    thumbnail: str | None = None
+    medium: str | None = None
+    full: str | None = None
+
+
 class ProductResponse(BaseModel):
     id: str
     name: str
     description: str | None = None
     price: float
     image_urls: List[str] = []
+    image_variants: List[ImageVariantUrls] = []  # Same order as image_urls
     is_available: bool
     click_count: int
     user_id: str
@@ -56,11 +66,8 @@ class ProductResponse(BaseModel):
     @classmethod
     def from_db_model(cls, product):
         """Convert database model to response model with image_urls list"""
-        image_urls = []
-        for i in range(1, 6):  # Check image_url_1 through image_url_5
-            image_url = getattr(product, f'image_url_{i}', None)
-            if image_url:
-                image_urls.append(image_url)
+        urls = [getattr(product, f'image_url_{i}', None) for i in range(1, 6)]
+        image_urls = [url for url in urls if url]
         
         return cls(
             id=product.id,
@@ -68,6 +75,7 @@ class ProductResponse(BaseModel):
             description=product.description,
             price=product.price,
             image_urls=image_urls,
+            image_variants=image_variant_list(urls, product.image_variants),
             is_available=product.is_available,
             click_count=product.click_count,
             user_id=product.user_id,
@@ -101,5 +109,108 @@ class ClickTrackingResponse(BaseModel):
         }
 
 
+class BulkRowError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class BulkImportResponse(BaseModel):
+    created: int
+    product_ids: List[str]
+    errors: List[BulkRowError]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "created": 2,
+                "product_ids": ["product_abc123", "product_def456"],
+                "errors": [{"row": 3, "errors": ["price: Input should be greater than 0"]}]
+            }
+        }
+
+
+class BulkProductFilter(BaseModel):
+    product_ids: Optional[List[str]] = Field(None, min_length=1, max_length=1000)
+    is_available: Optional[bool] = None
+    min_price: Optional[float] = Field(None, ge=0)
+    max_price: Optional[float] = Field(None, ge=0)
+
+
+class BulkProductChanges(BaseModel):
+    is_available: Optional[bool] = None
+    price: Optional[float] = Field(None, gt=0)
+    price_multiplier: Optional[float] = Field(None, gt=0, le=100)
+
+    @model_validator(mode="after")
+    def check_changes(self):
+        if self.price is not None and self.price_multiplier is not None:
+            raise ValueError("Set either price or price_multiplier, not both")
+        if self.is_available is None and self.price is None and self.price_multiplier is None:
+            raise ValueError("No changes given")
+        return self
+
+
+class BulkProductUpdateRequest(BaseModel):
+    filter: BulkProductFilter = BulkProductFilter()
+    set: BulkProductChanges
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "filter": {"is_available": True, "max_price": 50},
+                "set": {"price_multiplier": 1.1}
+            }
+        }
+    }
+
+
+class BulkUpdateResponse(BaseModel):
+    updated: int
+
+
+class BulkDeleteRequest(BaseModel):
+    product_ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkDeleteResponse(BaseModel):
+    deleted: int
+    not_found: List[str]
+    images_removed: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "deleted": 2,
+                "not_found": ["product_missing"],
+                "images_removed": 5
+            }
+        }
+
+
+class ClickBucket(BaseModel):
+    start: datetime
+    clicks: int
+
+
+class ProductClicksResponse(BaseModel):
+    product_id: str
+    granularity: str
+    buckets: List[ClickBucket]
+    total: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "product_id": "product_abc123",
+                "granularity": "hour",
+                "buckets": [
+                    {"start": "2025-07-24T09:00:00Z", "clicks": 4},
+                    {"start": "2025-07-24T10:00:00Z", "clicks": 11}
+                ],
+                "total": 15
+            }
+        }
+
+
 class ErrorResponse(BaseModel):
     detail: str
@@ -1,5 +1,8 @@
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from datetime import date
+from typing import Dict, List
+
+from app.schemas.product import ImageVariantUrls
 
 
 class PublicProductResponse(BaseModel):
@@ -7,6 +10,7 @@ class PublicProductResponse(BaseModel):
     name: str
     price: float
     image_urls: List[str] = []
+    image_variants: List[ImageVariantUrls] = []  # Same order as image_urls
     description: str | None = None
     is_available: bool = True
 
@@ -18,6 +22,10 @@ class PublicProductResponse(BaseModel):
                 "name": "Cool T-Shirt",
                 "price": 5000,
                 "image_urls": ["/path/to/image1.jpg", "/path/to/image2.jpg"],
+                "image_variants": [
+                    {"thumbnail": "/path/to/image1_thumbnail.webp", "medium": "/path/to/image1_medium.webp", "full": "/path/to/image1_full.webp"},
+                    {"thumbnail": None, "medium": None, "full": None}
+                ],
                 "description": "Comfortable cotton t-shirt in various colors",
                 "is_available": True
             }
@@ -30,6 +38,7 @@ class StorefrontResponse(BaseModel):
     products: List[PublicProductResponse]
     banner_url: str | None = None
     store_slug: str | None = None
+    next_cursor: str | None = None
 
     class Config:
         json_schema_extra = {
@@ -47,7 +56,85 @@ class StorefrontResponse(BaseModel):
                         "description": "Comfortable cotton t-shirt in various colors",
                         "is_available": True
                     }
-                ]
+                ],
+                "next_cursor": "WyIyMDI1LTA3LTI0VDEwOjMwOjAwIiwicHJvZHVjdF91dWlkXzEiXQ"
+            }
+        }
+
+
+class ProductSearchResponse(BaseModel):
+    products: List[PublicProductResponse]
+    next_cursor: str | None = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "products": [
+                    {
+                        "id": "product_uuid_1",
+                        "name": "Cool T-Shirt",
+                        "price": 5000,
+                        "image_urls": ["/path/to/image1.jpg"],
+                        "description": "Comfortable cotton t-shirt in various colors",
+                        "is_available": True
+                    }
+                ],
+                "next_cursor": None
+            }
+        }
+
+
+class StorefrontBatchRequest(BaseModel):
+    identifiers: List[str] = Field(..., min_length=1, max_length=100)
+    limit: int = Field(12, ge=1, le=50)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "identifiers": ["awesome-wears", "janedoe"],
+                "limit": 12
+            }
+        }
+
+
+class StorefrontBatchResponse(BaseModel):
+    stores: Dict[str, StorefrontResponse | None]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "stores": {
+                    "awesome-wears": {
+                        "vendor_name": "Awesome Wears",
+                        "whatsapp_number": "2348012345678",
+                        "banner_url": None,
+                        "store_slug": "awesome-wears",
+                        "products": [],
+                        "next_cursor": None
+                    },
+                    "unknown-store": None
+                }
+            }
+        }
+
+
+class DailyViews(BaseModel):
+    date: date
+    views: int
+
+
+class StorefrontViewsResponse(BaseModel):
+    days: List[DailyViews]
+    total: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "days": [
+                    {"date": "2025-07-23", "views": 12},
+                    {"date": "2025-07-24", "views": 31}
+                ],
+                "total": 43
             }
         }
 
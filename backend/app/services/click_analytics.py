@@ -0,0 +1,306 @@
+"""
+Product Click Analytics Service for Quick Vendor
+Incremental hourly/daily rollups of click events and event retention
+"""
+
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import takewhile
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.product_click import (
+    ProductClickDaily,
+    ProductClickEvent,
+    ProductClickHourly,
+    RollupWatermark,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Watermark row used by the click rollup job
+WATERMARK_NAME = "product_click_rollups"
+
+# Events read per rollup transaction
+ROLLUP_BATCH_SIZE = 5000
+
+# Events younger than this are left for the next run, so a flush that
+# commits out of ID order is never skipped by the watermark
+ROLLUP_SETTLE_SECONDS = 60
+
+# Rows written per upsert statement
+UPSERT_BATCH_SIZE = 500
+
+# Events deleted per pruning transaction
+PRUNE_BATCH_SIZE = 5000
+
+# Granularity -> (bucket width, maximum buckets per request)
+GRANULARITIES = {
+    "hour": (timedelta(hours=1), 24 * 31),
+    "day": (timedelta(days=1), 366),
+}
+
+# Buckets returned when `from` is not given
+DEFAULT_BUCKETS = {"hour": 24, "day": 30}
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Convert a timestamp to aware UTC; naive values (SQLite, query strings) are taken as UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _insert_for(db: Session):
+    return sqlite_insert if db.get_bind().dialect.name == "sqlite" else postgresql_insert
+
+
+def _add_counts(db: Session, model, key_columns: List[Any], rows: List[Dict[str, Any]]) -> None:
+    """Upsert rows, adding `clicks` to existing rows with the same key."""
+    insert = _insert_for(db)
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = insert(model).values(rows[start:start + UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={"clicks": model.clicks + stmt.excluded.clicks}
+        )
+        db.execute(stmt)
+
+
+def _read_watermark(db: Session) -> int:
+    """Return the rollup watermark, creating it at 0 if missing."""
+    insert = _insert_for(db)
+    db.execute(
+        insert(RollupWatermark).values(name=WATERMARK_NAME, last_event_id=0).on_conflict_do_nothing()
+    )
+    return db.execute(
+        select(RollupWatermark.last_event_id).where(RollupWatermark.name == WATERMARK_NAME)
+    ).scalar_one()
+
+
+def _rollup_batch(db: Session, cutoff: datetime, batch_size: int) -> Tuple[int, bool]:
+    """
+    Fold the next batch of events after the watermark into the rollups.
+
+    The rollup upserts and the watermark move commit together, and the
+    watermark is advanced with a compare-and-set so concurrent jobs cannot
+    count the same events twice.
+
+    Returns:
+        Tuple of (events rolled up, whether more may be waiting)
+    """
+    watermark = _read_watermark(db)
+    rows = db.connection().execute(
+        select(ProductClickEvent.id, ProductClickEvent.product_id, ProductClickEvent.clicked_at)
+        .where(ProductClickEvent.id > watermark)
+        .order_by(ProductClickEvent.id)
+        .limit(batch_size)
+    ).all()
+
+    # Stop at the first unsettled event so the watermark never passes it
+    events = list(takewhile(lambda row: _as_utc(row.clicked_at) <= cutoff, rows))
+    if not events:
+        db.commit()
+        return 0, False
+
+    hourly = Counter()
+    daily = Counter()
+    for _, product_id, clicked_at in events:
+        clicked_at = _as_utc(clicked_at)
+        hourly[(product_id, clicked_at.replace(minute=0, second=0, microsecond=0))] += 1
+        daily[(product_id, clicked_at.date())] += 1
+
+    _add_counts(db, ProductClickHourly, [ProductClickHourly.product_id, ProductClickHourly.hour], [
+        {"product_id": product_id, "hour": hour, "clicks": clicks}
+        for (product_id, hour), clicks in hourly.items()
+    ])
+    _add_counts(db, ProductClickDaily, [ProductClickDaily.product_id, ProductClickDaily.day], [
+        {"product_id": product_id, "day": day, "clicks": clicks}
+        for (product_id, day), clicks in daily.items()
+    ])
+
+    moved = db.execute(
+        update(RollupWatermark)
+        .where(RollupWatermark.name == WATERMARK_NAME, RollupWatermark.last_event_id == watermark)
+        .values(last_event_id=events[-1].id)
+    )
+    if moved.rowcount != 1:
+        db.rollback()
+        logger.info("Click rollup watermark moved concurrently; skipping batch")
+        return 0, False
+
+    db.commit()
+    return len(events), len(events) == len(rows) == batch_size
+
+
+def rollup_click_events(
+    db: Session,
+    now: Optional[datetime] = None,
+    batch_size: int = ROLLUP_BATCH_SIZE,
+    settle_seconds: int = ROLLUP_SETTLE_SECONDS
+) -> int:
+    """
+    Add click events recorded since the last run to the hourly and daily rollups.
+
+    Args:
+        db: Database session
+        now: Current time (defaults to the clock)
+        batch_size: Events processed per transaction
+        settle_seconds: Leave events younger than this for the next run
+
+    Returns:
+        Number of events rolled up
+    """
+    cutoff = _as_utc(now or datetime.now(timezone.utc)) - timedelta(seconds=settle_seconds)
+    total = 0
+    more = True
+    while more:
+        processed, more = _rollup_batch(db, cutoff, batch_size)
+        total += processed
+    return total
+
+
+def prune_click_events(
+    db: Session,
+    retention_days: int,
+    now: Optional[datetime] = None,
+    batch_size: int = PRUNE_BATCH_SIZE
+) -> int:
+    """
+    Delete raw click events older than the retention window.
+
+    Events are deleted in batches, each in its own transaction, so locks
+    stay short. Events not yet rolled up are never deleted.
+
+    Args:
+        db: Database session
+        retention_days: Days of raw events to keep (0 keeps everything)
+        now: Current time (defaults to the clock)
+        batch_size: Events deleted per transaction
+
+    Returns:
+        Number of events deleted
+    """
+    if retention_days <= 0:
+        return 0
+
+    cutoff = _as_utc(now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    watermark = _read_watermark(db)
+    db.commit()
+
+    deleted = 0
+    while True:
+        expired = select(ProductClickEvent.id).where(
+            ProductClickEvent.clicked_at < cutoff,
+            ProductClickEvent.id <= watermark
+        ).order_by(ProductClickEvent.id).limit(batch_size)
+        result = db.execute(
+            delete(ProductClickEvent).where(ProductClickEvent.id.in_(expired.scalar_subquery()))
+        )
+        db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+def run_click_rollup() -> Dict[str, int]:
+    """Roll up and prune click events with a fresh session (used by the background job)."""
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        rolled_up = rollup_click_events(db)
+        pruned = prune_click_events(db, settings.CLICK_EVENT_RETENTION_DAYS)
+        if rolled_up or pruned:
+            logger.info(f"Click rollup: {rolled_up} events rolled up, {pruned} pruned")
+        return {"rolled_up": rolled_up, "pruned": pruned}
+    finally:
+        db.close()
+
+
+def click_series_range(
+    granularity: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    now: Optional[datetime] = None
+) -> Tuple[datetime, datetime]:
+    """
+    Resolve the first and last bucket of a click series request.
+
+    Both ends are truncated to their bucket and are inclusive. `end`
+    defaults to now and `start` to DEFAULT_BUCKETS buckets before it.
+
+    Raises:
+        ValueError: If start is after end or the range has too many buckets
+    """
+    width, max_buckets = GRANULARITIES[granularity]
+
+    def truncate(value: datetime) -> datetime:
+        value = _as_utc(value).replace(minute=0, second=0, microsecond=0)
+        return value.replace(hour=0) if granularity == "day" else value
+
+    last = truncate(end or now or datetime.now(timezone.utc))
+    first = truncate(start) if start else last - width * (DEFAULT_BUCKETS[granularity] - 1)
+
+    if first > last:
+        raise ValueError("'from' must not be after 'to'")
+    if (last - first) // width + 1 > max_buckets:
+        raise ValueError(f"At most {max_buckets} {granularity} buckets can be requested")
+    return first, last
+
+
+def get_click_series(
+    db: Session,
+    product_id: str,
+    granularity: str,
+    first: datetime,
+    last: datetime
+) -> List[Dict[str, Any]]:
+    """
+    Read a product's click counts per hour or day from the rollups.
+
+    Args:
+        db: Database session
+        product_id: Product whose clicks are read
+        granularity: "hour" or "day"
+        first: First bucket (from click_series_range)
+        last: Last bucket, inclusive
+
+    Returns:
+        One {"start", "clicks"} dict per bucket, oldest first, including
+        buckets without clicks; starts are UTC
+    """
+    width, _ = GRANULARITIES[granularity]
+
+    if granularity == "hour":
+        rows = db.execute(
+            select(ProductClickHourly.hour, ProductClickHourly.clicks).where(
+                ProductClickHourly.product_id == product_id,
+                ProductClickHourly.hour >= first,
+                ProductClickHourly.hour <= last
+            )
+        ).all()
+        totals = {_as_utc(hour): clicks for hour, clicks in rows}
+    else:
+        rows = db.execute(
+            select(ProductClickDaily.day, ProductClickDaily.clicks).where(
+                ProductClickDaily.product_id == product_id,
+                ProductClickDaily.day >= first.date(),
+                ProductClickDaily.day <= last.date()
+            )
+        ).all()
+        totals = {datetime.combine(day, datetime.min.time(), timezone.utc): clicks for day, clicks in rows}
+
+    buckets = []
+    bucket = first
+    while bucket <= last:
+        buckets.append({"start": bucket, "clicks": totals.get(bucket, 0)})
+        bucket += width
+    return buckets
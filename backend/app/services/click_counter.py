@@ -0,0 +1,184 @@
+"""
+Product Click Counter Service for Quick Vendor
+Write-behind buffering of product click counts and click events
+"""
+
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.models.product_click import ProductClickEvent
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Increment click_count by a buffered amount; updated_at is left alone so
+# clicks do not count as product edits
+_ADD_CLICKS = (
+    update(Product.__table__)
+    .where(Product.__table__.c.id == bindparam("product_id"))
+    .values(
+        click_count=Product.__table__.c.click_count + bindparam("clicks"),
+        updated_at=Product.__table__.c.updated_at
+    )
+)
+
+# Product IDs checked per existence query when flushing
+EXISTS_BATCH_SIZE = 500
+
+
+def _as_utc(value: Optional[datetime]) -> datetime:
+    """Aware UTC time of a click (now if not given; naive values are taken as UTC)."""
+    if value is None:
+        return datetime.now(timezone.utc)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _existing_product_ids(db: Session, product_ids: List[str]) -> Set[str]:
+    """Return the subset of product IDs that still exist."""
+    existing = set()
+    for start in range(0, len(product_ids), EXISTS_BATCH_SIZE):
+        batch = product_ids[start:start + EXISTS_BATCH_SIZE]
+        existing.update(db.connection().execute(
+            select(Product.id).where(Product.id.in_(batch))
+        ).scalars())
+    return existing
+
+
+class ClickAggregator:
+    """
+    In-process buffer of product clicks.
+
+    Recording a click appends (product ID, time) to a list under a lock.
+    flush() adds the per-product totals with one executemany UPDATE (so
+    concurrent workers never overwrite each other's clicks) and appends
+    the clicks to product_click_events in the same transaction. Clicks on
+    products that do not exist are dropped.
+    """
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self._pending: List[Tuple[str, datetime]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.recorded = 0
+        self.flushed = 0
+        self.flushes = 0
+
+    def record(self, product_id: str, now: Optional[datetime] = None) -> bool:
+        """
+        Count one click on a product.
+
+        Returns:
+            True if the buffer reached max_pending and should be flushed
+        """
+        with self._lock:
+            self._pending.append((product_id, _as_utc(now)))
+            self.recorded += 1
+            return self.max_pending > 0 and len(self._pending) >= self.max_pending
+
+    def pending_clicks(self) -> int:
+        """Number of clicks not yet written to the database."""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, db: Session, wait: bool = True) -> int:
+        """
+        Add pending counts to products.click_count and record the events.
+
+        Only one flush runs at a time. On failure the counts are put back
+        so they are retried on the next flush.
+
+        Args:
+            db: Database session
+            wait: Block until a running flush finishes; if False, return
+                immediately when another flush is in progress
+
+        Returns:
+            Number of clicks written
+        """
+        if not self._flush_lock.acquire(blocking=wait):
+            return 0
+
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, []
+
+            if not pending:
+                return 0
+
+            try:
+                existing = _existing_product_ids(db, list({product_id for product_id, _ in pending}))
+                clicks = [(product_id, clicked_at) for product_id, clicked_at in pending if product_id in existing]
+                if clicks:
+                    conn = db.connection()
+                    conn.execute(_ADD_CLICKS, [
+                        {"product_id": product_id, "clicks": count}
+                        for product_id, count in Counter(product_id for product_id, _ in clicks).items()
+                    ])
+                    conn.execute(insert(ProductClickEvent), [
+                        {"product_id": product_id, "clicked_at": clicked_at}
+                        for product_id, clicked_at in clicks
+                    ])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to flush product clicks: {str(e)}")
+                with self._lock:
+                    self._pending[:0] = pending
+                return 0
+
+            written = len(clicks)
+            with self._lock:
+                self.flushed += written
+                self.flushes += 1
+            return written
+        finally:
+            self._flush_lock.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Return aggregator counters for monitoring."""
+        with self._lock:
+            return {
+                "pending_products": len({product_id for product_id, _ in self._pending}),
+                "pending_clicks": len(self._pending),
+                "recorded": self.recorded,
+                "flushed": self.flushed,
+                "flushes": self.flushes
+            }
+
+
+# Create a singleton instance
+click_aggregator = None
+
+def get_click_aggregator() -> ClickAggregator:
+    """
+    Get or create the ClickAggregator singleton instance.
+
+    Returns:
+        ClickAggregator instance
+    """
+    global click_aggregator
+    if click_aggregator is None:
+        from app.core.config import settings
+        click_aggregator = ClickAggregator(max_pending=settings.CLICK_FLUSH_MAX_PENDING)
+    return click_aggregator
+
+
+def flush_product_clicks(wait: bool = True) -> int:
+    """Flush pending clicks with a fresh session (used by the background job)."""
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return get_click_aggregator().flush(db, wait=wait)
+    finally:
+        db.close()
@@ -0,0 +1,273 @@
+"""
+Image Blob Service for Quick Vendor
+Content-addressed, reference-counted storage of product images
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import Counter
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.image_blob import ImageBlob, BLOB_STORAGE_S3, BLOB_STORAGE_LOCAL
+from app.services import image_storage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# S3 folder for content-addressed objects: {folder}/{sha256}{extension}
+BLOB_S3_FOLDER = "qv-products-img/blobs"
+
+# URLs looked up per IN query when releasing
+RELEASE_BATCH_SIZE = 500
+
+
+def hash_stream(source: BinaryIO) -> Tuple[str, int]:
+    """
+    SHA-256 and size of a stream, read in chunks from its current position.
+
+    The stream is rewound to where it started. Blocking; the upload is
+    already spooled locally, so this is a disk read, not a network one.
+    """
+    start = source.tell()
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = source.read(image_storage.LOCAL_COPY_CHUNK_BYTES)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+    source.seek(start)
+    return digest.hexdigest(), size
+
+
+def blob_filename(sha256: str, filename: str) -> str:
+    """Storage name of a blob; the extension of the first upload is kept for serving."""
+    return f"{sha256}{os.path.splitext(filename or '')[1].lower()}"
+
+
+def acquire_blob(sha256: str, storage: str) -> Optional[str]:
+    """Add a reference to a blob stored on `storage`; returns its URL, or None if it is not stored there."""
+    db = SessionLocal()
+    try:
+        blob = (
+            db.query(ImageBlob)
+            .filter(ImageBlob.sha256 == sha256, ImageBlob.storage == storage)
+            .with_for_update()
+            .first()
+        )
+        if blob is None:
+            db.rollback()
+            return None
+        blob.ref_count += 1
+        db.commit()
+        return blob.url
+    finally:
+        db.close()
+
+
+def acquire_image_urls(urls: Iterable[str]) -> bool:
+    """
+    Add a reference to each blob behind `urls` (once per occurrence).
+
+    All or nothing: if any URL is not a stored blob, nothing changes.
+    """
+    counts = Counter(urls)
+    db = SessionLocal()
+    try:
+        blobs = db.query(ImageBlob).filter(ImageBlob.url.in_(list(counts))).with_for_update().all()
+        if len(blobs) != len(counts):
+            db.rollback()
+            return False
+        for blob in blobs:
+            blob.ref_count += counts[blob.url]
+        db.commit()
+        return True
+    finally:
+        db.close()
+
+
+def register_blob(sha256: str, storage: str, url: str, size: int, content_type: Optional[str] = None) -> str:
+    """
+    Record a newly stored blob with one reference.
+
+    If another upload of the same bytes to the same backend registered
+    first, a reference to that blob is taken instead.
+
+    Returns:
+        URL of the registered blob (not `url` if another upload won)
+    """
+    for _ in range(3):
+        db = SessionLocal()
+        try:
+            db.add(ImageBlob(
+                sha256=sha256, storage=storage, url=url, size=size, content_type=content_type, ref_count=1
+            ))
+            db.commit()
+            return url
+        except IntegrityError:
+            db.rollback()
+        finally:
+            db.close()
+
+        existing = acquire_blob(sha256, storage)
+        if existing:
+            return existing
+    raise RuntimeError(f"Could not register image blob {sha256}")
+
+
+def reuse_blob_variants(url: str) -> Optional[Dict[str, str]]:
+    """
+    Take references to the variants recorded for the blob behind `url`.
+
+    Returns:
+        Variant name -> URL, or None if the blob has no complete set of
+        variants that are still stored
+    """
+    db = SessionLocal()
+    try:
+        variants = db.query(ImageBlob.variants).filter(ImageBlob.url == url).scalar()
+    finally:
+        db.close()
+
+    if not variants or not acquire_image_urls(variants.values()):
+        return None
+    return dict(variants)
+
+
+def record_blob_variants(url: str, variants: Dict[str, str]) -> None:
+    """Remember the variants generated from the blob behind `url`."""
+    db = SessionLocal()
+    try:
+        db.query(ImageBlob).filter(ImageBlob.url == url).update({"variants": variants})
+        db.commit()
+    finally:
+        db.close()
+
+
+async def store_image_blob(
+    file_obj: BinaryIO,
+    filename: str,
+    content_type: Optional[str] = None,
+    s3_manager=None,
+    local_fallback: bool = True
+) -> str:
+    """
+    Store an image under its content hash, or reuse an identical one.
+
+    The spooled file is hashed first; if a blob with the same SHA-256
+    exists on the target backend (S3 when `s3_manager` is given and
+    configured, local storage otherwise) it gains a reference and nothing
+    is uploaded. A copy on the other backend is never reused, so a local
+    fallback left by an earlier S3 outage does not stand in for S3.
+    Otherwise the file is streamed to the target backend and registered
+    with one reference. Every URL returned must eventually be passed to
+    release_image_urls.
+
+    Args:
+        file_obj: Readable binary stream of the image
+        filename: Original filename (its extension names the blob)
+        content_type: MIME type of the image
+        s3_manager: S3Manager to store new blobs with; local storage if None
+        local_fallback: Store locally if the S3 upload fails (otherwise raise)
+
+    Returns:
+        Public URL of the blob
+    """
+    start = file_obj.tell()
+    sha256, size = await asyncio.to_thread(hash_stream, file_obj)
+
+    name = blob_filename(sha256, filename)
+    url = None
+    if s3_manager is not None and s3_manager.is_s3_configured():
+        url = await asyncio.to_thread(acquire_blob, sha256, BLOB_STORAGE_S3)
+        if url:
+            logger.info(f"Reusing stored image {sha256} for {filename}")
+            return url
+        try:
+            url = await s3_manager.upload_image_object(file_obj, f"{BLOB_S3_FOLDER}/{name}", filename, content_type)
+            storage = BLOB_STORAGE_S3
+        except Exception as e:
+            if not local_fallback:
+                raise
+            logger.error(f"S3 upload failed, falling back to local: {str(e)}")
+            file_obj.seek(start)
+
+    if url is None:
+        url = await asyncio.to_thread(acquire_blob, sha256, BLOB_STORAGE_LOCAL)
+        if url:
+            logger.info(f"Reusing stored image {sha256} for {filename}")
+            return url
+        await asyncio.to_thread(
+            image_storage.write_local_file,
+            file_obj,
+            os.path.join(image_storage.UPLOAD_DIR, name),
+            settings.LOCAL_STORAGE_FSYNC
+        )
+        url = image_storage.local_url(name)
+        storage = BLOB_STORAGE_LOCAL
+
+    registered = await asyncio.to_thread(register_blob, sha256, storage, url, size, content_type)
+    if registered != url:
+        # An identical upload to the same backend registered first
+        await asyncio.to_thread(image_storage.delete_image_urls, [url])
+    return registered
+
+
+def _blobs_for_urls(db, urls: List[str]) -> List[ImageBlob]:
+    blobs = []
+    for start in range(0, len(urls), RELEASE_BATCH_SIZE):
+        batch = urls[start:start + RELEASE_BATCH_SIZE]
+        blobs += db.query(ImageBlob).filter(ImageBlob.url.in_(batch)).with_for_update().all()
+    return blobs
+
+
+def release_image_urls(urls: Iterable[Optional[str]]) -> Dict[str, int]:
+    """
+    Drop one reference per URL and remove files nothing refers to any more.
+
+    Blob rows reaching zero references are deleted and committed before
+    any file is touched, so a failed commit never leaves rows pointing at
+    deleted files. Files whose URL was registered again by a concurrent
+    upload of the same bytes in the meantime are kept. URLs that are not
+    blobs (images stored before content addressing) are removed directly.
+    Blocking; run it after the change dropping the references has
+    committed, off the event loop.
+
+    Returns:
+        Dict with the number of S3 objects and local files deleted
+    """
+    counts = Counter(url for url in urls if url)
+    if not counts:
+        return {"s3_deleted": 0, "local_deleted": 0}
+
+    db = SessionLocal()
+    try:
+        blobs = _blobs_for_urls(db, list(counts))
+        blob_urls = {blob.url for blob in blobs}
+        unreferenced = [blob.url for blob in blobs if blob.ref_count - counts[blob.url] <= 0]
+        for blob in blobs:
+            if blob.url in unreferenced:
+                db.delete(blob)
+            else:
+                blob.ref_count -= counts[blob.url]
+        db.commit()
+
+        reregistered = {blob.url for blob in _blobs_for_urls(db, unreferenced)}
+        db.rollback()
+        return image_storage.delete_image_urls(
+            [url for url in counts if url not in blob_urls]
+            + [url for url in unreferenced if url not in reregistered]
+        )
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to release images: {str(e)}")
+        return {"s3_deleted": 0, "local_deleted": 0}
+    finally:
+        db.close()
@@ -0,0 +1,204 @@
+"""
+Image Storage Service for Quick Vendor
+Maps stored image URLs back to S3 keys or local files and removes them in bulk
+"""
+
+import logging
+import os
+import tempfile
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from fastapi import HTTPException, UploadFile, status
+
+from app.core.config import settings
+from app.services.s3_manager import get_s3_manager
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Directory served at /uploads (see main.py)
+UPLOAD_DIR = "uploads"
+
+# Host suffix of S3 object URLs built by S3Manager
+S3_URL_MARKER = ".amazonaws.com/"
+
+# Largest accepted image files
+MAX_PRODUCT_IMAGE_BYTES = 10 * 1024 * 1024
+MAX_BANNER_BYTES = 5 * 1024 * 1024
+
+# Allowance for multipart boundaries, headers and form fields around files
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Bytes copied per read when writing a local upload
+LOCAL_COPY_CHUNK_BYTES = 1024 * 1024
+
+# LOCAL_STORAGE_FSYNC values: "none" leaves flushing to the OS, "file"
+# syncs each file before it is renamed into place, "full" also syncs the
+# directory so the rename itself survives a crash
+FSYNC_POLICIES = ("none", "file", "full")
+
+
+def upload_size(upload: UploadFile) -> int:
+    """Size of a received upload without reading it into memory."""
+    if upload.size is not None:
+        return upload.size
+    upload.file.seek(0, os.SEEK_END)
+    size = upload.file.tell()
+    upload.file.seek(0)
+    return size
+
+
+def ensure_upload_size(upload: UploadFile, max_bytes: int) -> BinaryIO:
+    """
+    Check an upload against a size limit and return its file rewound.
+
+    The multipart parser has already spooled the upload (to disk past
+    1MB), so the returned file can be streamed to storage as is.
+
+    Raises:
+        HTTPException: 413 if the file is larger than max_bytes
+    """
+    size = upload_size(upload)
+    if size > max_bytes:
+        logger.warning(f"Rejected upload {upload.filename}: {size} bytes")
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File size exceeds maximum allowed size of {max_bytes // (1024 * 1024)}MB. "
+                   f"Your file: {size / (1024 * 1024):.2f}MB"
+        )
+    upload.file.seek(0)
+    return upload.file
+
+
+def _fsync_directory(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Not supported on this platform
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_local_file(source: BinaryIO, path: str, fsync: str = "file") -> int:
+    """
+    Copy a stream to `path` atomically.
+
+    Data is copied in LOCAL_COPY_CHUNK_BYTES chunks to a hidden temporary
+    file in the same directory, which is then renamed over `path`, so a
+    partially written image is never visible under /uploads. Blocking; call
+    it through asyncio.to_thread from request handlers.
+
+    Args:
+        source: Readable binary stream (read from its current position)
+        path: Destination file path
+        fsync: One of FSYNC_POLICIES
+
+    Returns:
+        Number of bytes written
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while True:
+                chunk = source.read(LOCAL_COPY_CHUNK_BYTES)
+                if not chunk:
+                    break
+                tmp.write(chunk)
+                written += len(chunk)
+            tmp.flush()
+            if fsync in ("file", "full"):
+                os.fsync(tmp.fileno())
+        # mkstemp creates owner-only files; match a normal upload
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    if fsync == "full":
+        _fsync_directory(directory)
+    return written
+
+
+def local_url(filename: str) -> str:
+    """URL of a file in UPLOAD_DIR (absolute when BASE_URL is set)."""
+    return f"{settings.BASE_URL or ''}/uploads/{filename}"
+
+
+def s3_key_from_url(url: str) -> Optional[str]:
+    """Return the object key of an S3 image URL, or None for other URLs."""
+    if url.startswith("https://") and ".s3." in url and S3_URL_MARKER in url:
+        return url.split(S3_URL_MARKER, 1)[-1] or None
+    return None
+
+
+def local_path_from_url(url: str) -> Optional[str]:
+    """
+    Return the file behind an /uploads URL (relative or on BASE_URL), or None.
+
+    Only the file name is kept, so a URL can never point outside UPLOAD_DIR.
+    """
+    path = urlparse(url).path
+    if not path.startswith("/uploads/"):
+        return None
+    filename = os.path.basename(path)
+    return os.path.join(UPLOAD_DIR, filename) if filename else None
+
+
+def split_image_urls(urls: Iterable[Optional[str]]) -> Tuple[List[str], List[str]]:
+    """Split image URLs into (S3 keys, local file paths); others are skipped."""
+    s3_keys = []
+    local_paths = []
+    for url in urls:
+        if not url:
+            continue
+        s3_key = s3_key_from_url(url)
+        if s3_key:
+            s3_keys.append(s3_key)
+            continue
+        local_path = local_path_from_url(url)
+        if local_path:
+            local_paths.append(local_path)
+    return s3_keys, local_paths
+
+
+def delete_local_files(paths: Iterable[str]) -> int:
+    """Unlink local files, ignoring ones that are already gone."""
+    deleted = 0
+    for path in dict.fromkeys(paths):
+        try:
+            os.remove(path)
+            deleted += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Failed to delete {path}: {str(e)}")
+    return deleted
+
+
+def delete_image_urls(urls: Iterable[Optional[str]]) -> Dict[str, int]:
+    """
+    Remove the stored files behind a set of image URLs.
+
+    S3 objects are deleted with batched DeleteObjects requests (up to 1000
+    keys each) and local uploads are unlinked. Blocking; run it after the
+    database change has committed, off the event loop.
+
+    Returns:
+        Dict with the number of S3 objects and local files deleted
+    """
+    s3_keys, local_paths = split_image_urls(urls)
+    return {
+        "s3_deleted": get_s3_manager().delete_objects(s3_keys),
+        "local_deleted": delete_local_files(local_paths),
+    }
@@ -0,0 +1,276 @@
+"""
+Image Variant Service for Quick Vendor
+Resized WebP/JPEG copies of product images for responsive storefronts
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional
+
+from fastapi import BackgroundTasks, UploadFile
+
+from app.core.config import settings
+from app.models.product import VARIANT_WIDTHS
+from app.services import image_storage
+from app.services.image_blobs import record_blob_variants, release_image_urls, reuse_blob_variants, store_image_blob
+from app.services.s3_manager import get_s3_manager
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Import Pillow only when available; without it images are served as uploaded
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    logger.warning("Pillow not available - image variants will not be generated")
+    Image = None
+    ImageOps = None
+    PIL_AVAILABLE = False
+
+# IMAGE_VARIANT_FORMAT -> (Pillow format, file extension, content type)
+VARIANT_FORMATS = {
+    "webp": ("WEBP", ".webp", "image/webp"),
+    "jpeg": ("JPEG", ".jpg", "image/jpeg"),
+}
+
+
+def variants_enabled() -> bool:
+    """Whether variants are generated for new uploads."""
+    return PIL_AVAILABLE and settings.IMAGE_VARIANTS_ENABLED
+
+
+def variant_urls(variants: Optional[Dict[str, Any]], slots: Optional[Iterable[int]] = None) -> List[str]:
+    """All stored variant URLs of a product, or of some of its image slots."""
+    if not variants:
+        return []
+    keys = variants.keys() if slots is None else [str(slot) for slot in slots]
+    return [url for key in keys for url in (variants.get(key) or {}).values() if url]
+
+
+def drop_slot_variants(product: Any, slot: int) -> List[str]:
+    """
+    Forget the variants of one image slot on a product model.
+
+    Call before committing a change that replaces or removes the image;
+    delete the returned URLs once the change has committed.
+    """
+    variants = dict(product.image_variants or {})
+    removed = variants.pop(str(slot), None)
+    if removed is not None:
+        product.image_variants = variants or None
+    return [url for url in (removed or {}).values() if url]
+
+
+def render_variants(source_path: str, output_dir: str, image_format: str = "webp", quality: int = 80) -> Dict[str, str]:
+    """
+    Write a resized copy of an image for every VARIANT_WIDTHS entry.
+
+    CPU-bound; runs in the variant process pool.
+
+    Args:
+        source_path: Original image file
+        output_dir: Directory for the generated files
+        image_format: Key of VARIANT_FORMATS
+        quality: Encoder quality (1-100)
+
+    Returns:
+        Dict of variant name -> generated file path
+    """
+    pil_format, extension, _ = VARIANT_FORMATS[image_format]
+    outputs = {}
+    with Image.open(source_path) as image:
+        # JPEG decoders can scale down while decoding; ask for no more than
+        # the largest variant needs
+        largest = max(VARIANT_WIDTHS.values())
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+
+        keeps_alpha = pil_format == "WEBP" and image.mode in ("RGBA", "LA", "P")
+        image = image.convert("RGBA" if keeps_alpha else "RGB")
+
+        # Largest first so each variant is resized from the previous one
+        for name, width in sorted(VARIANT_WIDTHS.items(), key=lambda item: -item[1]):
+            image.thumbnail((width, width * 10), Image.Resampling.LANCZOS)
+            path = os.path.join(output_dir, f"{name}{extension}")
+            image.save(path, pil_format, quality=quality, optimize=pil_format == "JPEG")
+            outputs[name] = path
+    return outputs
+
+
+# Create a singleton instance
+variant_pool = None
+
+def get_variant_pool() -> ProcessPoolExecutor:
+    """
+    Get or create the process pool that renders variants.
+
+    Returns:
+        ProcessPoolExecutor instance
+    """
+    global variant_pool
+    if variant_pool is None:
+        variant_pool = ProcessPoolExecutor(max_workers=max(1, settings.IMAGE_VARIANT_WORKERS))
+    return variant_pool
+
+
+def shutdown_variant_pool() -> None:
+    """Stop the variant workers (called on application shutdown)."""
+    global variant_pool
+    if variant_pool is not None:
+        variant_pool.shutdown(wait=False, cancel_futures=True)
+        variant_pool = None
+
+
+def copy_to_temp(source: BinaryIO) -> str:
+    """Copy a stream to a named temporary file the pool can open; returns its path."""
+    fd, path = tempfile.mkstemp(prefix="qv-variant-src-")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            shutil.copyfileobj(source, tmp, image_storage.LOCAL_COPY_CHUNK_BYTES)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+async def _store_variants(files: Dict[str, str], source_url: str, content_type: str) -> Dict[str, str]:
+    """Store rendered files as blobs in the original's backend; returns name -> URL."""
+    # S3 originals get S3 variants; a failed upload fails the whole set
+    s3_manager = get_s3_manager() if image_storage.s3_key_from_url(source_url) else None
+    urls = {}
+    try:
+        for name, path in files.items():
+            with open(path, "rb") as file_obj:
+                urls[name] = await store_image_blob(
+                    file_obj, os.path.basename(path), content_type, s3_manager, local_fallback=s3_manager is None
+                )
+    except Exception:
+        await asyncio.to_thread(release_image_urls, urls.values())
+        raise
+    return urls
+
+
+def _save_variants(product_id: str, slot: int, source_url: str, urls: Dict[str, str]) -> bool:
+    """
+    Record variant URLs for an image slot if it still holds `source_url`.
+
+    Variants already recorded for the slot (e.g. from a regeneration) are
+    swapped out under the same product lock and released once the new
+    ones have committed.
+
+    Returns:
+        False if the product was deleted or the image replaced meanwhile
+    """
+    from app.core.database import SessionLocal
+    from app.models.product import Product
+    from app.services.storefront import refresh_storefront
+
+    db = SessionLocal()
+    try:
+        product = db.query(Product).filter(Product.id == product_id).with_for_update().first()
+        if product is None or getattr(product, f"image_url_{slot}") != source_url:
+            db.rollback()
+            return False
+
+        replaced = drop_slot_variants(product, slot)
+        product.image_variants = {**(product.image_variants or {}), str(slot): urls}
+        db.commit()
+        refresh_storefront(db, product.user_id)
+        if replaced:
+            release_image_urls(replaced)
+        return True
+    finally:
+        db.close()
+
+
+async def generate_image_variants(
+    product_id: str,
+    slot: int,
+    source_url: str,
+    source_path: str,
+    remove_source: bool = False
+) -> Optional[Dict[str, str]]:
+    """
+    Render, store and record the variants of one product image.
+
+    Runs as a background task after the upload response. Failures are
+    logged; the product keeps serving its original image.
+
+    Args:
+        product_id: Product the image belongs to
+        slot: Image slot (1-5)
+        source_url: Stored URL of the original image
+        source_path: Local copy of the original
+        remove_source: Delete source_path when done (a temporary copy)
+
+    Returns:
+        Dict of variant name -> URL, or None if nothing was recorded
+    """
+    image_format = settings.IMAGE_VARIANT_FORMAT
+    urls: Dict[str, str] = {}
+    output_dir = None
+    try:
+        # Identical originals share a blob; reuse variants rendered for it
+        urls = await asyncio.to_thread(reuse_blob_variants, source_url) or {}
+        if not urls:
+            output_dir = tempfile.mkdtemp(prefix="qv-variants-")
+            files = await asyncio.get_running_loop().run_in_executor(
+                get_variant_pool(),
+                partial(render_variants, source_path, output_dir, image_format, settings.IMAGE_VARIANT_QUALITY)
+            )
+            urls = await _store_variants(files, source_url, VARIANT_FORMATS[image_format][2])
+            await asyncio.to_thread(record_blob_variants, source_url, urls)
+
+        if await asyncio.to_thread(_save_variants, product_id, slot, source_url, urls):
+            logger.info(f"Stored {len(urls)} variants for product {product_id}, slot {slot}")
+            return urls
+
+        logger.info(f"Image {slot} of product {product_id} changed; discarding its variants")
+    except Exception as e:
+        logger.error(f"Failed to generate variants for product {product_id}, slot {slot}: {str(e)}")
+    finally:
+        if output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        if remove_source:
+            image_storage.delete_local_files([source_path])
+
+    if urls:
+        await asyncio.to_thread(release_image_urls, urls.values())
+    return None
+
+
+async def schedule_image_variants(
+    background_tasks: BackgroundTasks,
+    product_id: str,
+    slot: int,
+    image_url: Optional[str],
+    upload: UploadFile
+) -> None:
+    """
+    Queue variant generation for a freshly stored product image.
+
+    Local originals are read in place; S3 originals are first copied from
+    the spooled upload to a temporary file, since the upload is closed
+    once the response is sent.
+    """
+    if not image_url or not variants_enabled():
+        return
+
+    local_path = image_storage.local_path_from_url(image_url)
+    if local_path:
+        source_path, remove_source = local_path, False
+    else:
+        try:
+            upload.file.seek(0)
+            source_path, remove_source = await asyncio.to_thread(copy_to_temp, upload.file), True
+        except Exception as e:
+            logger.error(f"Failed to queue variants for product {product_id}, slot {slot}: {str(e)}")
+            return
+
+    background_tasks.add_task(generate_image_variants, product_id, slot, image_url, source_path, remove_source)
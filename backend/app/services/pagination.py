@@ -0,0 +1,98 @@
+"""
+Keyset Pagination Helpers for Quick Vendor
+Opaque cursors and seek conditions for stable, index-friendly paging
+"""
+
+import json
+import base64
+from datetime import datetime
+from typing import Any, List, Sequence
+
+from sqlalchemy import literal, tuple_
+from sqlalchemy.orm import Session
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the sort-key values of the last row on a page as an opaque cursor.
+
+    Args:
+        values: Sort-key values in order (datetimes, numbers or strings)
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor string from a previous page
+        size: Number of sort-key values expected
+
+    Returns:
+        List of sort-key values
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(payload, list) or len(payload) != size:
+        raise ValueError("Invalid cursor")
+
+    values = []
+    for value in payload:
+        if isinstance(value, dict):
+            try:
+                value = datetime.fromisoformat(value["dt"])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("Invalid cursor")
+        values.append(value)
+    return values
+
+
+def _bind(db: Session, value: Any) -> Any:
+    """
+    Bind a cursor value for comparison against stored column values.
+
+    SQLite keeps server-generated timestamps as 'YYYY-MM-DD HH:MM:SS' text,
+    while SQLAlchemy would bind datetimes with a microsecond suffix, which
+    breaks equality on the tie-breaker. Bind them in the stored format.
+    """
+    if isinstance(value, datetime) and db.get_bind().dialect.name == "sqlite":
+        return literal(value.strftime("%Y-%m-%d %H:%M:%S"))
+    return literal(value)
+
+
+def keyset_condition(db: Session, columns: Sequence[Any], values: Sequence[Any], descending: bool):
+    """
+    Build the seek predicate that continues after the given sort-key values.
+
+    The comparison is expressed as a row-value comparison so that a
+    composite index on the same columns can serve it as a range scan.
+
+    Args:
+        db: Database session (used to pick dialect-specific binding)
+        columns: Sort columns, ending with a unique tie-breaker
+        values: Values of those columns on the last row already returned
+        descending: Whether the page is ordered descending
+
+    Returns:
+        SQLAlchemy boolean expression
+    """
+    left = tuple_(*columns)
+    right = tuple_(*[_bind(db, value) for value in values])
+    return left < right if descending else left > right
@@ -0,0 +1,167 @@
+"""
+Bulk Product Service for Quick Vendor
+Spreadsheet-style product import and set-based product updates
+"""
+
+import csv
+import io
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import Numeric, case, cast, func, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.product import Product, generate_product_id
+from app.schemas.product import ProductCreateRequest
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Largest import accepted in one request
+BULK_MAX_ROWS = 5000
+BULK_MAX_BYTES = 5 * 1024 * 1024
+
+# Rows per INSERT statement
+INSERT_CHUNK_SIZE = 500
+
+# Lowest price a multiplier may round down to
+MIN_PRICE = 0.01
+
+
+def parse_product_rows(content: bytes, content_type: str) -> List[Dict[str, Any]]:
+    """
+    Parse an import body into one dict per row.
+
+    CSV needs a header row naming ProductCreateRequest fields; empty cells
+    are treated as missing. JSON may be a list of objects or an object with
+    a "products" list.
+
+    Raises:
+        ValueError: If the body cannot be parsed or has too many rows
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("Body must be UTF-8 encoded")
+
+    if "csv" in content_type:
+        rows = [
+            {key.strip(): value for key, value in row.items() if key and value not in (None, "")}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+    elif "json" in content_type:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e.msg}")
+        if isinstance(data, dict):
+            data = data.get("products")
+        if not isinstance(data, list):
+            raise ValueError("JSON body must be a list of products")
+        rows = data
+    else:
+        raise ValueError("Content-Type must be text/csv or application/json")
+
+    if len(rows) > BULK_MAX_ROWS:
+        raise ValueError(f"At most {BULK_MAX_ROWS} rows can be imported at once")
+    return rows
+
+
+def validate_product_rows(
+    rows: Sequence[Any]
+) -> Tuple[List[ProductCreateRequest], List[Dict[str, Any]]]:
+    """
+    Validate rows with ProductCreateRequest.
+
+    Returns:
+        Tuple of (valid products, errors as {"row", "errors"} dicts with
+        1-based row numbers)
+    """
+    products = []
+    errors = []
+    for number, row in enumerate(rows, 1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "errors": ["Row must be an object"]})
+            continue
+        try:
+            products.append(ProductCreateRequest.model_validate(row))
+        except ValidationError as e:
+            errors.append({
+                "row": number,
+                "errors": [
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+                    for error in e.errors()
+                ]
+            })
+    return products, errors
+
+
+def insert_products(db: Session, vendor_id: str, products: Sequence[ProductCreateRequest]) -> List[str]:
+    """
+    Insert products for a vendor with chunked executemany INSERTs.
+
+    The caller commits.
+
+    Returns:
+        IDs of the new products, in input order
+    """
+    rows = [
+        {
+            "id": generate_product_id(),
+            "name": product.name,
+            "description": product.description,
+            "price": product.price,
+            "is_available": product.is_available,
+            "click_count": 0,
+            "user_id": vendor_id,
+        }
+        for product in products
+    ]
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.execute(insert(Product.__table__), rows[start:start + INSERT_CHUNK_SIZE])
+    return [row["id"] for row in rows]
+
+
+def bulk_update_products(
+    db: Session,
+    vendor_id: str,
+    product_ids: Optional[Sequence[str]] = None,
+    where_available: Optional[bool] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    is_available: Optional[bool] = None,
+    price: Optional[float] = None,
+    price_multiplier: Optional[float] = None
+) -> int:
+    """
+    Apply one change to every matching product with a single UPDATE.
+
+    Filters narrow the vendor's products (all of them if none are given).
+    A price multiplier is applied in SQL and rounded to 2 decimals, never
+    below MIN_PRICE (prices must stay positive). The caller commits.
+
+    Returns:
+        Number of products updated
+    """
+    values: Dict[str, Any] = {}
+    if is_available is not None:
+        values["is_available"] = is_available
+    if price is not None:
+        values["price"] = price
+    if price_multiplier is not None:
+        rounded = func.round(cast(Product.price * price_multiplier, Numeric), 2)
+        values["price"] = case((rounded < MIN_PRICE, MIN_PRICE), else_=rounded)
+
+    stmt = update(Product.__table__).where(Product.user_id == vendor_id).values(**values)
+    if product_ids is not None:
+        stmt = stmt.where(Product.id.in_(product_ids))
+    if where_available is not None:
+        stmt = stmt.where(Product.is_available == where_available)
+    if min_price is not None:
+        stmt = stmt.where(Product.price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(Product.price <= max_price)
+
+    return db.execute(stmt).rowcount
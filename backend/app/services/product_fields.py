@@ -0,0 +1,96 @@
+"""
+Product Field Projection for Quick Vendor
+Sparse fieldsets: select and serialize only the product fields a client asks for
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.models.product import Product, image_variant_list
+
+IMAGE_URL_COLUMNS = (
+    Product.image_url_1,
+    Product.image_url_2,
+    Product.image_url_3,
+    Product.image_url_4,
+    Product.image_url_5,
+)
+
+# Response field -> columns needed to build it, in ProductResponse order
+PRODUCT_FIELDS = {
+    "id": (Product.id,),
+    "name": (Product.name,),
+    "description": (Product.description,),
+    "price": (Product.price,),
+    "image_urls": IMAGE_URL_COLUMNS,
+    "image_variants": IMAGE_URL_COLUMNS + (Product.image_variants,),
+    "is_available": (Product.is_available,),
+    "click_count": (Product.click_count,),
+    "user_id": (Product.user_id,),
+    "created_at": (Product.created_at,),
+    "updated_at": (Product.updated_at,),
+}
+
+# Fields of PublicProductResponse (what storefronts may expose)
+PUBLIC_PRODUCT_FIELDS = ("id", "name", "price", "image_urls", "image_variants", "description", "is_available")
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated `fields` query parameter.
+
+    Args:
+        fields: Raw parameter value, or None when not given
+        allowed: Field names the endpoint exposes
+
+    Returns:
+        Requested field names in order without duplicates, or None for all
+
+    Raises:
+        ValueError: If the list is empty or names an unknown field
+    """
+    if fields is None:
+        return None
+
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in allowed]
+    if not requested or unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields requested")
+    return requested
+
+
+def product_projection(fields: Sequence[str]) -> Tuple[List[Any], Callable[[Sequence[Any]], Dict[str, Any]]]:
+    """
+    Plan a projected product query for the given fields.
+
+    The product ID is always selected first (it identifies rows and is the
+    pagination tie-breaker) but only appears in the output if requested.
+
+    Args:
+        fields: Field names from parse_fields
+
+    Returns:
+        Tuple of (columns to select, function turning a row of those
+        columns into a response dict)
+    """
+    columns = [Product.id]
+    positions = {Product.id.key: 0}
+    for field in fields:
+        for column in PRODUCT_FIELDS[field]:
+            if column.key not in positions:
+                positions[column.key] = len(columns)
+                columns.append(column)
+
+    plan = [(field, [positions[column.key] for column in PRODUCT_FIELDS[field]]) for field in fields]
+
+    def build(values: Sequence[Any]) -> Dict[str, Any]:
+        item = {}
+        for field, indexes in plan:
+            if field == "image_urls":
+                item[field] = [values[i] for i in indexes if values[i]]
+            elif field == "image_variants":
+                item[field] = image_variant_list([values[i] for i in indexes[:-1]], values[indexes[-1]])
+            else:
+                item[field] = values[indexes[0]]
+        return item
+
+    return columns, build
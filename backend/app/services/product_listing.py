@@ -0,0 +1,96 @@
+"""
+Product Listing Service for Quick Vendor
+Keyset-paginated, filterable listing of a vendor's own products
+"""
+
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.services.pagination import encode_cursor, keyset_condition
+from app.services.storefront import DEFAULT_SORT, STOREFRONT_SORTS
+
+# Vendor listing page size limits
+DEFAULT_LIST_SIZE = 50
+MAX_LIST_SIZE = 200
+
+
+def vendor_products_query(
+    db: Session,
+    vendor_id: str,
+    columns: Sequence[Any],
+    sort: str = DEFAULT_SORT,
+    is_available: Optional[bool] = None,
+    cursor_values: Optional[Sequence[Any]] = None
+):
+    """
+    Select a vendor's products in sort order, continuing after a cursor.
+
+    The sort column is selected last (as the cursor's sort value). Each sort
+    is served by an index on (user_id, <sort column>, id), or by the
+    storefront index when filtering on availability.
+
+    Args:
+        db: Database session (used to pick dialect-specific binding)
+        vendor_id: Owner of the products
+        columns: Product columns to select
+        sort: One of STOREFRONT_SORTS
+        is_available: Only include products with this availability
+        cursor_values: Decoded (sort value, id) of the previous page's last row
+    """
+    sort_column, descending = STOREFRONT_SORTS[sort]
+
+    stmt = select(*columns, sort_column.label("sort_key")).where(Product.user_id == vendor_id)
+    if is_available is not None:
+        stmt = stmt.where(Product.is_available == is_available)
+    if cursor_values:
+        stmt = stmt.where(keyset_condition(
+            db, [sort_column, Product.id], cursor_values, descending=descending
+        ))
+
+    if descending:
+        return stmt.order_by(sort_column.desc(), Product.id.desc())
+    return stmt.order_by(sort_column.asc(), Product.id.asc())
+
+
+def list_vendor_products(
+    db: Session,
+    vendor_id: str,
+    columns: Sequence[Any],
+    limit: Optional[int] = DEFAULT_LIST_SIZE,
+    sort: str = DEFAULT_SORT,
+    is_available: Optional[bool] = None,
+    cursor_values: Optional[Sequence[Any]] = None
+) -> Tuple[List[Sequence[Any]], Optional[str]]:
+    """
+    Fetch one page of a vendor's products (all of them if `limit` is None).
+
+    `columns` must start with Product.id (as product_projection does).
+    Other arguments match vendor_products_query.
+
+    Returns:
+        Tuple of (rows of the requested columns, cursor for the next page
+        or None on the last page)
+    """
+    stmt = vendor_products_query(db, vendor_id, columns, sort, is_available, cursor_values)
+    if limit is None:
+        return [row[:-1] for row in db.connection().execute(stmt)], None
+
+    rows = db.connection().execute(stmt.limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][-1], rows[-1][0]])
+
+    return [row[:-1] for row in rows], next_cursor
+
+
+def count_vendor_products(db: Session, vendor_id: str, is_available: Optional[bool] = None) -> int:
+    """Number of a vendor's products, optionally only those with the given availability."""
+    stmt = select(func.count(Product.id)).where(Product.user_id == vendor_id)
+    if is_available is not None:
+        stmt = stmt.where(Product.is_available == is_available)
+    return db.execute(stmt).scalar_one()
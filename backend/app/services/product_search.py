@@ -0,0 +1,134 @@
+"""
+Product Search Service for Quick Vendor
+Ranked full-text search over a single vendor's catalog
+"""
+
+import re
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Double, and_, bindparam, cast, column, func, literal_column, select, table
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.services.pagination import decode_cursor, encode_cursor, keyset_condition
+from app.services.storefront import PUBLIC_PRODUCT_COLUMNS, public_product_dict
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Searches use at most this many terms
+MAX_QUERY_TERMS = 8
+
+# PostgreSQL: must match the expression of idx_products_search exactly
+# (see migrations/add_product_search_index.py) for the GIN index to be used
+PG_SEARCH_DOCUMENT = (
+    "to_tsvector('simple', coalesce(products.name, '') || ' ' || coalesce(products.description, ''))"
+)
+
+# SQLite: external-content FTS5 table kept in sync by triggers
+SQLITE_FTS_TABLE = "products_fts"
+
+
+def query_terms(query: str) -> List[str]:
+    """
+    Split user input into plain search terms.
+
+    Only word characters are kept, so operators and quotes in the input can
+    never reach the FTS5 / tsquery parsers.
+    """
+    return re.findall(r"\w+", query.lower())[:MAX_QUERY_TERMS]
+
+
+def decode_search_cursor(cursor: str) -> List[Any]:
+    """
+    Decode a search cursor: a numeric rank and a product id.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    rank, product_id = values = decode_cursor(cursor, 2)
+    if not isinstance(rank, (int, float)) or isinstance(rank, bool) or not isinstance(product_id, str):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _ranked_products(db: Session, vendor_id: str, terms: Sequence[str]):
+    """
+    Build a subquery of the vendor's matching available products and their rank.
+
+    The rank column is ascending-is-better on every dialect and a double
+    precision float, so it survives the JSON cursor exactly and the tie
+    comparison of the keyset condition matches the row it came from.
+    """
+    available = and_(Product.user_id == vendor_id, Product.is_available == True)
+
+    if db.get_bind().dialect.name == "sqlite":
+        fts = table(SQLITE_FTS_TABLE, column("rowid"))
+        match = " ".join(f'"{term}"*' for term in terms)
+        return select(
+            *PUBLIC_PRODUCT_COLUMNS,
+            func.bm25(literal_column(SQLITE_FTS_TABLE)).label("rank")
+        ).select_from(
+            fts.join(Product.__table__, literal_column("products.rowid") == fts.c.rowid)
+        ).where(
+            literal_column(SQLITE_FTS_TABLE).op("MATCH")(bindparam("match", match)),
+            available
+        ).subquery()
+
+    document = literal_column(PG_SEARCH_DOCUMENT)
+    tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms))
+    # ts_rank is float4: its text form does not round-trip through a Python
+    # float, so a cursor would never equal the promoted column value
+    return select(
+        *PUBLIC_PRODUCT_COLUMNS,
+        cast(-func.ts_rank(document, tsquery), Double).label("rank")
+    ).where(
+        document.op("@@")(tsquery),
+        available
+    ).subquery()
+
+
+def search_store_products(
+    db: Session,
+    vendor_id: str,
+    query: str,
+    limit: int,
+    cursor_values: Optional[Sequence[Any]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Search a vendor's available products by name and description.
+
+    Matching is prefix-based on every term (all terms must match) and
+    results are ordered by relevance, then product ID. Uses a GIN tsvector
+    index on PostgreSQL and an FTS5 table on SQLite.
+
+    Args:
+        db: Database session
+        vendor_id: ID of the vendor whose catalog is searched
+        query: Raw search text
+        limit: Maximum number of products to return
+        cursor_values: Decoded (rank, id) of the previous page's last row
+
+    Returns:
+        Tuple of (PublicProductResponse-shaped dicts, next cursor or None)
+    """
+    terms = query_terms(query)
+    if not terms:
+        return [], None
+
+    ranked = _ranked_products(db, vendor_id, terms)
+    stmt = select(ranked).order_by(ranked.c.rank, ranked.c.product_id).limit(limit + 1)
+    if cursor_values:
+        stmt = stmt.where(keyset_condition(
+            db, [ranked.c.rank, ranked.c.product_id], cursor_values, descending=False
+        ))
+
+    rows = db.connection().execute(stmt).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][-1], rows[-1][0]])
+
+    return [public_product_dict(row[:-1]) for row in rows], next_cursor
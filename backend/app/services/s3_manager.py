@@ -3,10 +3,11 @@ S3 Manager Service for Quick Vendor
 Handles all AWS S3 operations for product image storage
 """
 
+import asyncio
 import os
 import uuid
 import logging
-from typing import Optional, BinaryIO, Dict, Any
+from typing import Optional, BinaryIO, Dict, Any, Sequence
 from datetime import datetime
 import mimetypes
 
@@ -15,11 +16,21 @@ from fastapi import HTTPException, status
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# S3 accepts at most this many keys per DeleteObjects request
+DELETE_OBJECTS_BATCH_SIZE = 1000
+
+# Uploads smaller than this are sent as one put_object streamed from the
+# file; larger ones go multipart, and s3transfer reads each part into
+# memory. Kept above every upload size limit (10MB images, 5MB banners)
+UPLOAD_MULTIPART_THRESHOLD = 16 * 1024 * 1024
+
 # Import boto3 only when needed
 try:
     import boto3
+    from boto3.s3.transfer import TransferConfig
     from botocore.exceptions import ClientError, NoCredentialsError, BotoCoreError
     BOTO3_AVAILABLE = True
+    UPLOAD_TRANSFER_CONFIG = TransferConfig(multipart_threshold=UPLOAD_MULTIPART_THRESHOLD)
 except ImportError:
     logger.warning("boto3 not available - S3 functionality will be disabled")
     boto3 = None
@@ -27,6 +38,7 @@ except ImportError:
     NoCredentialsError = Exception
     BotoCoreError = Exception
     BOTO3_AVAILABLE = False
+    UPLOAD_TRANSFER_CONFIG = None
 
 
 class S3Manager:
@@ -201,7 +213,9 @@ class S3Manager:
             
             # Note: ACL is not set here because the bucket has ACLs disabled
             # Public access is managed through bucket policy instead
-            self.s3_client.upload_fileobj(
+            # boto3 is blocking, so the transfer runs in a worker thread
+            await asyncio.to_thread(
+                self.s3_client.upload_fileobj,
                 file_content,
                 self.bucket_name,
                 s3_key,
@@ -214,7 +228,8 @@ class S3Manager:
                         'original_filename': filename,
                         'upload_timestamp': datetime.utcnow().isoformat()
                     }
-                }
+                },
+                Config=UPLOAD_TRANSFER_CONFIG
             )
             
             # Construct public URL
@@ -319,7 +334,8 @@ class S3Manager:
             # Upload file to S3
             logger.info(f"Uploading banner to S3: {s3_key}")
             
-            self.s3_client.upload_fileobj(
+            await asyncio.to_thread(
+                self.s3_client.upload_fileobj,
                 file_content,
                 self.bucket_name,
                 s3_key,
@@ -333,7 +349,8 @@ class S3Manager:
                         'upload_timestamp': datetime.utcnow().isoformat(),
                         'type': 'store_banner'
                     }
-                }
+                },
+                Config=UPLOAD_TRANSFER_CONFIG
             )
             
             # Construct public URL
@@ -352,6 +369,67 @@ class S3Manager:
         except Exception as e:
             logger.error(f"Error uploading banner: {str(e)}")
             raise
+
+    async def upload_image_object(
+        self,
+        file_content: BinaryIO,
+        s3_key: str,
+        filename: str,
+        content_type: Optional[str] = None
+    ) -> str:
+        """
+        Upload a product image under a content-addressed key.
+        
+        The key is derived from the file's SHA-256 (see image_blobs), so the
+        object never changes and is cached as immutable for a year.
+        
+        Args:
+            file_content: Binary file content to upload
+            s3_key: Object key (must be in the qv-products-img/ folder)
+            filename: Original filename (validated like other image uploads)
+            content_type: MIME type of the file
+            
+        Returns:
+            Public URL of the uploaded object
+            
+        Raises:
+            HTTPException: If S3 is not configured, the file is not an
+                accepted image or the key is outside the product images
+                folder; boto3 errors are not caught
+        """
+        if not self.is_s3_configured():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="S3 storage is not configured. Please contact support."
+            )
+        if not s3_key.startswith("qv-products-img/"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid product image path"
+            )
+        self._validate_image_file(filename, content_type)
+        
+        if not content_type:
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        
+        logger.info(f"Uploading image object to S3: {s3_key}")
+        await asyncio.to_thread(
+            self.s3_client.upload_fileobj,
+            file_content,
+            self.bucket_name,
+            s3_key,
+            ExtraArgs={
+                'ContentType': content_type,
+                'ContentDisposition': 'inline',
+                'CacheControl': 'public, max-age=31536000, immutable',
+                'Metadata': {
+                    'original_filename': filename,
+                    'upload_timestamp': datetime.utcnow().isoformat()
+                }
+            },
+            Config=UPLOAD_TRANSFER_CONFIG
+        )
+        return self.get_image_url_from_key(s3_key)
     
     async def delete_store_banner(self, s3_key: str) -> bool:
         """
@@ -524,6 +602,119 @@ class S3Manager:
                 detail="Failed to delete product images."
             )
     
+    def delete_objects(self, s3_keys: Sequence[str]) -> int:
+        """
+        Delete many objects with batched DeleteObjects requests.
+        
+        Keys are sent DELETE_OBJECTS_BATCH_SIZE at a time. Like the static
+        file helpers this is synchronous and does not raise; failures are
+        logged so cleanup never blocks the operation that triggered it.
+        
+        Args:
+            s3_keys: Object keys to delete (duplicates are ignored)
+            
+        Returns:
+            Number of keys deleted (deleting a missing key succeeds)
+        """
+        keys = list(dict.fromkeys(s3_keys))
+        if not keys:
+            return 0
+        if not self.is_s3_configured():
+            logger.warning(f"Attempted to delete {len(keys)} S3 objects but S3 is not configured")
+            return 0
+        
+        deleted = 0
+        for start in range(0, len(keys), DELETE_OBJECTS_BATCH_SIZE):
+            batch = keys[start:start + DELETE_OBJECTS_BATCH_SIZE]
+            try:
+                response = self.s3_client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                )
+            except (ClientError, BotoCoreError) as e:
+                logger.error(f"Failed to delete {len(batch)} S3 objects: {str(e)}")
+                continue
+            
+            # Quiet mode only reports failures
+            errors = response.get('Errors', [])
+            for error in errors:
+                logger.error(f"Failed to delete {error.get('Key')}: {error.get('Code')} - {error.get('Message')}")
+            deleted += len(batch) - len(errors)
+        
+        logger.info(f"Deleted {deleted} of {len(keys)} S3 objects")
+        return deleted
+    
+    def upload_static_file(
+        self,
+        s3_key: str,
+        body: bytes,
+        content_type: str,
+        cache_control: str
+    ) -> bool:
+        """
+        Upload a pre-rendered static file (e.g. an exported storefront).
+        
+        Unlike image uploads this is synchronous and does not raise, so it
+        can be used from CLI scripts and background jobs.
+        
+        Args:
+            s3_key: Object key (must be in the storefronts/ folder)
+            body: File contents
+            content_type: MIME type to serve the object with
+            cache_control: Cache-Control header to store on the object
+            
+        Returns:
+            True if the upload succeeded
+        """
+        if not self.is_s3_configured() or not s3_key.startswith("storefronts/"):
+            logger.error(f"Refusing static upload to {s3_key}")
+            return False
+        
+        try:
+            self.s3_client.put_object(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Body=body,
+                ContentType=content_type,
+                CacheControl=cache_control
+            )
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Failed to upload static file {s3_key}: {str(e)}")
+            return False
+    
+    def get_static_file(self, s3_key: str) -> Optional[bytes]:
+        """
+        Download a static file, returning None if it does not exist or S3 fails.
+        """
+        if not self.is_s3_configured():
+            return None
+        
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=s3_key)
+            return response['Body'].read()
+        except (ClientError, BotoCoreError) as e:
+            logger.info(f"Static file {s3_key} not readable: {str(e)}")
+            return None
+    
+    def delete_static_file(self, s3_key: str) -> bool:
+        """
+        Delete a static file from the storefronts/ folder.
+        
+        Returns:
+            True if the object is gone (deleting a missing key succeeds)
+        """
+        if not self.is_s3_configured() or not s3_key.startswith("storefronts/"):
+            logger.error(f"Refusing static delete of {s3_key}")
+            return False
+        
+        try:
+            self.s3_client.delete_object(Bucket=self.bucket_name, Key=s3_key)
+            return True
+        except (ClientError, BotoCoreError) as e:
+            logger.error(f"Failed to delete static file {s3_key}: {str(e)}")
+            return False
+    
     def get_image_url_from_key(self, s3_key: str) -> str:
         """
         Generate the public URL for an S3 object key.
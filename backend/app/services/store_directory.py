@@ -0,0 +1,217 @@
+"""
+Store Directory Service for Quick Vendor
+Streams the sitemap and JSON directory of public stores in constant memory
+"""
+
+import json
+import time
+import logging
+from datetime import datetime
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.storefront_snapshot import StorefrontSnapshot
+from app.models.user import User
+from app.services.storefront import get_vendor_name
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Sitemap protocol limit on URLs per file
+SITEMAP_MAX_URLS = 50_000
+
+# Vendors fetched per keyset query while streaming
+DIRECTORY_BATCH_SIZE = 1000
+
+SITEMAP_NAMESPACE = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+# How long computed sitemap page boundaries are reused (the sitemap max-age)
+SITEMAP_BOUNDARY_TTL_SECONDS = 3600
+
+# Vendors reachable through a public URL
+_HAS_IDENTIFIER = or_(User.store_slug.isnot(None), User.store_handle.isnot(None))
+
+
+def public_store_count(db: Session) -> int:
+    """Number of vendors listed in the directory."""
+    return db.execute(select(func.count(User.id)).where(_HAS_IDENTIFIER)).scalar_one()
+
+
+# (computed at, last vendor ID of every sitemap page but the last)
+_sitemap_boundaries: Optional[Tuple[float, List[str]]] = None
+
+
+def sitemap_page_boundaries(db: Session, refresh: bool = False) -> List[str]:
+    """
+    Return the last vendor ID of every full sitemap page.
+
+    Computed in one pass over the users primary key (every
+    SITEMAP_MAX_URLS-th ID) and reused for SITEMAP_BOUNDARY_TTL_SECONDS,
+    so serving a sitemap page is a keyset seek rather than an OFFSET
+    over all earlier stores. The sitemap index passes refresh=True.
+    """
+    global _sitemap_boundaries
+    now = time.monotonic()
+    if not refresh and _sitemap_boundaries is not None and now - _sitemap_boundaries[0] < SITEMAP_BOUNDARY_TTL_SECONDS:
+        return _sitemap_boundaries[1]
+
+    numbered = select(
+        User.id,
+        func.row_number().over(order_by=User.id).label("position")
+    ).where(_HAS_IDENTIFIER).subquery()
+    boundaries = list(db.execute(
+        select(numbered.c.id).where(numbered.c.position % SITEMAP_MAX_URLS == 0).order_by(numbered.c.id)
+    ).scalars())
+
+    # A boundary on the very last store does not start another page
+    if boundaries and db.execute(
+        select(User.id).where(_HAS_IDENTIFIER, User.id > boundaries[-1]).limit(1)
+    ).scalar() is None:
+        boundaries.pop()
+
+    _sitemap_boundaries = (now, boundaries)
+    return boundaries
+
+
+def sitemap_page_count(db: Session) -> int:
+    """Number of sitemap files needed for all stores (at least one)."""
+    return len(sitemap_page_boundaries(db, refresh=True)) + 1
+
+
+def sitemap_page_range(db: Session, page: int) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return the (exclusive start, inclusive end) vendor IDs of a sitemap page.
+
+    Pages are ID ranges between precomputed boundaries, so a store added
+    after the boundaries were computed lands on the page covering its ID
+    instead of pushing another store off the end of one.
+
+    Raises:
+        LookupError: If the page is past the end of the directory
+    """
+    boundaries = sitemap_page_boundaries(db)
+    if page < 0 or page > len(boundaries):
+        raise LookupError(f"Sitemap page {page} does not exist")
+
+    start_after = boundaries[page - 1] if page > 0 else None
+    end_at = boundaries[page] if page < len(boundaries) else None
+    return start_after, end_at
+
+
+def iter_public_stores(
+    db: Session,
+    start_after: Optional[str] = None,
+    end_at: Optional[str] = None,
+    batch_size: int = DIRECTORY_BATCH_SIZE
+) -> Iterator[Sequence[Any]]:
+    """
+    Yield (id, store_slug, store_handle, store_name, email, last_modified) per vendor.
+
+    Vendors with IDs after `start_after` and up to `end_at` are read in ID
+    order with keyset-paginated queries, so only one batch is held in
+    memory regardless of how many vendors exist.
+    """
+    last_id = start_after
+    while True:
+        stmt = select(
+            User.id,
+            User.store_slug,
+            User.store_handle,
+            User.store_name,
+            User.email,
+            func.coalesce(StorefrontSnapshot.updated_at, User.updated_at, User.created_at)
+        ).outerjoin(
+            StorefrontSnapshot, StorefrontSnapshot.user_id == User.id
+        ).where(_HAS_IDENTIFIER).order_by(User.id).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(User.id > last_id)
+        if end_at is not None:
+            stmt = stmt.where(User.id <= end_at)
+
+        rows = db.connection().execute(stmt).all()
+        if not rows:
+            return
+
+        yield from rows
+
+        last_id = rows[-1][0]
+        if len(rows) < batch_size:
+            return
+
+
+def store_url(store_url_prefix: str, identifier: str) -> str:
+    """Public storefront URL for a slug or handle."""
+    return store_url_prefix + quote(identifier, safe="")
+
+
+def _lastmod(value: Any) -> Optional[str]:
+    """Format a timestamp as a W3C date; SQLite may return text."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value[:10]
+    return value.date().isoformat()
+
+
+def stream_sitemap_index(sitemap_urls: Sequence[str]) -> Iterator[bytes]:
+    """Yield a sitemap index listing the given sitemap file URLs."""
+    yield b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield f'<sitemapindex xmlns="{SITEMAP_NAMESPACE}">\n'.encode()
+    for url in sitemap_urls:
+        yield f"<sitemap><loc>{escape(url)}</loc></sitemap>\n".encode()
+    yield b"</sitemapindex>\n"
+
+
+def stream_sitemap(
+    session_factory: Callable[[], Session],
+    store_url_prefix: str,
+    start_after: Optional[str],
+    end_at: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    Yield one sitemap file: the stores in a sitemap_page_range.
+
+    The generator owns its session so it can outlive the request handler.
+    """
+    db = session_factory()
+    try:
+        yield b'<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield f'<urlset xmlns="{SITEMAP_NAMESPACE}">\n'.encode()
+        for _, slug, handle, _, _, modified in iter_public_stores(db, start_after, end_at):
+            entry = f"<url><loc>{escape(store_url(store_url_prefix, slug or handle))}</loc>"
+            lastmod = _lastmod(modified)
+            if lastmod:
+                entry += f"<lastmod>{lastmod}</lastmod>"
+            yield (entry + "</url>\n").encode()
+        yield b"</urlset>\n"
+    finally:
+        db.close()
+
+
+def stream_directory(session_factory: Callable[[], Session], store_url_prefix: str) -> Iterator[bytes]:
+    """
+    Yield a JSON document listing every public store.
+
+    The generator owns its session so it can outlive the request handler.
+    """
+    db = session_factory()
+    try:
+        yield b'{"stores":['
+        separator = b""
+        for _, slug, handle, store_name, email, modified in iter_public_stores(db):
+            identifier = slug or handle
+            entry = {
+                "identifier": identifier,
+                "vendor_name": get_vendor_name(store_name, email),
+                "url": store_url(store_url_prefix, identifier),
+                "updated_at": modified.isoformat() if isinstance(modified, datetime) else modified,
+            }
+            yield separator + json.dumps(entry, separators=(",", ":")).encode()
+            separator = b","
+        yield b"]}"
+    finally:
+        db.close()
@@ -0,0 +1,657 @@
+"""
+Storefront Service for Quick Vendor
+Shared helpers for loading and versioning public storefront data
+"""
+
+import json
+import logging
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, case, func, literal, or_, select, true
+from sqlalchemy.orm import Session, aliased
+
+from app.models.product import Product, image_variant_list
+from app.models.user import User
+from app.models.storefront_snapshot import StorefrontSnapshot
+from app.services.pagination import decode_cursor, encode_cursor, keyset_condition
+from app.services.product_fields import product_projection
+from app.services.storefront_cache import invalidate_storefront
+from app.services.streaming import iter_rows
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Storefront page size limits
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Columns the public storefront exposes; nothing else is selected
+PUBLIC_PRODUCT_COLUMNS = (
+    Product.id.label("product_id"),
+    Product.name.label("product_name"),
+    Product.price.label("product_price"),
+    Product.description.label("product_description"),
+    Product.is_available.label("product_is_available"),
+    Product.image_url_1.label("product_image_url_1"),
+    Product.image_url_2.label("product_image_url_2"),
+    Product.image_url_3.label("product_image_url_3"),
+    Product.image_url_4.label("product_image_url_4"),
+    Product.image_url_5.label("product_image_url_5"),
+    Product.image_variants.label("product_image_variants"),
+    Product.created_at.label("product_created_at"),
+)
+
+# Storefront sort orders: name -> (sort column, descending). The product ID
+# breaks ties in the same direction; each order has a matching composite index
+STOREFRONT_SORTS = {
+    "newest": (Product.created_at, True),
+    "price_asc": (Product.price, False),
+    "price_desc": (Product.price, True),
+    "popular": (Product.click_count, True),
+}
+DEFAULT_SORT = "newest"
+
+VENDOR_COLUMNS = (
+    User.id,
+    User.email,
+    User.whatsapp_number,
+    User.store_name,
+    User.store_slug,
+    User.banner_url,
+    User.created_at,
+    User.updated_at,
+    User.storefront_updated_at,
+)
+
+
+def page_variant(
+    limit: int,
+    cursor: Optional[str] = None,
+    sort: str = DEFAULT_SORT,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    fields: Optional[Sequence[str]] = None
+) -> str:
+    """Key identifying one page of a storefront (used for ETags and caching)."""
+    variant = f"limit={limit}&cursor={cursor or ''}"
+    # Only non-default options are appended so default-page keys stay stable
+    if sort != DEFAULT_SORT:
+        variant += f"&sort={sort}"
+    if min_price is not None:
+        variant += f"&min_price={min_price}"
+    if max_price is not None:
+        variant += f"&max_price={max_price}"
+    if fields is not None:
+        variant += f"&fields={','.join(fields)}"
+    return variant
+
+
+def decode_storefront_cursor(cursor: str, sort: str = DEFAULT_SORT) -> List[Any]:
+    """
+    Decode a storefront cursor and check it belongs to the requested sort.
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort
+    """
+    sort_value, product_id = values = decode_cursor(cursor, 2)
+    expected = datetime if sort == "newest" else (int, float)
+    if not isinstance(sort_value, expected) or isinstance(sort_value, bool) or not isinstance(product_id, str):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive database timestamps (SQLite) as UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _storefront_validators(
+    vendor: Any,
+    product_count: int,
+    products_modified: Optional[datetime],
+    variant: str = "",
+    click_total: Optional[int] = None
+) -> Tuple[str, Optional[datetime]]:
+    """
+    Build the ETag / Last-Modified pair from vendor fields and catalog stats.
+
+    Last-Modified comes from the vendor's storefront_updated_at, which
+    refresh_storefront bumps on every write, so deleting or hiding a
+    product advances it too. Product and vendor timestamps only matter for
+    stores not written since that column was added.
+
+    Args:
+        vendor: User or row exposing the vendor columns
+        product_count: Number of products the vendor owns
+        products_modified: Most recent product create/update timestamp
+        variant: Extra key for the requested representation (e.g. page)
+        click_total: Sum of product clicks, for pages ordered by popularity
+            (clicks do not change updated_at)
+    """
+    products_modified = _as_utc(products_modified)
+    user_modified = _as_utc(vendor.updated_at or vendor.created_at)
+    storefront_modified = _as_utc(vendor.storefront_updated_at)
+    last_modified = max(
+        (ts for ts in (products_modified, user_modified, storefront_modified) if ts is not None),
+        default=None
+    )
+
+    version = "|".join(str(part) for part in (
+        vendor.id,
+        vendor.email,
+        vendor.store_name,
+        vendor.store_slug,
+        vendor.banner_url,
+        vendor.whatsapp_number,
+        user_modified.isoformat() if user_modified else "",
+        product_count,
+        products_modified.isoformat() if products_modified else "",
+        variant,
+        "" if click_total is None else click_total
+    ))
+    etag = '"' + hashlib.sha256(version.encode()).hexdigest()[:32] + '"'
+
+    return etag, last_modified
+
+
+def get_storefront_version(
+    db: Session,
+    user: User,
+    variant: str = "",
+    sort: str = DEFAULT_SORT
+) -> Tuple[str, Optional[datetime]]:
+    """
+    Compute HTTP validators for a vendor's storefront without loading products.
+
+    The version is derived from the vendor's public store fields plus the
+    number of products and the most recent product change, so any create,
+    update, availability toggle or delete produces a new ETag.
+
+    Args:
+        db: Database session
+        user: The vendor who owns the storefront
+        variant: Extra key for the requested representation (e.g. page)
+        sort: Page ordering; popularity-ordered pages also track clicks
+
+    Returns:
+        Tuple of (quoted strong ETag, Last-Modified timestamp in UTC)
+    """
+    product_count, products_modified, click_total = db.query(
+        func.count(Product.id),
+        func.max(func.coalesce(Product.updated_at, Product.created_at)),
+        func.coalesce(func.sum(Product.click_count), 0)
+    ).filter(Product.user_id == user.id).one()
+
+    return _storefront_validators(
+        user, product_count, products_modified, variant,
+        click_total if sort == "popular" else None
+    )
+
+
+def derive_store_handle(email: str) -> str:
+    """Return the legacy store handle (the part of the email before @)."""
+    return email.split('@')[0]
+
+
+def get_vendor_name(store_name: Optional[str], email: str) -> str:
+    """Use the custom store name if set, otherwise derive one from the email."""
+    if store_name:
+        return store_name
+    return email.split('@')[0].replace('.', ' ').replace('_', ' ').replace('-', ' ').title()
+
+
+def _store_owner_filter(store_identifier: str):
+    """Match a store slug or legacy handle."""
+    return or_(User.store_slug == store_identifier, User.store_handle == store_identifier)
+
+
+def _store_owner_order(store_identifier: str):
+    """Prefer custom slugs over legacy handles when both match."""
+    return case((User.store_slug == store_identifier, 0), else_=1)
+
+
+def find_store_owner(db: Session, store_identifier: str) -> Optional[User]:
+    """
+    Resolve a store identifier to its vendor with a single indexed query.
+
+    Custom slugs take precedence over legacy email-prefix handles, matching
+    the order the storefront has always used.
+
+    Args:
+        db: Database session
+        store_identifier: Store slug or legacy handle from the URL
+
+    Returns:
+        The matching User, or None
+    """
+    return db.query(User).filter(
+        _store_owner_filter(store_identifier)
+    ).order_by(
+        _store_owner_order(store_identifier)
+    ).first()
+
+
+def public_product_dict(values: Sequence[Any]) -> Dict[str, Any]:
+    """
+    Build a PublicProductResponse-shaped dict from PUBLIC_PRODUCT_COLUMNS values.
+
+    Values are unpacked positionally; named Row access costs a key lookup
+    per column, which dominates for large catalogs.
+    """
+    product_id, name, price, description, is_available, url_1, url_2, url_3, url_4, url_5, variants, _ = values
+    urls = (url_1, url_2, url_3, url_4, url_5)
+    return {
+        "id": product_id,
+        "name": name,
+        "price": price,
+        "image_urls": [url for url in urls if url],
+        "image_variants": image_variant_list(urls, variants),
+        "description": description,
+        "is_available": is_available,
+    }
+
+
+def _storefront_product_columns(
+    fields: Optional[Sequence[str]]
+) -> Tuple[Sequence[Any], Callable[[Sequence[Any]], Dict[str, Any]]]:
+    """Columns to select for storefront products and the row-to-dict builder."""
+    if fields is None:
+        return PUBLIC_PRODUCT_COLUMNS, public_product_dict
+
+    # Sparse fieldset: unrequested columns are never selected
+    columns, product_dict = product_projection(fields)
+    return tuple(column.label(f"product_{column.key}") for column in columns), product_dict
+
+
+def _storefront_product_filter(
+    db: Session,
+    owner_id: Any,
+    sort: str,
+    min_price: Optional[float],
+    max_price: Optional[float],
+    cursor_values: Optional[Sequence[Any]]
+):
+    """Available products of a vendor within a price range, after a cursor."""
+    sort_column, descending = STOREFRONT_SORTS[sort]
+
+    product_filter = and_(Product.user_id == owner_id, Product.is_available == True)
+    if min_price is not None:
+        product_filter = and_(product_filter, Product.price >= min_price)
+    if max_price is not None:
+        product_filter = and_(product_filter, Product.price <= max_price)
+    if cursor_values:
+        product_filter = and_(product_filter, keyset_condition(
+            db, [sort_column, Product.id], cursor_values, descending=descending
+        ))
+    return product_filter
+
+
+def _storefront_order(sort: str) -> Tuple[Any, Any]:
+    """ORDER BY clauses for a storefront sort (product ID breaks ties)."""
+    sort_column, descending = STOREFRONT_SORTS[sort]
+    if descending:
+        return sort_column.desc(), Product.id.desc()
+    return sort_column.asc(), Product.id.asc()
+
+
+def iter_storefront_products(
+    db: Session,
+    vendor_id: str,
+    cursor_values: Optional[Sequence[Any]] = None,
+    sort: str = DEFAULT_SORT,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    fields: Optional[Sequence[str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield every matching storefront product from a server-side cursor.
+
+    Used for NDJSON streaming: rows are fetched in batches and turned into
+    PublicProductResponse-shaped dicts one at a time, so memory does not
+    depend on catalog size. Arguments match load_storefront.
+    """
+    product_columns, product_dict = _storefront_product_columns(fields)
+    stmt = select(*product_columns).where(
+        _storefront_product_filter(db, vendor_id, sort, min_price, max_price, cursor_values)
+    ).order_by(*_storefront_order(sort))
+
+    for row in iter_rows(db, stmt):
+        yield product_dict(row)
+
+
+def load_storefront(
+    db: Session,
+    store_identifier: Optional[str],
+    limit: int,
+    cursor_values: Optional[Sequence[Any]] = None,
+    variant: str = "",
+    vendor_id: Optional[str] = None,
+    sort: str = DEFAULT_SORT,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    fields: Optional[Sequence[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Load one storefront page in a single database round trip.
+
+    A single Core SELECT resolves the vendor, computes the catalog version
+    and fetches one page of available products, projecting only the public
+    columns. Rows are turned into plain dicts without going through the ORM.
+    Sorting and price filtering are served by the composite indexes on
+    (user_id, is_available, <sort column>, id).
+
+    Args:
+        db: Database session
+        store_identifier: Store slug or legacy handle from the URL
+        limit: Maximum number of products to return
+        cursor_values: Decoded (sort value, id) of the previous page's last row
+        variant: Extra key for the requested representation (e.g. page)
+        vendor_id: Load by vendor ID instead of store identifier
+        sort: One of STOREFRONT_SORTS
+        min_price: Only include products priced at least this much
+        max_price: Only include products priced at most this much
+        fields: Product fields to select and return (all public fields if None)
+
+    Returns:
+        Dict with vendor metadata, validators, the response payload and its
+        serialized body, or None if the store does not exist
+    """
+    if vendor_id is not None:
+        owner_id = literal(vendor_id)
+    else:
+        owner_id = select(User.id).where(
+            _store_owner_filter(store_identifier)
+        ).order_by(
+            _store_owner_order(store_identifier)
+        ).limit(1).scalar_subquery()
+
+    catalog = select(
+        func.count(Product.id).label("product_count"),
+        func.max(func.coalesce(Product.updated_at, Product.created_at)).label("products_modified"),
+        func.coalesce(func.sum(Product.click_count), 0).label("click_total")
+    ).where(Product.user_id == owner_id).subquery()
+
+    sort_column, _ = STOREFRONT_SORTS[sort]
+    product_columns, product_dict = _storefront_product_columns(fields)
+    product_filter = _storefront_product_filter(
+        db, User.id, sort, min_price, max_price, cursor_values
+    )
+
+    stmt = select(
+        *VENDOR_COLUMNS,
+        catalog.c.product_count,
+        catalog.c.products_modified,
+        catalog.c.click_total,
+        *product_columns,
+        sort_column.label("product_sort_key")
+    ).select_from(
+        User.__table__.join(catalog, true()).outerjoin(Product.__table__, product_filter)
+    ).where(
+        User.id == owner_id
+    ).order_by(
+        *_storefront_order(sort)
+    ).limit(limit + 1)
+
+    # Execute on the Core connection: plain tuples, no ORM result processing
+    rows = db.connection().execute(stmt).all()
+    if not rows:
+        return None
+
+    vendor = rows[0]
+    offset = len(VENDOR_COLUMNS) + 3
+    product_rows: List[Sequence[Any]] = [row[offset:] for row in rows if row[offset] is not None]
+
+    next_cursor = None
+    if len(product_rows) > limit:
+        product_rows = product_rows[:limit]
+        last = product_rows[-1]
+        next_cursor = encode_cursor([last[-1], last[0]])
+
+    etag, last_modified = _storefront_validators(
+        vendor, vendor.product_count, vendor.products_modified, variant,
+        vendor.click_total if sort == "popular" else None
+    )
+
+    payload = {
+        "vendor_name": get_vendor_name(vendor.store_name, vendor.email),
+        "whatsapp_number": vendor.whatsapp_number,
+        "products": [product_dict(row[:-1]) for row in product_rows],
+        "banner_url": vendor.banner_url,
+        "store_slug": vendor.store_slug,
+        "next_cursor": next_cursor,
+    }
+
+    return {
+        "vendor_id": vendor.id,
+        "vendor_email": vendor.email,
+        "product_count": len(product_rows),
+        "etag": etag,
+        "last_modified": last_modified,
+        "payload": payload,
+        "body": render_storefront(payload),
+    }
+
+
+def _first_pages_query(db: Session, vendor_ids: Sequence[str], limit: int):
+    """
+    Select the newest `limit` available products of each vendor.
+
+    Each vendor's rows are a top-N read from the (user_id, is_available,
+    created_at, id) index, so the cost does not grow with catalog size
+    (a row_number() window would number every available product first):
+    a LATERAL subquery per vendor on PostgreSQL, elsewhere a correlated
+    `id IN (... LIMIT n)` subquery.
+
+    Rows are (user_id, *PUBLIC_PRODUCT_COLUMNS), grouped by vendor and
+    newest first within each vendor.
+    """
+    available = Product.is_available == True
+    newest_first = (Product.created_at.desc(), Product.id.desc())
+
+    if db.get_bind().dialect.name == "postgresql":
+        vendors = select(User.id.label("vendor_id")).where(User.id.in_(list(vendor_ids))).subquery("vendors")
+        top = select(*PUBLIC_PRODUCT_COLUMNS).where(
+            Product.user_id == vendors.c.vendor_id, available
+        ).order_by(*newest_first).limit(limit).lateral("top_products")
+        return select(vendors.c.vendor_id, top).select_from(
+            vendors.join(top, true())
+        ).order_by(vendors.c.vendor_id, top.c.product_created_at.desc(), top.c.product_id.desc())
+
+    newest = aliased(Product, name="newest")
+    top_ids = select(newest.id).where(
+        newest.user_id == User.id, newest.is_available == True
+    ).order_by(newest.created_at.desc(), newest.id.desc()).limit(limit).correlate(User)
+    return select(User.id, *PUBLIC_PRODUCT_COLUMNS).select_from(
+        User.__table__.join(Product.__table__, Product.id.in_(top_ids))
+    ).where(
+        User.id.in_(list(vendor_ids))
+    ).order_by(User.id, *newest_first)
+
+
+def load_storefronts(db: Session, store_identifiers: Sequence[str], limit: int) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Load the first page of many storefronts in two queries.
+
+    Vendors are resolved with one IN query over slugs and legacy handles;
+    their products come from one query that reads each vendor's first
+    `limit` + 1 available products, newest first (see _first_pages_query).
+
+    Args:
+        db: Database session
+        store_identifiers: Store slugs or legacy handles (duplicates ignored)
+        limit: Maximum number of products per store
+
+    Returns:
+        Dict of identifier to StorefrontResponse-shaped payload, or None
+        for identifiers that do not match a store
+    """
+    identifiers = list(dict.fromkeys(store_identifiers))
+    conn = db.connection()
+
+    vendor_rows = conn.execute(
+        select(*VENDOR_COLUMNS, User.store_handle).where(
+            or_(User.store_slug.in_(identifiers), User.store_handle.in_(identifiers))
+        )
+    ).all()
+
+    # Custom slugs take precedence over legacy handles, as in find_store_owner
+    by_slug = {row.store_slug: row for row in vendor_rows if row.store_slug}
+    by_handle = {row.store_handle: row for row in vendor_rows if row.store_handle}
+    owners = {
+        identifier: by_slug.get(identifier) or by_handle.get(identifier)
+        for identifier in identifiers
+    }
+
+    products: Dict[str, List[Sequence[Any]]] = {row.id: [] for row in vendor_rows}
+    if vendor_rows:
+        for row in conn.execute(_first_pages_query(db, list(products), limit + 1)).all():
+            products[row[0]].append(row[1:])
+
+    storefronts: Dict[str, Optional[Dict[str, Any]]] = {}
+    for identifier, vendor in owners.items():
+        if vendor is None:
+            storefronts[identifier] = None
+            continue
+
+        product_rows = products[vendor.id]
+        next_cursor = None
+        if len(product_rows) > limit:
+            product_rows = product_rows[:limit]
+            last = product_rows[-1]
+            next_cursor = encode_cursor([last[-1], last[0]])
+
+        storefronts[identifier] = {
+            "vendor_name": get_vendor_name(vendor.store_name, vendor.email),
+            "whatsapp_number": vendor.whatsapp_number,
+            "products": [public_product_dict(row) for row in product_rows],
+            "banner_url": vendor.banner_url,
+            "store_slug": vendor.store_slug,
+            "next_cursor": next_cursor,
+        }
+
+    return storefronts
+
+
+def render_storefront(payload: Dict[str, Any]) -> bytes:
+    """Serialize a storefront payload to compact JSON bytes."""
+    # Payloads are freshly built trees; skipping the cycle check saves a
+    # dict lookup per nested object, which adds up over large catalogs
+    return json.dumps(payload, separators=(",", ":"), check_circular=False).encode()
+
+
+def load_storefront_snapshot(db: Session, store_identifier: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch the materialized first page of a storefront.
+
+    This is a single indexed lookup of the vendor joined to its snapshot
+    row; no products are read.
+
+    Args:
+        db: Database session
+        store_identifier: Store slug or legacy handle from the URL
+
+    Returns:
+        Dict shaped like load_storefront's result (with body, without
+        payload), or None if the store has no snapshot yet
+    """
+    row = db.connection().execute(
+        select(
+            StorefrontSnapshot.user_id,
+            User.email,
+            StorefrontSnapshot.product_count,
+            StorefrontSnapshot.etag,
+            StorefrontSnapshot.last_modified,
+            StorefrontSnapshot.body
+        ).join(
+            User, User.id == StorefrontSnapshot.user_id
+        ).where(
+            _store_owner_filter(store_identifier)
+        ).order_by(
+            _store_owner_order(store_identifier)
+        ).limit(1)
+    ).first()
+
+    if row is None:
+        return None
+
+    return {
+        "vendor_id": row[0],
+        "vendor_email": row[1],
+        "product_count": row[2],
+        "etag": row[3],
+        "last_modified": _as_utc(row[4]),
+        "body": row[5].encode(),
+    }
+
+
+def save_storefront_snapshot(db: Session, storefront: Dict[str, Any], replace: bool = True) -> None:
+    """
+    Store a freshly loaded default first page as the vendor's snapshot.
+
+    Args:
+        db: Database session (the caller is responsible for committing)
+        storefront: Result of load_storefront for the default first page
+        replace: Overwrite an existing snapshot. Read-side backfills pass
+            False so a slow reader can never replace a snapshot written
+            by a concurrent product or store update.
+    """
+    snapshot = StorefrontSnapshot(
+        user_id=storefront["vendor_id"],
+        body=storefront["body"].decode(),
+        etag=storefront["etag"],
+        last_modified=storefront["last_modified"],
+        product_count=storefront["product_count"]
+    )
+    if replace:
+        db.merge(snapshot)
+    else:
+        db.add(snapshot)
+
+
+def refresh_storefront(db: Session, vendor_id: str) -> None:
+    """
+    Regenerate a vendor's storefront snapshot and drop cached responses.
+
+    Call this right after committing any change that affects what the
+    vendor's public storefront shows (products, store name/slug, banner).
+    If the snapshot cannot be rebuilt it is removed, so reads fall back to
+    the live query rather than serving stale data.
+
+    The vendor's row is locked (SELECT ... FOR UPDATE) before the page is
+    read, so concurrent refreshes run one after another: the last one to
+    commit has read every write committed before it started, and an older
+    rebuild can never overwrite a newer snapshot. Under the same lock the
+    vendor's storefront_updated_at (the storefront's Last-Modified) is
+    bumped.
+    """
+    try:
+        db.query(User.id).filter(User.id == vendor_id).with_for_update().first()
+        db.query(User).filter(User.id == vendor_id).update(
+            {User.storefront_updated_at: func.now(), User.updated_at: User.updated_at},
+            synchronize_session=False
+        )
+        storefront = load_storefront(
+            db, None, DEFAULT_PAGE_SIZE,
+            variant=page_variant(DEFAULT_PAGE_SIZE),
+            vendor_id=vendor_id
+        )
+        if storefront is not None:
+            save_storefront_snapshot(db, storefront)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to refresh storefront snapshot for vendor {vendor_id}: {str(e)}")
+        try:
+            db.query(StorefrontSnapshot).filter(StorefrontSnapshot.user_id == vendor_id).delete()
+            db.commit()
+        except Exception as delete_error:
+            db.rollback()
+            logger.error(f"Failed to drop stale storefront snapshot for vendor {vendor_id}: {str(delete_error)}")
+    finally:
+        invalidate_storefront(vendor_id)
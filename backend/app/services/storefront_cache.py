@@ -0,0 +1,345 @@
+"""
+Storefront Cache Service for Quick Vendor
+In-process TTL + LRU cache for serialized public storefront responses
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class StorefrontCache:
+    """
+    Bounded, time-limited cache for public storefront payloads.
+
+    Entries are keyed by the store identifier used in the request and are
+    indexed by vendor ID so that every key belonging to a vendor can be
+    dropped at once when that vendor's store or products change. They are
+    also indexed by that identifier, so a slug that moves to another
+    vendor (or stops resolving) can be dropped whoever it pointed at.
+
+    Entries past their TTL are kept for a further `stale_seconds` so that
+    get_entry() can serve them while a refresh runs. Invalidated entries
+    are removed outright and never served stale.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60, stale_seconds: float = 0):
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_entries: Maximum number of entries kept before the least
+                recently used one is evicted
+            ttl_seconds: Number of seconds an entry stays fresh
+            stale_seconds: Number of seconds an expired entry may still be
+                served stale while it is refreshed
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._vendor_keys: Dict[str, Set[str]] = {}
+        self._store_keys: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        # Bumped on every invalidation. Each vendor and store identifier
+        # records the generation of its last invalidation, so a fill is only
+        # dropped if its own vendor or identifier was invalidated after the
+        # fill started
+        self.generation = 0
+        self._invalidated_at: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        # Records at or below this generation were pruned from _invalidated_at
+        self._forgotten_generation = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value for a key, or None if missing or expired.
+        """
+        entry = self.get_entry(key, allow_stale=False)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str, allow_stale: bool = True) -> Optional[Tuple[Any, bool]]:
+        """
+        Return (value, is_fresh) for a key, or None if missing.
+
+        Entries past their TTL but within the stale window are returned with
+        is_fresh False; the caller should serve them and trigger a refresh.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            _, _, value, expires_at = entry
+            now = time.monotonic()
+            if expires_at <= now:
+                if expires_at + self.stale_seconds <= now:
+                    self._remove(key)
+                    self.misses += 1
+                    return None
+                if not allow_stale:
+                    self.misses += 1
+                    return None
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return value, False
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value, True
+
+    def set(
+        self,
+        key: str,
+        vendor_id: str,
+        value: Any,
+        generation: Optional[int] = None,
+        store_identifier: Optional[str] = None
+    ) -> None:
+        """
+        Store a value for a key owned by the given vendor.
+
+        Pass the `generation` read before loading the value to discard it if
+        the vendor, or the `store_identifier` it was loaded for, was
+        invalidated in the meantime (it may predate a write). Invalidations
+        of other vendors and identifiers do not affect it.
+        """
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+
+        with self._lock:
+            if generation is not None and (
+                generation < self._forgotten_generation
+                or self._invalidated_at.get(("vendor", vendor_id), 0) > generation
+                or self._invalidated_at.get(("store", store_identifier), 0) > generation
+            ):
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (vendor_id, store_identifier, value, time.monotonic() + self.ttl_seconds)
+            self._vendor_keys.setdefault(vendor_id, set()).add(key)
+            if store_identifier is not None:
+                self._store_keys.setdefault(store_identifier, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate_vendor(self, vendor_id: str) -> int:
+        """
+        Drop every cached entry that belongs to a vendor.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = self._invalidate(("vendor", vendor_id), self._vendor_keys.get(vendor_id, set()))
+            if keys:
+                logger.debug(f"Invalidated {keys} storefront cache entries for vendor {vendor_id}")
+            return keys
+
+    def invalidate_store(self, store_identifier: str) -> int:
+        """
+        Drop every cached entry requested under a store identifier.
+
+        Use when the identifier may now resolve to a different vendor (a
+        slug was changed or taken over), whichever vendor it was cached for.
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock:
+            keys = self._invalidate(("store", store_identifier), self._store_keys.get(store_identifier, set()))
+            if keys:
+                logger.debug(f"Invalidated {keys} storefront cache entries for store {store_identifier}")
+            return keys
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._vendor_keys.clear()
+            self._store_keys.clear()
+            self.generation += 1
+            self._invalidated_at.clear()
+            self._forgotten_generation = self.generation
+            self.hits = 0
+            self.stale_hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters for monitoring."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "stale_seconds": self.stale_seconds,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def _invalidate(self, scope: Tuple[str, str], keys: Set[str]) -> int:
+        """Record an invalidation of a vendor or store and drop its keys. Caller must hold the lock."""
+        self.generation += 1
+        self._invalidated_at[scope] = self.generation
+        self._invalidated_at.move_to_end(scope)
+        # Bound the record; fills older than a pruned entry are dropped
+        while len(self._invalidated_at) > max(self.max_entries, 1):
+            _, self._forgotten_generation = self._invalidated_at.popitem(last=False)
+
+        keys = list(keys)
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def _remove(self, key: str) -> None:
+        """Remove a key and its vendor and store index entries. Caller must hold the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        for index, name in ((self._vendor_keys, entry[0]), (self._store_keys, entry[1])):
+            index_keys = index.get(name)
+            if index_keys is not None:
+                index_keys.discard(key)
+                if not index_keys:
+                    del index[name]
+
+
+class SingleFlight:
+    """
+    Run at most one computation per key at a time on the event loop.
+
+    Concurrent callers of run() for the same key await a single shared task;
+    schedule() starts a background refresh unless one is already running.
+    Computations are blocking functions executed in a worker thread.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def _in_flight(self, key: str) -> Optional[asyncio.Task]:
+        task = self._tasks.get(key)
+        # Ignore tasks left behind by a different (e.g. closed) event loop
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            return None
+        return task
+
+    def _start(self, key: str, func: Callable[[], Any]) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(func))
+        self._tasks[key] = task
+
+        def done(finished: asyncio.Task) -> None:
+            if self._tasks.get(key) is finished:
+                del self._tasks[key]
+
+        task.add_done_callback(done)
+        return task
+
+    async def run(self, key: str, func: Callable[[], Any]) -> Any:
+        """Return the result of func(), sharing one call among concurrent callers."""
+        task = self._in_flight(key) or self._start(key, func)
+        # Shield so a disconnecting caller does not cancel it for the others
+        return await asyncio.shield(task)
+
+    def schedule(self, key: str, func: Callable[[], Any]) -> bool:
+        """
+        Start func() in the background unless a call for the key is running.
+
+        Returns:
+            True if a new background call was started
+        """
+        if self._in_flight(key) is not None:
+            return False
+
+        def log_failure(finished: asyncio.Task) -> None:
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.error(f"Background refresh of {key} failed: {finished.exception()}")
+
+        self._start(key, func).add_done_callback(log_failure)
+        return True
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed."""
+        return sum(1 for task in self._tasks.values() if not task.done())
+
+
+# Create a singleton instance
+storefront_cache = None
+
+def get_storefront_cache() -> StorefrontCache:
+    """
+    Get or create the StorefrontCache singleton instance.
+
+    Returns:
+        StorefrontCache instance
+    """
+    global storefront_cache
+    if storefront_cache is None:
+        from app.core.config import settings
+        storefront_cache = StorefrontCache(
+            max_entries=settings.STOREFRONT_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.STOREFRONT_CACHE_TTL_SECONDS,
+            stale_seconds=settings.STOREFRONT_CACHE_STALE_SECONDS
+        )
+    return storefront_cache
+
+
+# Shared in-flight storefront loads, keyed like the cache
+storefront_loads = None
+
+def get_storefront_loads() -> SingleFlight:
+    """
+    Get or create the SingleFlight used for storefront cache fills.
+
+    Returns:
+        SingleFlight instance
+    """
+    global storefront_loads
+    if storefront_loads is None:
+        storefront_loads = SingleFlight()
+    return storefront_loads
+
+
+def invalidate_storefront(vendor_id: str) -> None:
+    """
+    Drop cached storefront responses for a vendor after a write.
+
+    Call this after committing any change that affects what the vendor's
+    public storefront shows (products, store name/slug, banner).
+    """
+    get_storefront_cache().invalidate_vendor(vendor_id)
+
+
+def invalidate_store_identifiers(*store_identifiers: Optional[str]) -> None:
+    """
+    Drop cached storefront responses requested under the given identifiers.
+
+    Call this after committing a slug change, with both the old and the
+    new slug: either may now resolve to a different vendor than the one
+    its cached responses were loaded for.
+    """
+    storefront_cache = get_storefront_cache()
+    for store_identifier in set(filter(None, store_identifiers)):
+        storefront_cache.invalidate_store(store_identifier)
@@ -0,0 +1,361 @@
+"""
+Storefront Export Service for Quick Vendor
+Renders public storefronts to static files for CDN / object-storage hosting
+"""
+
+import os
+import json
+import html
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.user import User
+from app.models.storefront_snapshot import StorefrontSnapshot
+from app.models.product import VARIANT_WIDTHS
+from app.services.storefront import (
+    DEFAULT_PAGE_SIZE,
+    page_variant,
+    load_storefront,
+    save_storefront_snapshot,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EXPORT_PREFIX = "storefronts"
+MANIFEST_KEY = f"{EXPORT_PREFIX}/manifest.json"
+
+# Vendors read per query while exporting
+EXPORT_BATCH_SIZE = 500
+
+# PostgreSQL advisory lock held by the process running the background export
+EXPORT_LOCK_KEY = 0x51565850  # "QVXP"
+
+
+class LocalExportTarget:
+    """Write exported files under a local directory (mirrors the S3 key layout)."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key: str, body: bytes, content_type: str) -> bool:
+        # Write to a temp file and rename so readers never see a partial file
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".export-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return True
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+        return True
+
+
+class S3ExportTarget:
+    """Upload exported files to the configured S3 bucket."""
+
+    def __init__(self, s3_manager, cache_control: str):
+        self.s3_manager = s3_manager
+        self.cache_control = cache_control
+
+    def read(self, key: str) -> Optional[bytes]:
+        return self.s3_manager.get_static_file(key)
+
+    def write(self, key: str, body: bytes, content_type: str) -> bool:
+        # The manifest changes on every run, so it must never be cached long
+        cache_control = "no-cache" if key == MANIFEST_KEY else self.cache_control
+        return self.s3_manager.upload_static_file(key, body, content_type, cache_control)
+
+    def delete(self, key: str) -> bool:
+        return self.s3_manager.delete_static_file(key)
+
+
+def storefront_keys(store_slug: Optional[str], store_handle: Optional[str]) -> List[str]:
+    """
+    Base keys (without extension) a vendor's storefront is published under.
+
+    Both the custom slug and the legacy handle are exported so every URL
+    the API resolves also has a static copy. Identifiers are URL-quoted so
+    they can never escape the storefronts/ prefix.
+    """
+    keys = []
+    for identifier in (store_slug, store_handle):
+        if identifier:
+            key = f"{EXPORT_PREFIX}/{quote(identifier, safe='')}"
+            if key not in keys and key != MANIFEST_KEY[:-len(".json")]:
+                keys.append(key)
+    return keys
+
+
+def _image_srcset(product: Dict[str, Any]) -> str:
+    """srcset/sizes attributes for a product's first image, if variants exist."""
+    variants = (product.get("image_variants") or [{}])[0]
+    candidates = [
+        f"{html.escape(variants[name])} {width}w"
+        for name, width in VARIANT_WIDTHS.items() if variants.get(name)
+    ]
+    if not candidates:
+        return ""
+    return f' srcset="{", ".join(candidates)}" sizes="(max-width: 600px) 100vw, 300px"'
+
+
+def render_storefront_html(payload: Dict[str, Any]) -> bytes:
+    """Render a minimal, dependency-free HTML page for a storefront payload."""
+    vendor_name = html.escape(payload["vendor_name"])
+    items = []
+    for product in payload["products"]:
+        image = ""
+        if product["image_urls"]:
+            image = f'<img src="{html.escape(product["image_urls"][0])}"{_image_srcset(product)} alt="{html.escape(product["name"])}" loading="lazy">'
+        items.append(
+            f'<li>{image}<h2>{html.escape(product["name"])}</h2>'
+            f'<p class="price">{product["price"]:,.2f}</p>'
+            f'<p>{html.escape(product["description"] or "")}</p></li>'
+        )
+
+    banner = ""
+    if payload.get("banner_url"):
+        banner = f'<img class="banner" src="{html.escape(payload["banner_url"])}" alt="">'
+
+    whatsapp = html.escape(payload.get("whatsapp_number") or "")
+    page = (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        f'<title>{vendor_name}</title></head><body>{banner}<h1>{vendor_name}</h1>'
+        f'<p><a href="https://wa.me/{whatsapp}">Chat on WhatsApp</a></p>'
+        f'<ul>{"".join(items)}</ul></body></html>'
+    )
+    return page.encode()
+
+
+def _vendor_batches(db: Session, batch_size: int):
+    """Yield vendors with their snapshot (if any), keyset-paginated by ID."""
+    last_id = None
+    while True:
+        stmt = select(
+            User.id,
+            User.store_slug,
+            User.store_handle,
+            StorefrontSnapshot.etag,
+            StorefrontSnapshot.body
+        ).outerjoin(
+            StorefrontSnapshot, StorefrontSnapshot.user_id == User.id
+        ).order_by(User.id).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(User.id > last_id)
+
+        rows = db.connection().execute(stmt).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _load_manifest(target) -> Dict[str, Any]:
+    raw = target.read(MANIFEST_KEY)
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw).get("vendors", {})
+    except (ValueError, AttributeError):
+        logger.warning("Ignoring unreadable storefront export manifest")
+        return {}
+
+
+def export_storefronts(
+    db: Session,
+    target,
+    include_html: bool = False,
+    full: bool = False,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Dict[str, int]:
+    """
+    Export every vendor's storefront (default first page) as static files.
+
+    Export is incremental: a manifest stored alongside the files records the
+    ETag and keys written for each vendor, and vendors whose ETag and keys
+    are unchanged are skipped. Files for renamed slugs and removed vendors
+    are deleted. Bodies come from the materialized snapshots, so a run
+    normally reads no product rows at all.
+
+    Args:
+        db: Database session
+        target: LocalExportTarget or S3ExportTarget
+        include_html: Also write `{key}.html` pages
+        full: Rewrite every vendor regardless of the manifest
+        batch_size: Vendors read per query
+
+    Returns:
+        Counts of exported, unchanged, removed and failed vendors
+    """
+    manifest = _load_manifest(target)
+    new_manifest: Dict[str, Any] = {}
+    stale_keys = set()
+    stats = {"exported": 0, "unchanged": 0, "removed": 0, "failed": 0}
+    extensions = [".json", ".html"] if include_html else [".json"]
+
+    for rows in _vendor_batches(db, batch_size):
+        for vendor_id, store_slug, store_handle, etag, body in rows:
+            keys = [base + ext for base in storefront_keys(store_slug, store_handle) for ext in extensions]
+            previous = manifest.get(vendor_id)
+
+            if not full and previous and etag and previous["etag"] == etag and previous["keys"] == keys:
+                new_manifest[vendor_id] = previous
+                stats["unchanged"] += 1
+                continue
+
+            if body is None:
+                # No snapshot yet: build it once so later runs stay cheap
+                storefront = load_storefront(
+                    db, None, DEFAULT_PAGE_SIZE,
+                    variant=page_variant(DEFAULT_PAGE_SIZE),
+                    vendor_id=vendor_id
+                )
+                if storefront is None:
+                    continue
+                etag, body = storefront["etag"], storefront["body"].decode()
+                try:
+                    save_storefront_snapshot(db, storefront, replace=False)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+
+            files = {}
+            for key in keys:
+                if key.endswith(".html"):
+                    files[key] = (render_storefront_html(json.loads(body)), "text/html; charset=utf-8")
+                else:
+                    files[key] = (body.encode(), "application/json")
+
+            try:
+                ok = all(target.write(key, content, content_type) for key, (content, content_type) in files.items())
+            except OSError as e:
+                logger.error(f"Failed to export storefront for vendor {vendor_id}: {str(e)}")
+                ok = False
+
+            if not ok:
+                stats["failed"] += 1
+                # Keep the old entry so stale files are still tracked
+                if previous:
+                    new_manifest[vendor_id] = previous
+                continue
+
+            if previous:
+                stale_keys.update(set(previous["keys"]) - set(keys))
+
+            new_manifest[vendor_id] = {"etag": etag, "keys": keys}
+            stats["exported"] += 1
+
+    for vendor_id in set(manifest) - set(new_manifest):
+        stale_keys.update(manifest[vendor_id]["keys"])
+        stats["removed"] += 1
+
+    # A key freed by one vendor may have been claimed by another this run
+    claimed = {key for entry in new_manifest.values() for key in entry["keys"]}
+    for stale_key in stale_keys - claimed:
+        target.delete(stale_key)
+
+    target.write(
+        MANIFEST_KEY,
+        json.dumps({"vendors": new_manifest}, separators=(",", ":")).encode(),
+        "application/json"
+    )
+
+    logger.info(
+        f"Storefront export: {stats['exported']} exported, {stats['unchanged']} unchanged, "
+        f"{stats['removed']} removed, {stats['failed']} failed"
+    )
+    return stats
+
+
+def get_export_target():
+    """Build the export target from settings, or None if export is not configured."""
+    if settings.STOREFRONT_EXPORT_TO_S3:
+        from app.services.s3_manager import get_s3_manager
+
+        s3_manager = get_s3_manager()
+        if not s3_manager.is_s3_configured():
+            logger.error("STOREFRONT_EXPORT_TO_S3 is set but S3 is not configured")
+            return None
+        return S3ExportTarget(s3_manager, settings.STOREFRONT_EXPORT_CACHE_CONTROL)
+
+    if settings.STOREFRONT_EXPORT_DIR:
+        return LocalExportTarget(settings.STOREFRONT_EXPORT_DIR)
+
+    return None
+
+
+@contextmanager
+def export_lock(engine) -> Iterator[bool]:
+    """
+    Hold the export lock for the duration of a run, if it is free.
+
+    Every API worker schedules the background export, so on PostgreSQL a
+    session-level advisory lock on a dedicated connection lets one of them
+    export at a time; the others skip their turn rather than racing on the
+    shared manifest. Other databases run a single process and always get it.
+
+    Yields:
+        True if this process holds the lock and may export
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+
+    with engine.connect() as conn:
+        acquired = conn.execute(select(func.pg_try_advisory_lock(EXPORT_LOCK_KEY))).scalar()
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                conn.execute(select(func.pg_advisory_unlock(EXPORT_LOCK_KEY)))
+
+
+def run_configured_export() -> Optional[Dict[str, int]]:
+    """
+    Run one incremental export using settings (used by the background job).
+
+    Skipped (returns None) while another process is exporting.
+    """
+    from app.core.database import SessionLocal, engine
+
+    target = get_export_target()
+    if target is None:
+        return None
+
+    with export_lock(engine) as acquired:
+        if not acquired:
+            logger.debug("Storefront export already running in another process; skipping")
+            return None
+
+        db = SessionLocal()
+        try:
+            return export_storefronts(db, target, include_html=settings.STOREFRONT_EXPORT_HTML)
+        finally:
+            db.close()
@@ -0,0 +1,188 @@
+"""
+Storefront View Analytics Service for Quick Vendor
+Coalesces storefront views in memory and flushes per-minute rollups
+"""
+
+import logging
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.models.storefront_view_rollup import StorefrontViewRollup
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Rows written per INSERT statement when flushing
+FLUSH_BATCH_SIZE = 500
+
+
+def _minute_bucket(now: Optional[datetime] = None) -> datetime:
+    """Truncate a timestamp to the start of its UTC minute (naive values are taken as UTC)."""
+    now = now or datetime.now(timezone.utc)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    return now.astimezone(timezone.utc).replace(second=0, microsecond=0)
+
+
+def _utc_date(db: Session, column):
+    """SQL expression for the UTC calendar date of a timestamp column."""
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite stores the UTC wall time without an offset
+        return func.date(column)
+    # PostgreSQL would otherwise use the session time zone
+    return func.date(func.timezone("UTC", column))
+
+
+class ViewAggregator:
+    """
+    In-process counter of storefront views per vendor per minute.
+
+    Recording a view is a dict increment under a lock; flush() writes all
+    pending counts with a batched upsert that adds to existing rows, so
+    several workers can flush into the same minute safely.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[str, datetime], int] = {}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.flushed = 0
+
+    def record(self, vendor_id: str, now: Optional[datetime] = None) -> None:
+        """Count one view of a vendor's storefront."""
+        key = (str(vendor_id), _minute_bucket(now))
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+            self.recorded += 1
+
+    def pending_views(self) -> int:
+        """Number of views not yet written to the database."""
+        with self._lock:
+            return sum(self._pending.values())
+
+    def flush(self, db: Session) -> int:
+        """
+        Write pending counts to storefront_view_rollups.
+
+        On failure the counts are put back so they are retried on the
+        next flush.
+
+        Returns:
+            Number of views written
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        rows = [
+            {"user_id": vendor_id, "minute": minute, "views": views}
+            for (vendor_id, minute), views in pending.items()
+        ]
+        insert = sqlite_insert if db.get_bind().dialect.name == "sqlite" else postgresql_insert
+
+        try:
+            for start in range(0, len(rows), FLUSH_BATCH_SIZE):
+                stmt = insert(StorefrontViewRollup).values(rows[start:start + FLUSH_BATCH_SIZE])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[StorefrontViewRollup.user_id, StorefrontViewRollup.minute],
+                    set_={"views": StorefrontViewRollup.views + stmt.excluded.views}
+                )
+                db.execute(stmt)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to flush storefront views: {str(e)}")
+            with self._lock:
+                for key, views in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + views
+            return 0
+
+        written = sum(pending.values())
+        with self._lock:
+            self.flushed += written
+        return written
+
+    def stats(self) -> Dict[str, int]:
+        """Return aggregator counters for monitoring."""
+        with self._lock:
+            return {
+                "pending_buckets": len(self._pending),
+                "pending_views": sum(self._pending.values()),
+                "recorded": self.recorded,
+                "flushed": self.flushed
+            }
+
+
+# Create a singleton instance
+view_aggregator = None
+
+def get_view_aggregator() -> ViewAggregator:
+    """
+    Get or create the ViewAggregator singleton instance.
+
+    Returns:
+        ViewAggregator instance
+    """
+    global view_aggregator
+    if view_aggregator is None:
+        view_aggregator = ViewAggregator()
+    return view_aggregator
+
+
+def record_storefront_view(vendor_id: str) -> None:
+    """Count a storefront view; written to the database on the next flush."""
+    get_view_aggregator().record(vendor_id)
+
+
+def flush_storefront_views() -> int:
+    """Flush pending views with a fresh session (used by the background job)."""
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return get_view_aggregator().flush(db)
+    finally:
+        db.close()
+
+
+def get_daily_views(db: Session, vendor_id: str, days: int) -> List[Dict[str, object]]:
+    """
+    Sum a vendor's storefront views per UTC day.
+
+    Args:
+        db: Database session
+        vendor_id: Vendor whose views are read
+        days: Number of days to return, ending today
+
+    Returns:
+        One {"date", "views"} dict per day, oldest first, including days
+        without views
+    """
+    today = datetime.now(timezone.utc).date()
+    start = today - timedelta(days=days - 1)
+
+    day = _utc_date(db, StorefrontViewRollup.minute)
+    rows = db.execute(
+        select(day, func.sum(StorefrontViewRollup.views)).where(
+            StorefrontViewRollup.user_id == vendor_id,
+            StorefrontViewRollup.minute >= datetime.combine(start, datetime.min.time(), timezone.utc)
+        ).group_by(day)
+    ).all()
+
+    # SQLite returns dates as text, PostgreSQL as date objects
+    totals = {
+        value if isinstance(value, date) else date.fromisoformat(value): int(views)
+        for value, views in rows
+    }
+    return [
+        {"date": start + timedelta(days=offset), "views": totals.get(start + timedelta(days=offset), 0)}
+        for offset in range(days)
+    ]
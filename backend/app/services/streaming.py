@@ -0,0 +1,79 @@
+"""
+Streaming Helpers for Quick Vendor
+NDJSON responses fed from server-side database cursors
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+from fastapi import Request
+from sqlalchemy.orm import Session
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Rows fetched from the database cursor at a time
+STREAM_BATCH_SIZE = 500
+
+# Lines are grouped into chunks of about this size before being sent
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Whether the client asked for newline-delimited JSON."""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def iter_rows(db: Session, stmt, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Any]:
+    """
+    Execute a Core statement and yield rows from a server-side cursor.
+
+    Only `batch_size` rows are buffered at a time (a named cursor on
+    PostgreSQL), so memory does not grow with the size of the result.
+    """
+    connection = db.connection().execution_options(stream_results=True, yield_per=batch_size)
+    result = connection.execute(stmt)
+    try:
+        yield from result
+    finally:
+        result.close()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def stream_ndjson(
+    session_factory: Callable[[], Session],
+    items: Callable[[Session], Iterable[Dict[str, Any]]]
+) -> Iterator[bytes]:
+    """
+    Yield NDJSON chunks, one item per line.
+
+    The generator owns its session so it can outlive the request handler.
+
+    Args:
+        session_factory: Creates the session used for the whole stream
+        items: Given the session, yields the dicts to serialize
+    """
+    db = session_factory()
+    try:
+        chunk = []
+        size = 0
+        for item in items(db):
+            line = json.dumps(item, separators=(",", ":"), default=_json_default).encode() + b"\n"
+            chunk.append(line)
+            size += len(line)
+            if size >= STREAM_CHUNK_BYTES:
+                yield b"".join(chunk)
+                chunk, size = [], 0
+        if chunk:
+            yield b"".join(chunk)
+    finally:
+        db.close()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark the storefront read path: ORM two-query load vs. single projected query
+
+Usage:
+    python benchmarks/storefront_query.py [--repeat 20]
+
+Runs against a throw-away SQLite database so it can be used offline.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.user import User
+from app.models.product import Product
+from app.schemas.storefront import StorefrontResponse, PublicProductResponse
+from app.services.storefront import load_storefront, render_storefront
+
+SIZES = [10, 1_000, 10_000]
+
+
+def orm_storefront(db, store_identifier):
+    """The previous implementation: two ORM queries and pydantic per row."""
+    user = db.query(User).filter(User.store_slug == store_identifier).first()
+    if not user:
+        user = db.query(User).filter(User.email.like(f"{store_identifier}@%")).first()
+
+    products = db.query(Product).filter(
+        Product.user_id == user.id,
+        Product.is_available == True
+    ).all()
+
+    public_products = []
+    for product in products:
+        image_urls = []
+        for i in range(1, 6):
+            image_url = getattr(product, f'image_url_{i}', None)
+            if image_url:
+                image_urls.append(image_url)
+        public_products.append(PublicProductResponse(
+            id=product.id,
+            name=product.name,
+            price=product.price,
+            image_urls=image_urls,
+            description=product.description,
+            is_available=product.is_available
+        ))
+
+    return StorefrontResponse(
+        vendor_name=user.store_name or user.email.split('@')[0],
+        whatsapp_number=user.whatsapp_number,
+        products=public_products,
+        banner_url=user.banner_url,
+        store_slug=user.store_slug
+    ).model_dump_json().encode()
+
+
+def lean_storefront(db, store_identifier, size):
+    """The projected single-query path."""
+    storefront = load_storefront(db, store_identifier, limit=size)
+    return render_storefront(storefront["payload"])
+
+
+def seed(session_factory, size):
+    """Create one vendor with `size` available products."""
+    with session_factory() as db:
+        slug = f"bench-{size}"
+        user = User(
+            email=f"{slug}@example.com",
+            hashed_password="x",
+            whatsapp_number="2348012345678",
+            store_slug=slug,
+            store_handle=slug
+        )
+        db.add(user)
+        db.commit()
+
+        rows = [
+            {
+                "id": f"product_{size}_{i:06d}",
+                "name": f"Product {i}",
+                "description": "A fairly ordinary product description " * 5,
+                "price": 1000 + i,
+                "image_url_1": f"https://example.com/{i}/1.jpg",
+                "image_url_2": f"https://example.com/{i}/2.jpg",
+                "is_available": True,
+                "click_count": i,
+                "user_id": user.id,
+            }
+            for i in range(size)
+        ]
+        db.execute(insert(Product), rows)
+        db.commit()
+        return slug
+
+
+def timed(fn, repeat):
+    """Return the best wall-clock time over `repeat` runs, in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+
+        print(f"{'products':>10} {'orm (ms)':>12} {'lean (ms)':>12} {'speedup':>9}")
+        for size in SIZES:
+            slug = seed(session_factory, size)
+
+            with session_factory() as db:
+                assert len(lean_storefront(db, slug, size)) > 0
+
+                orm_ms = timed(lambda: (orm_storefront(db, slug), db.expunge_all()), args.repeat)
+                lean_ms = timed(lambda: lean_storefront(db, slug, size), args.repeat)
+
+            print(f"{size:>10} {orm_ms:>12.2f} {lean_ms:>12.2f} {orm_ms / lean_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Benchmark peak memory per image upload: read-into-memory vs. streaming the spooled file
+
+Usage:
+    python benchmarks/upload_memory.py [--concurrency 4]
+
+Each upload is spooled the way the multipart parser does it (in memory up
+to 1MB, then a temporary file) and handed to a storage sink that reads it
+like boto3's upload_fileobj or the local writer (1MB chunks). Peak Python
+heap usage is measured with tracemalloc.
+
+upload_fileobj (s3transfer) sends files under the multipart threshold as
+one put_object streamed from the file object; larger files are read into
+memory one 8MB part at a time. The buffered path ran with s3transfer's
+default 8MB threshold; S3Manager now raises it above every upload limit
+(UPLOAD_MULTIPART_THRESHOLD), so the streamed path never goes multipart.
+"""
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from starlette.datastructures import UploadFile
+
+from app.services.image_storage import MAX_PRODUCT_IMAGE_BYTES, ensure_upload_size, write_local_file
+from app.services.s3_manager import UPLOAD_MULTIPART_THRESHOLD
+
+SIZES_MB = [1, 5, 10]
+
+# s3transfer defaults: multipart threshold and part size
+S3_DEFAULT_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+S3_PART_BYTES = 8 * 1024 * 1024
+
+# Block size a streamed put_object body is read in (checksum and send loop)
+S3_STREAM_BYTES = 1024 * 1024
+
+# Multipart parser spool threshold (starlette MultiPartParser.spool_max_size)
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+def spooled_upload(size):
+    """An UploadFile of `size` bytes, spooled like a parsed multipart file."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    block = os.urandom(1024 * 1024)
+    remaining = size
+    while remaining:
+        spool.write(block[:min(remaining, len(block))])
+        remaining -= min(remaining, len(block))
+    spool.seek(0)
+    return UploadFile(file=spool, size=size, filename="bench.jpg")
+
+
+def s3_sink(file_obj, multipart_threshold):
+    """Consume a file the way upload_fileobj does."""
+    start = file_obj.tell()
+    size = file_obj.seek(0, 2) - start
+    file_obj.seek(start)
+
+    if size < multipart_threshold:
+        # put_object reads the body from the file object as it is sent
+        while file_obj.read(S3_STREAM_BYTES):
+            pass
+        return
+
+    # Multipart: each part is read into memory and wrapped in a BytesIO
+    while True:
+        part = file_obj.read(S3_PART_BYTES)
+        if not part:
+            break
+        BytesIO(part)
+
+
+def local_sink(file_obj, directory):
+    write_local_file(file_obj, os.path.join(directory, "bench.jpg"), fsync="none")
+
+
+async def buffered(upload, sinks):
+    """The previous handlers: read the whole file, check its size, copy into BytesIO."""
+    file_content = await upload.read()
+    if len(file_content) > MAX_PRODUCT_IMAGE_BYTES:
+        raise ValueError("too large")
+    await asyncio.to_thread(sinks["before"], BytesIO(file_content))
+
+
+async def streamed(upload, sinks):
+    """The current handlers: size from the parser, stream the spooled file."""
+    file_obj = ensure_upload_size(upload, MAX_PRODUCT_IMAGE_BYTES)
+    await asyncio.to_thread(sinks["after"], file_obj)
+
+
+def peak_mb(handler, sinks, size, concurrency):
+    """Peak traced heap (MB) while `concurrency` uploads of `size` bytes run."""
+    uploads = [spooled_upload(size) for _ in range(concurrency)]
+
+    async def run():
+        await asyncio.gather(*(handler(upload, sinks) for upload in uploads))
+
+    tracemalloc.start()
+    try:
+        asyncio.run(run())
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        for upload in uploads:
+            upload.file.close()
+    return peak / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=4, help="Uploads in flight at once")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Sink used by the buffered ("before") and streamed ("after") paths
+        local = lambda file_obj: local_sink(file_obj, tmp)
+        sinks = {
+            "s3": {
+                "before": lambda file_obj: s3_sink(file_obj, S3_DEFAULT_MULTIPART_THRESHOLD),
+                "after": lambda file_obj: s3_sink(file_obj, UPLOAD_MULTIPART_THRESHOLD),
+            },
+            "local": {"before": local, "after": local},
+        }
+
+        print(f"{'sink':>6} {'file (MB)':>10} {'uploads':>8} {'buffered (MB)':>14} {'streamed (MB)':>14}")
+        for name, sink_pair in sinks.items():
+            for size_mb in SIZES_MB:
+                size = size_mb * 1024 * 1024
+                for concurrency in (1, args.concurrency):
+                    before = peak_mb(buffered, sink_pair, size, concurrency)
+                    after = peak_mb(streamed, sink_pair, size, concurrency)
+                    print(f"{name:>6} {size_mb:>10} {concurrency:>8} {before:>14.1f} {after:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
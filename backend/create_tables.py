@@ -14,7 +14,7 @@ def create_tables():
     
     try:
         # Import all models to ensure they're registered with Base
-        from app.models import user, product
+        from app.models import user, product, product_click, image_blob, storefront_snapshot, storefront_view_rollup
         
         # Create all tables
         Base.metadata.create_all(bind=engine)
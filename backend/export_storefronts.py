@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Export public storefronts as static files for CDN / object-storage hosting
+
+Usage:
+    python export_storefronts.py --dir ./static-export [--html] [--full]
+    python export_storefronts.py --s3 [--html] [--full]
+
+Only vendors whose storefront changed since the last run are rewritten.
+"""
+import sys
+import argparse
+from dotenv import load_dotenv
+import logging
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def export():
+    """Run one storefront export to a local directory or S3."""
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+    from app.services.s3_manager import get_s3_manager
+    from app.services.storefront_export import LocalExportTarget, S3ExportTarget, export_storefronts
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    target_group = parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument("--dir", help="Local directory to export into")
+    target_group.add_argument("--s3", action="store_true", help="Upload to the configured S3 bucket")
+    parser.add_argument("--html", action="store_true", help="Also render HTML pages")
+    parser.add_argument("--full", action="store_true", help="Rewrite every storefront, ignoring the manifest")
+    args = parser.parse_args()
+
+    if args.s3:
+        s3_manager = get_s3_manager()
+        if not s3_manager.is_s3_configured():
+            logger.error("S3 is not configured; set the AWS_* and S3_BUCKET_NAME variables")
+            return False
+        target = S3ExportTarget(s3_manager, settings.STOREFRONT_EXPORT_CACHE_CONTROL)
+    else:
+        target = LocalExportTarget(args.dir)
+
+    db = SessionLocal()
+    try:
+        stats = export_storefronts(db, target, include_html=args.html, full=args.full)
+    finally:
+        db.close()
+
+    return stats["failed"] == 0
+
+if __name__ == "__main__":
+    success = export()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Migration script to key image_blobs by (sha256, storage) so S3 and local copies of the same bytes are separate blobs
+"""
+import os
+import sys
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+import logging
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def run_migration():
+    """Add image_blobs.storage (backfilled from the URL) and make it part of the primary key."""
+
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    if not DATABASE_URL:
+        logger.error("DATABASE_URL not found in environment variables")
+        return False
+
+    engine = create_engine(DATABASE_URL)
+    is_sqlite = 'sqlite' in DATABASE_URL.lower()
+
+    try:
+        with engine.connect() as conn:
+            if is_sqlite:
+                result = conn.execute(text("PRAGMA table_info(image_blobs)"))
+                existing_columns = [row[1] for row in result]
+            else:
+                result = conn.execute(text("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_name='image_blobs'
+                """))
+                existing_columns = [row[0] for row in result]
+
+            if not existing_columns:
+                logger.info("image_blobs table does not exist yet; it is created with the storage column")
+            elif 'storage' not in existing_columns:
+                logger.info("Adding storage column to image_blobs...")
+                if is_sqlite:
+                    # SQLite cannot change a primary key in place; rebuild the table
+                    conn.execute(text("""
+                        CREATE TABLE image_blobs_new (
+                            sha256 VARCHAR(64) NOT NULL,
+                            storage VARCHAR(8) NOT NULL,
+                            url VARCHAR NOT NULL UNIQUE,
+                            size BIGINT NOT NULL,
+                            content_type VARCHAR,
+                            ref_count INTEGER NOT NULL,
+                            variants JSON,
+                            created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+                            PRIMARY KEY (sha256, storage)
+                        )
+                    """))
+                    conn.execute(text("""
+                        INSERT INTO image_blobs_new
+                        SELECT sha256,
+                               CASE WHEN url LIKE 'http%' THEN 's3' ELSE 'local' END,
+                               url, size, content_type, ref_count, variants, created_at
+                        FROM image_blobs
+                    """))
+                    conn.execute(text("DROP TABLE image_blobs"))
+                    conn.execute(text("ALTER TABLE image_blobs_new RENAME TO image_blobs"))
+                else:
+                    conn.execute(text("""
+                        ALTER TABLE image_blobs
+                        ADD COLUMN storage VARCHAR(8) NOT NULL DEFAULT 'local'
+                    """))
+                    conn.execute(text("UPDATE image_blobs SET storage = 's3' WHERE url LIKE 'http%'"))
+                    conn.execute(text("ALTER TABLE image_blobs DROP CONSTRAINT image_blobs_pkey"))
+                    conn.execute(text("ALTER TABLE image_blobs ADD PRIMARY KEY (sha256, storage)"))
+                conn.commit()
+                logger.info("✓ image_blobs keyed by (sha256, storage)")
+            else:
+                logger.info("image_blobs.storage column already exists")
+
+            logger.info("Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the full-text index used by storefront search
+PostgreSQL: GIN index on a tsvector expression
+SQLite: external-content FTS5 table maintained by triggers
+"""
+import os
+import sys
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+import logging
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Must match PG_SEARCH_DOCUMENT in app/services/product_search.py
+POSTGRES_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_products_search
+    ON products USING GIN (
+        to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))
+    )
+"""
+
+SQLITE_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts
+    USING fts5(name, description, content='products', content_rowid='rowid')
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.rowid, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.rowid, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.rowid, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.rowid, new.name, new.description);
+    END
+    """,
+    # products has no INTEGER PRIMARY KEY, so VACUUM may renumber rowids;
+    # rebuilding on every run keeps the development index consistent
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+]
+
+def run_migration():
+    """Create the product search index for the current database."""
+
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    if not DATABASE_URL:
+        logger.error("DATABASE_URL not found in environment variables")
+        return False
+
+    engine = create_engine(DATABASE_URL)
+    is_sqlite = 'sqlite' in DATABASE_URL.lower()
+
+    try:
+        with engine.connect() as conn:
+            if is_sqlite:
+                logger.info("Ensuring products_fts table and triggers...")
+                for statement in SQLITE_STATEMENTS:
+                    conn.execute(text(statement))
+            else:
+                logger.info("Ensuring index idx_products_search...")
+                conn.execute(text(POSTGRES_INDEX))
+            conn.commit()
+
+            logger.info("Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
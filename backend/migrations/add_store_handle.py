@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the store_handle column to users table
+and backfill it from the email prefix
+"""
+import os
+import sys
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+import logging
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def run_migration():
+    """Add a uniquely indexed store_handle column and backfill existing users."""
+
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    if not DATABASE_URL:
+        logger.error("DATABASE_URL not found in environment variables")
+        return False
+
+    engine = create_engine(DATABASE_URL)
+    is_sqlite = 'sqlite' in DATABASE_URL.lower()
+
+    try:
+        with engine.connect() as conn:
+            # Check if column already exists
+            if is_sqlite:
+                result = conn.execute(text("PRAGMA table_info(users)"))
+                existing_columns = [row[1] for row in result]
+            else:
+                result = conn.execute(text("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_name='users'
+                    AND column_name = 'store_handle'
+                """))
+                existing_columns = [row[0] for row in result]
+
+            if 'store_handle' not in existing_columns:
+                logger.info("Adding store_handle column...")
+                conn.execute(text("""
+                    ALTER TABLE users
+                    ADD COLUMN store_handle VARCHAR(255)
+                """))
+                conn.commit()
+                logger.info("✓ store_handle column added")
+            else:
+                logger.info("store_handle column already exists")
+
+            # Unique index (NULLs are allowed for vendors whose prefix is taken)
+            conn.execute(text("""
+                CREATE UNIQUE INDEX IF NOT EXISTS ix_users_store_handle
+                ON users(store_handle)
+            """))
+            conn.commit()
+
+            # Backfill: the oldest account keeps a shared prefix, matching
+            # which vendor the old email LIKE lookup usually resolved to
+            taken = {
+                row[0] for row in conn.execute(text(
+                    "SELECT store_handle FROM users WHERE store_handle IS NOT NULL"
+                ))
+            }
+            pending = conn.execute(text("""
+                SELECT id, email FROM users
+                WHERE store_handle IS NULL
+                ORDER BY created_at, id
+            """)).fetchall()
+
+            updates = []
+            for user_id, email in pending:
+                handle = email.split('@')[0]
+                if handle in taken:
+                    continue
+                taken.add(handle)
+                updates.append({"id": user_id, "handle": handle})
+
+            if updates:
+                conn.execute(
+                    text("UPDATE users SET store_handle = :handle WHERE id = :id"),
+                    updates
+                )
+                conn.commit()
+            logger.info(f"✓ Backfilled store_handle for {len(updates)} users")
+
+            logger.info("Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script to add composite indexes used by storefront pagination
+"""
+import os
+import sys
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+import logging
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Index name -> column list on the products table
+INDEXES = {
+    "idx_products_storefront_created": "user_id, is_available, created_at, id",
+    "idx_products_storefront_price": "user_id, is_available, price, id",
+    "idx_products_storefront_popular": "user_id, is_available, click_count, id",
+}
+
+def run_migration():
+    """Create storefront indexes on the products table if they are missing."""
+
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    if not DATABASE_URL:
+        logger.error("DATABASE_URL not found in environment variables")
+        return False
+
+    engine = create_engine(DATABASE_URL)
+
+    try:
+        with engine.connect() as conn:
+            for index_name, columns in INDEXES.items():
+                logger.info(f"Ensuring index {index_name} ({columns})...")
+                conn.execute(text(f"""
+                    CREATE INDEX IF NOT EXISTS {index_name}
+                    ON products({columns})
+                """))
+                conn.commit()
+
+            logger.info("Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
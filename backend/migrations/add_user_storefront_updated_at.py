@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the storefront_updated_at column (storefront Last-Modified) to users
+"""
+import os
+import sys
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+import logging
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def run_migration():
+    """Add users.storefront_updated_at if it is missing."""
+
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    if not DATABASE_URL:
+        logger.error("DATABASE_URL not found in environment variables")
+        return False
+
+    engine = create_engine(DATABASE_URL)
+    is_sqlite = 'sqlite' in DATABASE_URL.lower()
+
+    try:
+        with engine.connect() as conn:
+            if is_sqlite:
+                result = conn.execute(text("PRAGMA table_info(users)"))
+                existing_columns = [row[1] for row in result]
+            else:
+                result = conn.execute(text("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_name='users'
+                    AND column_name = 'storefront_updated_at'
+                """))
+                existing_columns = [row[0] for row in result]
+
+            if 'storefront_updated_at' not in existing_columns:
+                logger.info("Adding storefront_updated_at column...")
+                conn.execute(text("""
+                    ALTER TABLE users
+                    ADD COLUMN storefront_updated_at TIMESTAMP WITH TIME ZONE
+                """))
+                conn.commit()
+                logger.info("✓ storefront_updated_at column added")
+            else:
+                logger.info("storefront_updated_at column already exists")
+
+            logger.info("Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migration script to add composite indexes used by the vendor product listing
+"""
+import os
+import sys
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+import logging
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Index name -> column list on the products table
+# (listings filtered by availability use the storefront indexes instead)
+INDEXES = {
+    "idx_products_owner_created": "user_id, created_at, id",
+    "idx_products_owner_price": "user_id, price, id",
+    "idx_products_owner_popular": "user_id, click_count, id",
+}
+
+def run_migration():
+    """Create vendor listing indexes on the products table if they are missing."""
+
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    if not DATABASE_URL:
+        logger.error("DATABASE_URL not found in environment variables")
+        return False
+
+    engine = create_engine(DATABASE_URL)
+
+    try:
+        with engine.connect() as conn:
+            for index_name, columns in INDEXES.items():
+                logger.info(f"Ensuring index {index_name} ({columns})...")
+                conn.execute(text(f"""
+                    CREATE INDEX IF NOT EXISTS {index_name}
+                    ON products({columns})
+                """))
+                conn.commit()
+
+            logger.info("Migration completed successfully!")
+            return True
+
+    except Exception as e:
+        logger.error(f"Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    success = run_migration()
+    sys.exit(0 if success else 1)
@@ -1,6 +1,7 @@
 # Test configuration for FastAPI
 import pytest
 import os
+import uuid
 from fastapi.testclient import TestClient
 
 # Set test environment variables
@@ -9,6 +10,10 @@ os.environ["SECRET_KEY"] = "test-secret-key-for-testing"
 os.environ["SLACK_WEBHOOK_URL"] = ""  # Empty for testing
 os.environ["FEEDBACK_SECRET_KEY"] = ""  # Empty for testing
 
+# Start from a fresh database so model changes are always reflected
+if os.path.exists("./test.db"):
+    os.remove("./test.db")
+
 @pytest.fixture(scope="session")
 def test_app():
     """Create test FastAPI app"""
@@ -19,3 +24,29 @@ def test_app():
 def client(test_app):
     """Create test client"""
     return TestClient(test_app)
+
+
+@pytest.fixture
+def vendor(client):
+    """Register a vendor and return its id, email and auth headers"""
+    email = f"vendor_{uuid.uuid4().hex[:10]}@example.com"
+    password = "strongpassword123"
+    
+    response = client.post("/api/users/register", json={
+        "email": email,
+        "password": password,
+        "whatsapp_number": "2348012345678"
+    })
+    assert response.status_code == 201
+    user_id = response.json()["id"]
+    
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    
+    return {
+        "id": user_id,
+        "email": email,
+        "username": email.split("@")[0],
+        "headers": {"Authorization": f"Bearer {token}"}
+    }
@@ -0,0 +1,1128 @@
+import io
+import os
+import json
+import uuid
+import hashlib
+import asyncio
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select, update
+
+from app.api import products as products_api
+from app.core.database import SessionLocal, engine
+from app.models.product import Product, image_variant_list
+from app.models.image_blob import ImageBlob
+from app.models.product_click import ProductClickEvent
+from app.services import image_blobs, image_storage, image_variants
+from app.services.click_analytics import prune_click_events, rollup_click_events
+from app.services.click_counter import ClickAggregator, flush_product_clicks, get_click_aggregator
+from app.services.product_listing import DEFAULT_LIST_SIZE, vendor_products_query
+from app.services.s3_manager import S3Manager
+
+
+def image_bytes(label):
+    """Image content no other test has stored (blobs are shared across the test database)"""
+    return f"{label}-{uuid.uuid4().hex}".encode()
+
+
+def blob_name(content, extension):
+    """Content-addressed file name of an image"""
+    return hashlib.sha256(content).hexdigest() + extension
+
+
+def create_product(client, vendor, name="Cool T-Shirt", price=5000, **fields):
+    """Create a product for a vendor through the API"""
+    data = {"name": name, "price": str(price)}
+    data.update({key: str(value) for key, value in fields.items()})
+    response = client.post("/api/products/", data=data, headers=vendor["headers"])
+    assert response.status_code == 201
+    return response.json()
+
+
+class TestProductListPagination:
+    """Test cases for keyset pagination and filters on the vendor product list"""
+
+    def collect(self, client, vendor, **params):
+        """Follow X-Next-Cursor through every page and return product names"""
+        names, cursor = [], None
+        while True:
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            response = client.get("/api/products/", params=query, headers=vendor["headers"])
+            assert response.status_code == 200
+            names += [p["name"] for p in response.json()]
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                return names
+
+    def test_pages_cover_catalog(self, client, vendor):
+        """Test pages follow each other without gaps or repeats"""
+        for i in range(5):
+            create_product(client, vendor, name=f"Item {i}")
+
+        response = client.get("/api/products/", params={"limit": 2}, headers=vendor["headers"])
+        assert len(response.json()) == 2 and "x-next-cursor" in response.headers
+        assert "x-total-count" not in response.headers
+
+        names = self.collect(client, vendor, limit=2)
+        assert sorted(names) == [f"Item {i}" for i in range(5)]
+
+    def test_unpaginated_without_limit(self, client, vendor):
+        """Test the list stays complete for clients that do not send limit or cursor"""
+        client.post("/api/products/bulk", json=[
+            {"name": f"Item {i}", "price": 1} for i in range(DEFAULT_LIST_SIZE + 5)
+        ], headers=vendor["headers"])
+
+        response = client.get("/api/products/", headers=vendor["headers"])
+        assert len(response.json()) == DEFAULT_LIST_SIZE + 5
+        assert "x-next-cursor" not in response.headers
+
+        first = client.get("/api/products/", params={"limit": 1}, headers=vendor["headers"])
+        rest = client.get("/api/products/", params={"cursor": first.headers["x-next-cursor"]}, headers=vendor["headers"])
+        assert len(rest.json()) == DEFAULT_LIST_SIZE
+
+    def test_sort_and_filter(self, client, vendor):
+        """Test price order, availability filter and the total count"""
+        for name, price, available in [("C", 300, True), ("A", 100, False), ("B", 200, True), ("D", 400, True)]:
+            create_product(client, vendor, name=name, price=price, is_available=str(available).lower())
+
+        assert self.collect(client, vendor, limit=2, sort="price_asc") == ["A", "B", "C", "D"]
+        assert self.collect(client, vendor, limit=1, sort="price_desc", is_available="true") == ["D", "C", "B"]
+
+        response = client.get(
+            "/api/products/",
+            params={"limit": 1, "is_available": "false", "include_total": "true"},
+            headers=vendor["headers"]
+        )
+        assert [p["name"] for p in response.json()] == ["A"]
+        assert response.headers["x-total-count"] == "1"
+        assert "x-next-cursor" not in response.headers
+
+    def test_invalid_parameters(self, client, vendor):
+        """Test bad cursors, sorts and page sizes are rejected"""
+        for i in range(3):
+            create_product(client, vendor, name=f"Item {i}", price=100 + i)
+        cursor = client.get(
+            "/api/products/", params={"limit": 1, "sort": "price_asc"}, headers=vendor["headers"]
+        ).headers["x-next-cursor"]
+
+        assert client.get("/api/products/", params={"cursor": cursor}, headers=vendor["headers"]).status_code == 400
+        assert client.get("/api/products/", params={"cursor": "junk"}, headers=vendor["headers"]).status_code == 400
+        assert client.get("/api/products/", params={"sort": "name"}, headers=vendor["headers"]).status_code == 422
+        assert client.get("/api/products/", params={"limit": 201}, headers=vendor["headers"]).status_code == 422
+
+    def test_listing_uses_owner_index(self, vendor):
+        """Test the unfiltered listing is served by a user_id-prefixed index"""
+        stmt = vendor_products_query(SessionLocal(), vendor["id"], [Product.id], "popular").limit(51)
+        with engine.connect() as conn:
+            compiled = stmt.compile(conn, compile_kwargs={"literal_binds": True})
+            plan = " ".join(str(row[-1]) for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}"))
+        assert "idx_products_owner_popular" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+class TestProductListFields:
+    """Test cases for sparse fieldsets on the vendor product list"""
+
+    def test_fields_projection(self, client, vendor):
+        """Test only requested fields are selected and returned"""
+        create_product(client, vendor, name="Grid Item", description="Very long description " * 40)
+
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            response = client.get("/api/products/?fields=id,name,price,image_urls", headers=vendor["headers"])
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        assert response.status_code == 200
+        products = response.json()
+        assert len(products) == 1
+        assert set(products[0]) == {"id", "name", "price", "image_urls"}
+
+        product_queries = [s for s in statements if "FROM products" in s]
+        assert product_queries
+        assert all("description" not in s for s in product_queries)
+
+    def test_all_fields_by_default(self, client, vendor):
+        """Test omitting fields keeps the full ProductResponse"""
+        create_product(client, vendor)
+        products = client.get("/api/products/", headers=vendor["headers"]).json()
+        assert {"description", "click_count", "created_at"} <= set(products[0])
+
+    def test_unknown_field(self, client, vendor):
+        """Test unknown fields are rejected"""
+        response = client.get("/api/products/?fields=name,secret", headers=vendor["headers"])
+        assert response.status_code == 400
+
+
+class TestProductListNdjson:
+    """Test cases for NDJSON streaming of the vendor product list"""
+
+    def test_streams_products(self, client, vendor):
+        """Test each product is one line with the full response fields"""
+        for i in range(3):
+            create_product(client, vendor, name=f"Line {i}")
+
+        response = client.get("/api/products/", headers={**vendor["headers"], "Accept": "application/x-ndjson"})
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert sorted(p["name"] for p in lines) == ["Line 0", "Line 1", "Line 2"]
+        assert {"click_count", "created_at", "image_urls"} <= set(lines[0])
+
+    def test_streams_fields(self, client, vendor):
+        """Test fields narrow the streamed objects"""
+        create_product(client, vendor, name="Narrow")
+        response = client.get(
+            "/api/products/?fields=name",
+            headers={**vendor["headers"], "Accept": "application/x-ndjson"}
+        )
+        assert response.text == '{"name":"Narrow"}\n'
+
+
+class TestProductClicks:
+    """Test cases for write-behind click counting"""
+
+    def click_count(self, client, vendor, product_id):
+        products = client.get("/api/products/?fields=id,click_count", headers=vendor["headers"]).json()
+        return next(p["click_count"] for p in products if p["id"] == product_id)
+
+    def test_click_does_not_query(self, client, vendor):
+        """Test tracking a click does not touch the database"""
+        product = create_product(client, vendor)
+        flush_product_clicks()
+
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            response = client.post(f"/api/products/{product['id']}/track-click")
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        assert response.status_code == 200
+        assert statements == []
+        assert self.click_count(client, vendor, product["id"]) == 0
+
+        flush_product_clicks()
+        assert self.click_count(client, vendor, product["id"]) == 1
+
+    def test_flush_is_one_batched_update(self, client, vendor):
+        """Test pending clicks for several products are written in one statement"""
+        first = create_product(client, vendor, name="First")
+        second = create_product(client, vendor, name="Second")
+        for _ in range(3):
+            client.post(f"/api/products/{first['id']}/track-click")
+        client.post(f"/api/products/{second['id']}/track-click")
+        client.post("/api/products/missing-product/track-click")
+
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, executemany))
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            assert flush_product_clicks() == 4
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        updates = [s for s in statements if s[0].startswith("UPDATE products")]
+        assert len(updates) == 1 and updates[0][1]
+        assert "updated_at=products.updated_at" in updates[0][0].replace(" ", "")
+        assert self.click_count(client, vendor, first["id"]) == 3
+        assert self.click_count(client, vendor, second["id"]) == 1
+
+    def test_failed_flush_keeps_clicks(self):
+        """Test counts are retained when the write fails"""
+        aggregator = ClickAggregator(max_pending=0)
+        aggregator.record("p1")
+        aggregator.record("p1")
+
+        db = MagicMock()
+        db.connection.return_value.execute.side_effect = RuntimeError("database down")
+
+        assert aggregator.flush(db) == 0
+        db.rollback.assert_called_once()
+        assert aggregator.pending_clicks() == 2
+        assert aggregator.stats()["pending_products"] == 1
+
+    def test_threshold_signals_flush(self):
+        """Test record reports when the buffer is full"""
+        aggregator = ClickAggregator(max_pending=3)
+        assert not aggregator.record("p1")
+        assert not aggregator.record("p2")
+        assert aggregator.record("p1")
+
+
+    def test_threshold_flush_failure_is_logged(self, caplog):
+        """Test a failing flush started by a full buffer is logged, not lost"""
+        from app.core.background import run_in_background
+
+        def flush():
+            raise RuntimeError("database down")
+
+        async def start_and_wait():
+            await asyncio.gather(run_in_background("product-click-flush", flush), return_exceptions=True)
+
+        asyncio.run(start_and_wait())
+        assert "Background job product-click-flush failed: database down" in caplog.text
+
+class TestProductClickAnalytics:
+    """Test cases for click events, rollups and the click series endpoint"""
+
+    def record(self, product_id, *times):
+        for clicked_at in times:
+            get_click_aggregator().record(product_id, now=clicked_at)
+        flush_product_clicks()
+
+    def rollup(self, now=None):
+        """Roll up; by default once every event so far has settled"""
+        db = SessionLocal()
+        try:
+            return rollup_click_events(db, now=now or datetime.utcnow() + timedelta(minutes=5))
+        finally:
+            db.close()
+
+    def series(self, client, vendor, product_id, **params):
+        response = client.get(f"/api/products/{product_id}/clicks", params=params, headers=vendor["headers"])
+        assert response.status_code == 200
+        return response.json()
+
+    def test_hourly_and_daily_series(self, client, vendor):
+        """Test rolled-up clicks are bucketed per hour and per day"""
+        product = create_product(client, vendor)
+        self.record(
+            product["id"],
+            datetime(2026, 3, 9, 23, 59),
+            datetime(2026, 3, 10, 13, 5),
+            datetime(2026, 3, 10, 13, 50),
+            datetime(2026, 3, 10, 14, 10),
+        )
+        self.rollup()
+
+        hourly = self.series(
+            client, vendor, product["id"],
+            granularity="hour", **{"from": "2026-03-10T12:00:00Z", "to": "2026-03-10T14:59:00Z"}
+        )
+        assert [b["clicks"] for b in hourly["buckets"]] == [0, 2, 1]
+        assert hourly["buckets"][1]["start"].startswith("2026-03-10T13:00:00")
+        assert hourly["total"] == 3
+
+        daily = self.series(
+            client, vendor, product["id"],
+            granularity="day", **{"from": "2026-03-09", "to": "2026-03-10T10:00:00"}
+        )
+        assert [b["clicks"] for b in daily["buckets"]] == [1, 3]
+
+    def test_clicks_bucketed_in_utc(self, client, vendor):
+        """Test clicks with a UTC offset land in their UTC hour and day"""
+        product = create_product(client, vendor)
+        plus_three = timezone(timedelta(hours=3))
+        self.record(product["id"], datetime(2026, 4, 2, 1, 30, tzinfo=plus_three))
+        self.rollup()
+
+        hourly = self.series(
+            client, vendor, product["id"],
+            granularity="hour", **{"from": "2026-04-01T22:00:00Z", "to": "2026-04-01T22:00:00Z"}
+        )
+        assert hourly["buckets"] == [{"start": "2026-04-01T22:00:00Z", "clicks": 1}]
+
+        daily = self.series(client, vendor, product["id"], granularity="day", **{"from": "2026-04-01", "to": "2026-04-02"})
+        assert [b["clicks"] for b in daily["buckets"]] == [1, 0]
+
+    def test_rollup_is_incremental(self, client, vendor):
+        """Test rerunning the rollup does not double count and picks up new events"""
+        product = create_product(client, vendor)
+        params = {"granularity": "day", "from": "2026-03-10", "to": "2026-03-10"}
+
+        self.record(product["id"], datetime(2026, 3, 10, 9), datetime(2026, 3, 10, 10))
+        self.rollup()
+        self.rollup()
+        assert self.series(client, vendor, product["id"], **params)["total"] == 2
+
+        self.record(product["id"], datetime(2026, 3, 10, 11))
+        self.rollup()
+        assert self.series(client, vendor, product["id"], **params)["total"] == 3
+
+    def test_unsettled_events_wait(self, client, vendor):
+        """Test events newer than the settle delay are left for the next run"""
+        product = create_product(client, vendor)
+
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        params = {"granularity": "hour", "from": hour.isoformat(), "to": hour.isoformat()}
+
+        self.record(product["id"], datetime.utcnow())
+        self.rollup(now=datetime.utcnow())
+        assert self.series(client, vendor, product["id"], **params)["total"] == 0
+
+        self.rollup()
+        assert self.series(client, vendor, product["id"], **params)["total"] == 1
+
+    def test_prune_keeps_rollups(self, client, vendor):
+        """Test old raw events are deleted in batches while rollups remain"""
+        product = create_product(client, vendor)
+        self.record(product["id"], *[datetime(2026, 1, 5, 12, i) for i in range(5)])
+        self.rollup()
+
+        db = SessionLocal()
+        try:
+            assert prune_click_events(db, retention_days=30, batch_size=2) >= 5
+            remaining = db.execute(
+                select(func.count()).select_from(ProductClickEvent).where(ProductClickEvent.product_id == product["id"])
+            ).scalar()
+        finally:
+            db.close()
+
+        assert remaining == 0
+        daily = self.series(client, vendor, product["id"], granularity="day", **{"from": "2026-01-05", "to": "2026-01-05"})
+        assert daily["total"] == 5
+
+    def test_prune_skips_unrolled_events(self, client, vendor):
+        """Test events not yet rolled up are never pruned"""
+        product = create_product(client, vendor)
+        self.rollup()
+        self.record(product["id"], datetime(2026, 1, 1))
+
+        db = SessionLocal()
+        try:
+            prune_click_events(db, retention_days=30)
+            remaining = db.execute(
+                select(func.count()).select_from(ProductClickEvent).where(ProductClickEvent.product_id == product["id"])
+            ).scalar()
+        finally:
+            db.close()
+        assert remaining == 1
+
+    def test_invalid_requests(self, client, vendor, test_app):
+        """Test range validation, ownership and authentication"""
+        product = create_product(client, vendor)
+        url = f"/api/products/{product['id']}/clicks"
+
+        response = client.get(url, params={"from": "2026-03-10", "to": "2026-03-01"}, headers=vendor["headers"])
+        assert response.status_code == 400
+        response = client.get(url, params={"from": "2025-01-01", "to": "2026-03-01"}, headers=vendor["headers"])
+        assert response.status_code == 400
+        response = client.get(url, params={"granularity": "minute"}, headers=vendor["headers"])
+        assert response.status_code == 422
+        assert client.get("/api/products/product_missing/clicks", headers=vendor["headers"]).status_code == 404
+        assert TestClient(test_app).get(url).status_code == 401
+
+
+class TestBulkProducts:
+    """Test cases for bulk import and bulk update"""
+
+    def products(self, client, vendor, **params):
+        response = client.get("/api/products/", params={"sort": "price_asc", **params}, headers=vendor["headers"])
+        return [(p["name"], p["price"], p["is_available"]) for p in response.json()]
+
+    def test_csv_import_reports_row_errors(self, client, vendor):
+        """Test valid CSV rows are inserted in one statement and bad rows reported"""
+        body = (
+            "name,price,description,is_available\n"
+            "Mug,12.5,Ceramic,true\n"
+            "Broken,-3,,\n"
+            "Cap,20,,no\n"
+            ",5,,\n"
+        )
+
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            response = client.post(
+                "/api/products/bulk", content=body,
+                headers={**vendor["headers"], "Content-Type": "text/csv"}
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        assert response.status_code == 200
+        result = response.json()
+        assert result["created"] == 2 and len(result["product_ids"]) == 2
+        assert [error["row"] for error in result["errors"]] == [2, 4]
+        assert result["errors"][0]["errors"][0].startswith("price")
+        assert len([s for s in statements if s.startswith("INSERT INTO products ")]) == 1
+        assert self.products(client, vendor) == [("Mug", 12.5, True), ("Cap", 20.0, False)]
+
+        storefront = client.get(f"/api/store/{vendor['username']}").json()
+        assert sorted(p["name"] for p in storefront["products"]) == ["Mug"]
+
+    def test_json_import_atomic(self, client, vendor):
+        """Test atomic imports insert nothing when a row is invalid"""
+        rows = [{"name": "Ok", "price": 1}, {"name": "Bad"}]
+        response = client.post("/api/products/bulk?atomic=true", json=rows, headers=vendor["headers"])
+        assert response.json()["created"] == 0
+        assert response.json()["errors"][0]["row"] == 2
+
+        response = client.post("/api/products/bulk", json={"products": rows[:1]}, headers=vendor["headers"])
+        assert response.json()["created"] == 1
+
+    def test_unreadable_body(self, client, vendor):
+        """Test unsupported or malformed bodies are rejected"""
+        headers = {**vendor["headers"], "Content-Type": "application/xml"}
+        assert client.post("/api/products/bulk", content=b"<a/>", headers=headers).status_code == 400
+        headers["Content-Type"] = "application/json"
+        assert client.post("/api/products/bulk", content=b"{nope", headers=headers).status_code == 400
+        assert client.post("/api/products/bulk", content=b'{"name": "x"}', headers=headers).status_code == 400
+
+    def test_bulk_update_is_one_statement(self, client, vendor):
+        """Test a filtered price change runs as a single UPDATE"""
+        client.post("/api/products/bulk", json=[
+            {"name": "Cheap", "price": 10},
+            {"name": "Mid", "price": 20},
+            {"name": "Dear", "price": 100},
+        ], headers=vendor["headers"])
+
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            response = client.patch("/api/products/bulk", json={
+                "filter": {"max_price": 50},
+                "set": {"price_multiplier": 1.15}
+            }, headers=vendor["headers"])
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        assert response.status_code == 200
+        assert response.json() == {"updated": 2}
+        assert len([s for s in statements if s.startswith("UPDATE products ")]) == 1
+        assert self.products(client, vendor) == [("Cheap", 11.5, True), ("Mid", 23.0, True), ("Dear", 100.0, True)]
+
+    def test_bulk_update_multiplier_keeps_prices_positive(self, client, vendor):
+        """Test a multiplier rounding a price to 0.00 leaves it at the minimum price"""
+        client.post("/api/products/bulk", json=[
+            {"name": "Penny", "price": 0.01}, {"name": "Dime", "price": 0.1}
+        ], headers=vendor["headers"])
+
+        response = client.patch("/api/products/bulk", json={
+            "set": {"price_multiplier": 0.1}
+        }, headers=vendor["headers"])
+
+        assert response.json() == {"updated": 2}
+        assert sorted(self.products(client, vendor)) == [("Dime", 0.01, True), ("Penny", 0.01, True)]
+
+    def test_bulk_update_by_ids(self, client, vendor):
+        """Test toggling availability only touches the vendor's listed products"""
+        ids = client.post("/api/products/bulk", json=[
+            {"name": "A", "price": 1}, {"name": "B", "price": 2}
+        ], headers=vendor["headers"]).json()["product_ids"]
+
+        response = client.patch("/api/products/bulk", json={
+            "filter": {"product_ids": [ids[0], "product_of_someone_else"]},
+            "set": {"is_available": False}
+        }, headers=vendor["headers"])
+        assert response.json() == {"updated": 1}
+        assert self.products(client, vendor) == [("A", 1.0, False), ("B", 2.0, True)]
+
+    def test_bulk_update_validation(self, client, vendor):
+        """Test conflicting or empty changes are rejected"""
+        for changes in ({"price": 5, "price_multiplier": 2}, {}, {"price": 0}):
+            response = client.patch("/api/products/bulk", json={"set": changes}, headers=vendor["headers"])
+            assert response.status_code == 422
+
+    def test_bulk_update_cors_preflight(self, client):
+        """Test browsers may send PATCH to the bulk update endpoint"""
+        response = client.options("/api/products/bulk", headers={
+            "Origin": "http://localhost:5173",
+            "Access-Control-Request-Method": "PATCH",
+            "Access-Control-Request-Headers": "authorization,content-type"
+        })
+        assert response.status_code == 200
+        assert "PATCH" in response.headers["access-control-allow-methods"]
+        assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+
+
+class TestBulkDelete:
+    """Test cases for bulk deletion and image storage cleanup"""
+
+    def set_images(self, product_id, *urls):
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(Product).where(Product.id == product_id).values(
+                    **{f"image_url_{i}": url for i, url in enumerate(urls, 1)}
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def test_bulk_delete_removes_rows_and_images(self, client, vendor, tmp_path, monkeypatch):
+        """Test owned products are deleted and their S3 and local images removed"""
+        ids = client.post("/api/products/bulk", json=[
+            {"name": "A", "price": 1}, {"name": "B", "price": 2}, {"name": "Keep", "price": 3}
+        ], headers=vendor["headers"]).json()["product_ids"]
+
+        monkeypatch.setattr(image_storage, "UPLOAD_DIR", str(tmp_path))
+        (tmp_path / "a.jpg").write_bytes(b"img")
+        self.set_images(ids[0], "/uploads/a.jpg", "https://bucket.s3.us-east-1.amazonaws.com/qv-products-img/a/1.jpg")
+        self.set_images(ids[1], "https://api.example.com/uploads/missing.jpg")
+
+        s3_manager = MagicMock()
+        s3_manager.delete_objects.return_value = 1
+        with patch.object(image_storage, "get_s3_manager", return_value=s3_manager):
+            response = client.post(
+                "/api/products/bulk-delete",
+                json={"product_ids": ids[:2] + ["product_of_someone_else"]},
+                headers=vendor["headers"]
+            )
+
+        assert response.status_code == 200
+        assert response.json() == {"deleted": 2, "not_found": ["product_of_someone_else"], "images_removed": 2}
+        s3_manager.delete_objects.assert_called_once_with(["qv-products-img/a/1.jpg"])
+        assert not (tmp_path / "a.jpg").exists()
+        assert [p["name"] for p in client.get("/api/products/", headers=vendor["headers"]).json()] == ["Keep"]
+
+    def test_single_delete_removes_s3_image(self, client, vendor):
+        """Test deleting one product also deletes its S3 objects"""
+        product = create_product(client, vendor)
+        self.set_images(product["id"], "https://bucket.s3.us-east-1.amazonaws.com/qv-products-img/x/1.jpg")
+
+        s3_manager = MagicMock()
+        with patch.object(image_storage, "get_s3_manager", return_value=s3_manager):
+            response = client.delete(f"/api/products/{product['id']}", headers=vendor["headers"])
+
+        assert response.status_code == 204
+        s3_manager.delete_objects.assert_called_once_with(["qv-products-img/x/1.jpg"])
+
+    def test_delete_objects_batches(self):
+        """Test keys are sent 1000 per request and failures are not counted"""
+        s3_manager = S3Manager.__new__(S3Manager)
+        s3_manager.bucket_name = "bucket"
+        s3_manager.s3_client = MagicMock()
+        s3_manager.s3_client.delete_objects.side_effect = [
+            {}, {"Errors": [{"Key": "k1500", "Code": "AccessDenied", "Message": "denied"}]}, {}
+        ]
+
+        with patch.object(S3Manager, "is_s3_configured", return_value=True):
+            deleted = s3_manager.delete_objects([f"k{i}" for i in range(2500)] + ["k0"])
+
+        assert deleted == 2499
+        batches = [len(call.kwargs["Delete"]["Objects"]) for call in s3_manager.s3_client.delete_objects.call_args_list]
+        assert batches == [1000, 1000, 500]
+
+    def test_image_uploads_are_single_streamed_puts(self):
+        """Test image uploads stay under the multipart threshold (parts are read into memory)"""
+        from app.services import s3_manager as s3_module
+
+        assert s3_module.UPLOAD_MULTIPART_THRESHOLD > image_storage.MAX_PRODUCT_IMAGE_BYTES
+        assert s3_module.UPLOAD_MULTIPART_THRESHOLD > image_storage.MAX_BANNER_BYTES
+
+        s3_manager = S3Manager.__new__(S3Manager)
+        s3_manager.bucket_name = "bucket"
+        s3_manager.aws_region = "us-east-1"
+        s3_manager.s3_client = MagicMock()
+        with patch.object(S3Manager, "is_s3_configured", return_value=True):
+            asyncio.run(s3_manager.upload_image_object(io.BytesIO(b"x"), "qv-products-img/blobs/a.jpg", "a.jpg"))
+
+        kwargs = s3_manager.s3_client.upload_fileobj.call_args.kwargs
+        assert kwargs["Config"] is s3_module.UPLOAD_TRANSFER_CONFIG
+
+    def test_url_mapping(self):
+        """Test URLs map to S3 keys or files inside the upload directory"""
+        assert image_storage.s3_key_from_url("https://b.s3.eu-west-1.amazonaws.com/qv-products-img/p/x.png") == "qv-products-img/p/x.png"
+        assert image_storage.s3_key_from_url("/uploads/x.png") is None
+        assert image_storage.local_path_from_url("/uploads/../../etc/passwd") == "uploads/passwd"
+        assert image_storage.local_path_from_url("https://cdn.example.com/other/x.png") is None
+
+
+class TestCreateProductImages:
+    """Test cases for concurrent image uploads in create_product"""
+
+    def fake_s3(self, fail_names=()):
+        """S3 manager whose uploads take a moment and record peak concurrency"""
+        s3_manager = MagicMock()
+        s3_manager.is_s3_configured.return_value = True
+        state = {"active": 0, "peak": 0}
+
+        async def upload_image_object(file_content, s3_key, filename, content_type=None):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.05)
+            state["active"] -= 1
+            if filename in fail_names:
+                raise RuntimeError("S3 down")
+            return f"https://bucket.s3.us-east-1.amazonaws.com/{s3_key}"
+
+        s3_manager.upload_image_object = upload_image_object
+        return s3_manager, state
+
+    def post_with_images(self, client, vendor, count):
+        contents = [image_bytes(f"jpeg-{i}") for i in range(1, count + 1)]
+        files = {f"image_{i}": (f"{i}.jpg", content, "image/jpeg") for i, content in enumerate(contents, 1)}
+        response = client.post(
+            "/api/products/", data={"name": "Gallery", "price": "10"}, files=files, headers=vendor["headers"]
+        )
+        return response, contents
+
+    def test_uploads_run_concurrently_with_one_insert(self, client, vendor, monkeypatch):
+        """Test images upload in parallel up to the limit and the product is written once"""
+        s3_manager, state = self.fake_s3()
+        monkeypatch.setattr(products_api, "get_s3_manager", lambda: s3_manager)
+        monkeypatch.setattr(products_api.settings, "IMAGE_UPLOAD_CONCURRENCY", 3)
+
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            response, contents = self.post_with_images(client, vendor, 5)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        assert response.status_code == 201
+        product = response.json()
+        assert [url.rsplit("/", 1)[-1] for url in product["image_urls"]] == [blob_name(c, ".jpg") for c in contents]
+        assert state["peak"] == 3
+        assert len([s for s in statements if s.startswith("INSERT INTO products ")]) == 1
+        assert not [s for s in statements if s.startswith("UPDATE products ")]
+
+    def test_failed_upload_falls_back_to_local(self, client, vendor, tmp_path, monkeypatch):
+        """Test an image whose S3 upload fails is saved locally instead"""
+        s3_manager, _ = self.fake_s3(fail_names={"2.jpg"})
+        monkeypatch.setattr(products_api, "get_s3_manager", lambda: s3_manager)
+        monkeypatch.setattr(image_storage, "UPLOAD_DIR", str(tmp_path))
+
+        response, contents = self.post_with_images(client, vendor, 2)
+
+        assert response.status_code == 201
+        product = response.json()
+        assert product["image_urls"][0].startswith("https://")
+        assert product["image_urls"][1] == f"/uploads/{blob_name(contents[1], '.jpg')}"
+        assert (tmp_path / blob_name(contents[1], ".jpg")).read_bytes() == contents[1]
+
+
+class TestLocalImageStorage:
+    """Test cases for atomic, off-loop local image writes"""
+
+    def test_write_is_atomic(self, tmp_path):
+        """Test a failed copy leaves neither the target nor a temp file"""
+        class BrokenStream:
+            def __init__(self):
+                self.reads = 0
+
+            def read(self, size):
+                self.reads += 1
+                if self.reads > 1:
+                    raise IOError("client disconnected")
+                return b"x" * size
+
+        target = tmp_path / "img.jpg"
+        with pytest.raises(IOError):
+            image_storage.write_local_file(BrokenStream(), str(target))
+        assert list(tmp_path.iterdir()) == []
+
+    def test_fsync_policy(self, tmp_path):
+        """Test files are synced unless the policy is none"""
+        with patch.object(image_storage.os, "fsync") as fsync:
+            image_storage.write_local_file(io.BytesIO(b"a"), str(tmp_path / "a.jpg"), fsync="none")
+            assert fsync.call_count == 0
+            image_storage.write_local_file(io.BytesIO(b"b"), str(tmp_path / "b.jpg"), fsync="file")
+            assert fsync.call_count == 1
+            image_storage.write_local_file(io.BytesIO(b"c"), str(tmp_path / "c.jpg"), fsync="full")
+            assert fsync.call_count == 3
+        assert (tmp_path / "c.jpg").read_bytes() == b"c"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["a.jpg", "b.jpg", "c.jpg"]
+
+    def test_update_replaces_local_image(self, client, vendor, tmp_path, monkeypatch):
+        """Test a replaced image is removed unless the new upload is the same file"""
+        monkeypatch.setattr(image_storage, "UPLOAD_DIR", str(tmp_path))
+        monkeypatch.setattr(products_api, "get_s3_manager", lambda: MagicMock(is_s3_configured=lambda: False))
+
+        old = image_bytes("old")
+        product = client.post(
+            "/api/products/", data={"name": "Pic", "price": "10"},
+            files={"image_1": ("a.png", old, "image/png")}, headers=vendor["headers"]
+        ).json()
+        old_file = tmp_path / blob_name(old, ".png")
+        assert old_file.read_bytes() == old
+
+        def replace(filename, content):
+            response = client.put(
+                f"/api/products/{product['id']}",
+                files={"image_1": (filename, content, "image/jpeg")}, headers=vendor["headers"]
+            )
+            assert response.status_code == 200
+            return response.json()["image_urls"][0]
+
+        assert replace("b.png", old) == product["image_urls"][0]
+        assert old_file.read_bytes() == old
+
+        new = image_bytes("new")
+        replace("c.jpg", new)
+        assert not old_file.exists()
+        assert (tmp_path / blob_name(new, ".jpg")).read_bytes() == new
+
+
+class TestUploadLimits:
+    """Test cases for early rejection and streaming of uploads"""
+
+    def test_content_length_over_limit_rejected_before_handler(self, test_app):
+        """Test a declared oversized upload gets 413 without authentication or parsing"""
+        anonymous = TestClient(test_app)
+        response = anonymous.post(
+            "/api/products/some-id/images/upload",
+            content=b"x" * 16,
+            headers={"content-length": str(20 * 1024 * 1024), "content-type": "multipart/form-data; boundary=x"}
+        )
+        assert response.status_code == 413
+
+    def test_rejection_carries_cors_headers(self, test_app):
+        """Test browsers can read the 413 (the limit sits inside CORSMiddleware)"""
+        anonymous = TestClient(test_app)
+        response = anonymous.post(
+            "/api/products/some-id/images/upload",
+            content=b"x" * 16,
+            headers={
+                "origin": "http://localhost:5173",
+                "content-length": str(20 * 1024 * 1024),
+                "content-type": "multipart/form-data; boundary=x"
+            }
+        )
+        assert response.status_code == 413
+        assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+
+        names = [middleware.cls.__name__ for middleware in test_app.user_middleware]
+        assert names.index("CORSMiddleware") < names.index("BodySizeLimitMiddleware")
+
+    def test_other_routes_are_not_limited(self, test_app):
+        """Test only the upload and import routes get a body size limit"""
+        anonymous = TestClient(test_app)
+        response = anonymous.post(
+            "/api/users/register",
+            json={"email": "big@example.com", "password": "x" * (2 * 1024 * 1024), "whatsapp_number": "1"}
+        )
+        assert response.status_code != 413
+
+    def test_streamed_body_stops_at_limit(self, client, vendor):
+        """Test a chunked body is cut off with 413 once it passes the limit"""
+        received = []
+
+        def chunks():
+            for _ in range(8):
+                received.append(1)
+                yield b"name,price\n" + b"x" * (1024 * 1024)
+
+        response = client.post(
+            "/api/products/bulk", content=chunks(),
+            headers={**vendor["headers"], "content-type": "text/csv"}
+        )
+        assert response.status_code == 413
+        assert "maximum" in response.json()["detail"]
+
+    def test_ensure_upload_size(self):
+        """Test the size check uses the spooled file and rewinds it"""
+        upload = products_api.UploadFile(file=io.BytesIO(b"abcdef"), filename="a.jpg")
+        upload.file.read(3)
+        assert image_storage.ensure_upload_size(upload, 6).read() == b"abcdef"
+
+        with pytest.raises(products_api.HTTPException) as exc:
+            image_storage.ensure_upload_size(upload, 5)
+        assert exc.value.status_code == 413
+
+    def test_upload_streams_spooled_file_to_s3(self, client, vendor, monkeypatch):
+        """Test the S3 upload is handed the parser's file rather than an in-memory copy"""
+        product = create_product(client, vendor, name="Streamed")
+        seen = {}
+
+        async def upload_image_object(file_content, s3_key, filename, content_type=None):
+            seen["type"] = type(file_content)
+            seen["content"] = file_content.read()
+            return f"https://bucket.s3.us-east-1.amazonaws.com/{s3_key}"
+
+        s3_manager = MagicMock()
+        s3_manager.is_s3_configured.return_value = True
+        s3_manager.upload_image_object = upload_image_object
+        monkeypatch.setattr(products_api, "get_s3_manager", lambda: s3_manager)
+
+        content = image_bytes("jpeg")
+        response = client.post(
+            f"/api/products/{product['id']}/images/upload",
+            files={"image": ("a.jpg", content, "image/jpeg")}, headers=vendor["headers"]
+        )
+
+        assert response.status_code == 200
+        assert seen["content"] == content
+        assert seen["type"] is not io.BytesIO
+
+
+class TestImageVariants:
+    """Test cases for resized image variants"""
+
+    @pytest.fixture
+    def local_pipeline(self, tmp_path, monkeypatch):
+        """Local storage with a fake renderer running in a thread pool"""
+        def render(source_path, output_dir, image_format="webp", quality=80):
+            self.renders += 1
+            with open(source_path, "rb") as source:
+                content = source.read()
+            outputs = {}
+            for name in image_variants.VARIANT_WIDTHS:
+                outputs[name] = os.path.join(output_dir, f"{name}.webp")
+                with open(outputs[name], "wb") as output:
+                    output.write(content + name.encode())
+            return outputs
+
+        self.renders = 0
+        pool = ThreadPoolExecutor(max_workers=1)
+        no_s3 = MagicMock(is_s3_configured=lambda: False)
+        monkeypatch.setattr(image_variants, "PIL_AVAILABLE", True)
+        monkeypatch.setattr(image_variants, "render_variants", render)
+        monkeypatch.setattr(image_variants, "get_variant_pool", lambda: pool)
+        monkeypatch.setattr(image_variants, "get_s3_manager", lambda: no_s3)
+        monkeypatch.setattr(products_api, "get_s3_manager", lambda: no_s3)
+        monkeypatch.setattr(image_storage, "UPLOAD_DIR", str(tmp_path))
+        yield tmp_path
+        pool.shutdown()
+
+    def listed(self, client, vendor, product_id):
+        products = client.get("/api/products/", headers=vendor["headers"]).json()
+        return next(p for p in products if p["id"] == product_id)
+
+    def test_variant_list_follows_image_urls(self):
+        """Test variants line up with image_urls and missing ones are None"""
+        variants = image_variant_list(
+            [None, "/uploads/a.jpg", "/uploads/b.jpg", None, None],
+            {"2": {"thumbnail": "/uploads/a_t.webp"}}
+        )
+        assert variants == [
+            {"thumbnail": "/uploads/a_t.webp", "medium": None, "full": None},
+            {"thumbnail": None, "medium": None, "full": None},
+        ]
+
+    def test_variants_generated_after_upload(self, client, vendor, local_pipeline):
+        """Test variants are stored as blobs like the original and exposed on the product and storefront"""
+        content = image_bytes("jpeg")
+        response = client.post(
+            "/api/products/", data={"name": "Photo", "price": "10"},
+            files={"image_2": ("a.jpg", content, "image/jpeg")}, headers=vendor["headers"]
+        )
+        assert response.status_code == 201
+        product_id = response.json()["id"]
+
+        variants = self.listed(client, vendor, product_id)["image_variants"]
+        assert len(variants) == 1 and set(variants[0]) == {"thumbnail", "medium", "full"}
+        thumbnail = local_pipeline / variants[0]["thumbnail"].rsplit("/", 1)[-1]
+        assert thumbnail.read_bytes() == content + b"thumbnail"
+
+        storefront = client.get(f"/api/store/{vendor['username']}").json()
+        assert next(p for p in storefront["products"] if p["id"] == product_id)["image_variants"] == variants
+
+    def test_replacing_image_removes_old_variants(self, client, vendor, local_pipeline):
+        """Test a replaced image's variants are deleted and regenerated"""
+        old_content, new_content = image_bytes("old"), image_bytes("new")
+        product_id = client.post(
+            "/api/products/", data={"name": "Photo", "price": "10"},
+            files={"image_1": ("a.jpg", old_content, "image/jpeg")}, headers=vendor["headers"]
+        ).json()["id"]
+        old = self.listed(client, vendor, product_id)["image_variants"][0]
+
+        response = client.put(
+            f"/api/products/{product_id}",
+            files={"image_1": ("b.jpg", new_content, "image/jpeg")}, headers=vendor["headers"]
+        )
+        assert response.status_code == 200
+
+        new = self.listed(client, vendor, product_id)["image_variants"][0]
+        assert new["full"] != old["full"]
+        assert (local_pipeline / new["full"].rsplit("/", 1)[-1]).read_bytes() == new_content + b"full"
+        assert not [url for url in old.values() if (local_pipeline / url.rsplit("/", 1)[-1]).exists()]
+
+        client.delete(f"/api/products/{product_id}", headers=vendor["headers"])
+        assert not [url for url in new.values() if (local_pipeline / url.rsplit("/", 1)[-1]).exists()]
+
+    def test_saving_variants_releases_previous_ones(self, client, vendor, local_pipeline):
+        """Test variants recorded again for a slot release the ones they replace"""
+        product = client.post(
+            "/api/products/", data={"name": "Photo", "price": "10"},
+            files={"image_1": ("a.jpg", image_bytes("regenerated"), "image/jpeg")}, headers=vendor["headers"]
+        ).json()
+        old = self.listed(client, vendor, product["id"])["image_variants"][0]
+        new = {
+            name: asyncio.run(image_blobs.store_image_blob(io.BytesIO(image_bytes(f"v2-{name}")), f"{name}.webp"))
+            for name in image_variants.VARIANT_WIDTHS
+        }
+
+        assert image_variants._save_variants(product["id"], 1, product["image_urls"][0], new)
+
+        assert self.listed(client, vendor, product["id"])["image_variants"] == [new]
+        assert not [url for url in old.values() if (local_pipeline / url.rsplit("/", 1)[-1]).exists()]
+
+    def test_identical_image_reuses_variants(self, client, vendor, local_pipeline):
+        """Test variants rendered for an image are shared by products with the same bytes"""
+        content = image_bytes("shared")
+        product_ids = [
+            client.post(
+                "/api/products/", data={"name": f"Copy {i}", "price": "10"},
+                files={"image_1": ("a.jpg", content, "image/jpeg")}, headers=vendor["headers"]
+            ).json()["id"]
+            for i in range(2)
+        ]
+
+        first, second = (self.listed(client, vendor, product_id)["image_variants"] for product_id in product_ids)
+        assert first == second and first[0]["full"]
+        assert self.renders == 1
+
+        client.delete(f"/api/products/{product_ids[0]}", headers=vendor["headers"])
+        assert (local_pipeline / second[0]["full"].rsplit("/", 1)[-1]).exists()
+
+    def test_stale_variants_discarded(self, client, vendor, local_pipeline):
+        """Test variants rendered for an image that was replaced meanwhile are not kept"""
+        product = create_product(client, vendor, name="Plain")
+        source = local_pipeline / "source.jpg"
+        source.write_bytes(b"jpeg")
+
+        result = asyncio.run(image_variants.generate_image_variants(
+            product["id"], 1, "/uploads/gone.jpg", str(source)
+        ))
+
+        assert result is None
+        assert sorted(p.name for p in local_pipeline.iterdir()) == ["source.jpg"]
+        assert self.listed(client, vendor, product["id"])["image_variants"] == []
+
+    def test_render_variants(self, tmp_path):
+        """Test real variants are downscaled WebP files capped at each width"""
+        Image = pytest.importorskip("PIL.Image")
+        source = tmp_path / "photo.jpg"
+        Image.new("RGB", (1600, 900), "red").save(source)
+        output_dir = tmp_path / "out"
+        output_dir.mkdir()
+
+        outputs = image_variants.render_variants(str(source), str(output_dir))
+
+        for name, width in image_variants.VARIANT_WIDTHS.items():
+            with Image.open(outputs[name]) as variant:
+                assert variant.format == "WEBP"
+                assert variant.width == width
+
+
+class TestImageBlobs:
+    """Test cases for content-addressed, reference-counted image storage"""
+
+    @pytest.fixture
+    def s3(self, monkeypatch):
+        """Fake S3 manager recording uploads and deletions"""
+        s3_manager = MagicMock()
+        s3_manager.is_s3_configured.return_value = True
+        s3_manager.uploads = []
+
+        async def upload_image_object(file_content, s3_key, filename, content_type=None):
+            s3_manager.uploads.append((s3_key, file_content.read()))
+            return f"https://bucket.s3.us-east-1.amazonaws.com/{s3_key}"
+
+        s3_manager.upload_image_object = upload_image_object
+        s3_manager.delete_objects.side_effect = lambda keys: len(keys)
+        monkeypatch.setattr(products_api, "get_s3_manager", lambda: s3_manager)
+        monkeypatch.setattr(image_storage, "get_s3_manager", lambda: s3_manager)
+        return s3_manager
+
+    def ref_count(self, url):
+        with SessionLocal() as db:
+            return db.query(ImageBlob.ref_count).filter(ImageBlob.url == url).scalar()
+
+    def test_identical_uploads_share_one_object(self, client, vendor, s3):
+        """Test the same bytes are uploaded once and deleted with their last reference"""
+        content = image_bytes("photo")
+        products = [
+            client.post(
+                "/api/products/", data={"name": f"Listing {i}", "price": "10"},
+                files={"image_1": (f"{i}.JPG", content, "image/jpeg")}, headers=vendor["headers"]
+            ).json()
+            for i in range(2)
+        ]
+
+        key = f"qv-products-img/blobs/{blob_name(content, '.jpg')}"
+        assert s3.uploads == [(key, content)]
+        url = products[0]["image_urls"][0]
+        assert url.endswith(key) and products[1]["image_urls"] == [url]
+        assert self.ref_count(url) == 2
+
+        client.delete(f"/api/products/{products[0]['id']}", headers=vendor["headers"])
+        assert self.ref_count(url) == 1
+        assert all(key not in call.args[0] for call in s3.delete_objects.call_args_list)
+
+        client.delete(f"/api/products/{products[1]['id']}", headers=vendor["headers"])
+        assert self.ref_count(url) is None
+        assert key in s3.delete_objects.call_args.args[0]
+
+    def test_local_copy_is_not_reused_for_s3(self, client, vendor, s3, tmp_path, monkeypatch):
+        """Test bytes stored locally (e.g. during an S3 outage) are still uploaded to S3"""
+        monkeypatch.setattr(image_storage, "UPLOAD_DIR", str(tmp_path))
+        content = image_bytes("outage")
+        local_url = asyncio.run(image_blobs.store_image_blob(io.BytesIO(content), "a.jpg"))
+        assert local_url.startswith("/uploads/")
+
+        product = client.post(
+            "/api/products/", data={"name": "After outage", "price": "10"},
+            files={"image_1": ("a.jpg", content, "image/jpeg")}, headers=vendor["headers"]
+        ).json()
+
+        key = f"qv-products-img/blobs/{blob_name(content, '.jpg')}"
+        assert s3.uploads == [(key, content)]
+        assert product["image_urls"] == [f"https://bucket.s3.us-east-1.amazonaws.com/{key}"]
+        assert self.ref_count(local_url) == 1
+
+    def test_update_uploads_to_s3(self, client, vendor, s3):
+        """Test replacing an image goes through S3 like creating one"""
+        product = client.post(
+            "/api/products/", data={"name": "Updated listing", "price": "10"}, headers=vendor["headers"]
+        ).json()
+        content = image_bytes("replacement")
+
+        response = client.put(
+            f"/api/products/{product['id']}",
+            files={"image_1": ("new.png", content, "image/png")}, headers=vendor["headers"]
+        )
+
+        key = f"qv-products-img/blobs/{blob_name(content, '.png')}"
+        assert s3.uploads == [(key, content)]
+        assert response.json()["image_urls"] == [f"https://bucket.s3.us-east-1.amazonaws.com/{key}"]
+
+    def test_images_stored_before_blobs_are_deleted(self, client, vendor, tmp_path, monkeypatch):
+        """Test URLs without a blob record are still removed when released"""
+        monkeypatch.setattr(image_storage, "UPLOAD_DIR", str(tmp_path))
+        legacy = tmp_path / "product_legacy_img1.jpg"
+        legacy.write_bytes(b"old upload")
+
+        removed = image_blobs.release_image_urls(["/uploads/product_legacy_img1.jpg"])
+
+        assert removed["local_deleted"] == 1
+        assert not legacy.exists()
+
+    def test_files_are_deleted_after_rows_commit(self, tmp_path, monkeypatch):
+        """Test storage is only touched once the blob row deletion has committed"""
+        monkeypatch.setattr(image_storage, "UPLOAD_DIR", str(tmp_path))
+        url = asyncio.run(image_blobs.store_image_blob(io.BytesIO(image_bytes("committed")), "c.jpg"))
+        delete_image_urls = image_storage.delete_image_urls
+        rows_at_delete = []
+
+        def record_rows(urls):
+            rows_at_delete.append(self.ref_count(url))
+            return delete_image_urls(urls)
+
+        monkeypatch.setattr(image_storage, "delete_image_urls", record_rows)
+        removed = image_blobs.release_image_urls([url])
+
+        assert rows_at_delete == [None]
+        assert removed["local_deleted"] == 1
+        assert not any(tmp_path.iterdir())
+
+    def test_hash_stream_rewinds(self):
+        """Test hashing reads from the current position and restores it"""
+        stream = io.BytesIO(b"skip-content")
+        stream.seek(5)
+        assert image_blobs.hash_stream(stream) == (hashlib.sha256(b"content").hexdigest(), 7)
+        assert stream.tell() == 5
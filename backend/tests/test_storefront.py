@@ -0,0 +1,1118 @@
+import json
+import time
+import uuid
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from app.services.click_counter import flush_product_clicks
+from app.services.pagination import encode_cursor
+from app.services.storefront_cache import StorefrontCache, get_storefront_cache
+
+
+def create_product(client, vendor, name="Cool T-Shirt", price=5000, **fields):
+    """Create a product for a vendor through the API"""
+    data = {"name": name, "price": str(price)}
+    data.update({key: str(value) for key, value in fields.items()})
+    response = client.post("/api/products/", data=data, headers=vendor["headers"])
+    assert response.status_code == 201
+    return response.json()
+
+
+class TestStorefrontCache:
+    """Test cases for the in-process storefront cache"""
+
+    def test_get_and_set(self):
+        """Test a stored value is returned and counted as a hit"""
+        cache = StorefrontCache(max_entries=10, ttl_seconds=60)
+
+        assert cache.get("store") is None
+        cache.set("store", "user_1", {"body": b"{}"})
+
+        assert cache.get("store") == {"body": b"{}"}
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["size"] == 1
+
+    def test_entries_expire(self):
+        """Test entries are dropped once the TTL has passed"""
+        cache = StorefrontCache(max_entries=10, ttl_seconds=60)
+
+        with patch("app.services.storefront_cache.time.monotonic", return_value=1000.0):
+            cache.set("store", "user_1", "value")
+        with patch("app.services.storefront_cache.time.monotonic", return_value=1061.0):
+            assert cache.get("store") is None
+
+        assert cache.stats()["size"] == 0
+
+    def test_least_recently_used_is_evicted(self):
+        """Test the least recently used entry is evicted when full"""
+        cache = StorefrontCache(max_entries=2, ttl_seconds=60)
+
+        cache.set("a", "user_1", 1)
+        cache.set("b", "user_2", 2)
+        cache.get("a")
+        cache.set("c", "user_3", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_invalidate_vendor(self):
+        """Test invalidating a vendor drops all of its keys only"""
+        cache = StorefrontCache(max_entries=10, ttl_seconds=60)
+
+        cache.set("slug", "user_1", 1)
+        cache.set("username", "user_1", 2)
+        cache.set("other", "user_2", 3)
+
+        assert cache.invalidate_vendor("user_1") == 2
+        assert cache.get("slug") is None
+        assert cache.get("username") is None
+        assert cache.get("other") == 3
+
+
+class TestStorefrontEndpoint:
+    """Test cases for the public storefront endpoint"""
+
+    def test_store_not_found(self, client):
+        """Test unknown stores return 404"""
+        response = client.get("/api/store/no-such-store-anywhere")
+        assert response.status_code == 404
+
+    def test_storefront_is_cached_and_invalidated(self, client, vendor):
+        """Test repeated views hit the cache and writes invalidate it"""
+        create_product(client, vendor, name="First Product")
+        cache = get_storefront_cache()
+
+        response = client.get(f"/api/store/{vendor['username']}")
+        assert response.status_code == 200
+        assert [p["name"] for p in response.json()["products"]] == ["First Product"]
+
+        hits = cache.stats()["hits"]
+        response = client.get(f"/api/store/{vendor['username']}")
+        assert response.status_code == 200
+        assert cache.stats()["hits"] == hits + 1
+
+        create_product(client, vendor, name="Second Product")
+        response = client.get(f"/api/store/{vendor['username']}")
+        names = sorted(p["name"] for p in response.json()["products"])
+        assert names == ["First Product", "Second Product"]
+
+    def test_only_available_products_are_listed(self, client, vendor):
+        """Test hidden products are excluded and the store still resolves"""
+        create_product(client, vendor, name="Hidden", is_available=False)
+
+        response = client.get(f"/api/store/{vendor['username']}")
+        assert response.status_code == 200
+        assert response.json()["products"] == []
+
+        visible = create_product(client, vendor, name="Visible")
+        product = client.get(f"/api/store/{vendor['username']}").json()["products"][0]
+        assert product["id"] == visible["id"]
+        assert product["image_urls"] == []
+        assert set(product) == {"id", "name", "price", "image_urls", "image_variants", "description", "is_available"}
+
+    def test_lookup_by_slug_and_handle(self, client, vendor):
+        """Test a store resolves by custom slug and by legacy username"""
+        slug = f"shop-{vendor['id'][-10:]}"
+        response = client.put(
+            "/api/users/me/store",
+            json={"store_slug": slug},
+            headers=vendor["headers"]
+        )
+        assert response.status_code == 200
+
+        by_slug = client.get(f"/api/store/{slug}")
+        by_handle = client.get(f"/api/store/{vendor['username']}")
+        assert by_slug.status_code == 200
+        assert by_handle.status_code == 200
+        assert by_slug.json()["store_slug"] == by_handle.json()["store_slug"] == slug
+
+    def test_handle_is_not_a_pattern(self, client, vendor):
+        """Test wildcard characters are not treated as LIKE patterns"""
+        response = client.get(f"/api/store/{vendor['username'][:-2]}%")
+        assert response.status_code == 404
+
+    def test_duplicate_prefix_keeps_first_handle(self, client, vendor):
+        """Test a second vendor with the same email prefix does not take over"""
+        response = client.post("/api/users/register", json={
+            "email": f"{vendor['username']}@another-domain.com",
+            "password": "strongpassword123",
+            "whatsapp_number": "2348099999999"
+        })
+        assert response.status_code == 201
+
+        response = client.get(f"/api/store/{vendor['username']}")
+        assert response.json()["whatsapp_number"] == "2348012345678"
+
+    def test_store_update_invalidates_cache(self, client, vendor):
+        """Test changing the store name is visible immediately"""
+        client.get(f"/api/store/{vendor['username']}")
+
+        response = client.put(
+            "/api/users/me/store",
+            json={"store_name": "Renamed Store"},
+            headers=vendor["headers"]
+        )
+        assert response.status_code == 200
+
+        response = client.get(f"/api/store/{vendor['username']}")
+        assert response.json()["vendor_name"] == "Renamed Store"
+
+
+class TestStorefrontConditionalGet:
+    """Test cases for ETag / Last-Modified support on storefronts"""
+
+    def test_validators_are_returned(self, client, vendor):
+        """Test storefront responses carry caching headers"""
+        response = client.get(f"/api/store/{vendor['username']}")
+
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('"')
+        assert "last-modified" in response.headers
+        assert response.headers["cache-control"].startswith("public")
+        assert "Accept-Encoding" in response.headers["vary"]
+
+    def test_matching_etag_returns_304(self, client, vendor):
+        """Test a matching If-None-Match is answered with 304"""
+        create_product(client, vendor)
+        etag = client.get(f"/api/store/{vendor['username']}").headers["etag"]
+
+        # Once from the cache and once after the cache was dropped
+        for _ in range(2):
+            response = client.get(
+                f"/api/store/{vendor['username']}",
+                headers={"If-None-Match": etag}
+            )
+            assert response.status_code == 304
+            assert response.content == b""
+            assert response.headers["etag"] == etag
+            get_storefront_cache().clear()
+
+    def test_etag_changes_after_write(self, client, vendor):
+        """Test product changes produce a new ETag"""
+        etag = client.get(f"/api/store/{vendor['username']}").headers["etag"]
+        create_product(client, vendor)
+
+        response = client.get(
+            f"/api/store/{vendor['username']}",
+            headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert len(response.json()["products"]) == 1
+
+    def test_if_modified_since(self, client, vendor):
+        """Test If-Modified-Since is honoured when no ETag is sent"""
+        last_modified = client.get(f"/api/store/{vendor['username']}").headers["last-modified"]
+
+        response = client.get(
+            f"/api/store/{vendor['username']}",
+            headers={"If-Modified-Since": last_modified}
+        )
+        assert response.status_code == 304
+
+    def test_last_modified_advances_on_delete(self, client, vendor):
+        """Test deleting an older product invalidates If-Modified-Since"""
+        older = create_product(client, vendor, name="Older")
+        create_product(client, vendor, name="Newer")
+        last_modified = client.get(f"/api/store/{vendor['username']}").headers["last-modified"]
+
+        # Last-Modified has one-second resolution
+        time.sleep(1.1)
+        client.delete(f"/api/products/{older['id']}", headers=vendor["headers"])
+
+        response = client.get(
+            f"/api/store/{vendor['username']}",
+            headers={"If-Modified-Since": last_modified}
+        )
+        assert response.status_code == 200
+        assert [p["name"] for p in response.json()["products"]] == ["Newer"]
+        assert response.headers["last-modified"] != last_modified
+
+
+class TestStorefrontPagination:
+    """Test cases for keyset pagination of storefront products"""
+
+    def test_pages_cover_all_products_once(self, client, vendor):
+        """Test walking the cursors returns every product exactly once"""
+        created = [create_product(client, vendor, name=f"Product {i}")["id"] for i in range(5)]
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = client.get(f"/api/store/{vendor['username']}", params=params)
+            assert response.status_code == 200
+            data = response.json()
+            assert len(data["products"]) <= 2
+            seen.extend(p["id"] for p in data["products"])
+            pages += 1
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        assert pages == 3
+        assert len(seen) == len(set(seen))
+        assert sorted(seen) == sorted(created)
+
+    def test_last_page_has_no_cursor(self, client, vendor):
+        """Test a single page returns a null next_cursor"""
+        create_product(client, vendor)
+
+        response = client.get(f"/api/store/{vendor['username']}")
+        assert response.json()["next_cursor"] is None
+
+    def test_invalid_cursor(self, client, vendor):
+        """Test malformed cursors are rejected"""
+        response = client.get(
+            f"/api/store/{vendor['username']}",
+            params={"cursor": "not-a-cursor"}
+        )
+        assert response.status_code == 400
+
+    def test_limit_is_bounded(self, client, vendor):
+        """Test oversized limits are rejected"""
+        response = client.get(f"/api/store/{vendor['username']}", params={"limit": 10000})
+        assert response.status_code == 422
+
+
+class TestStorefrontSnapshots:
+    """Test cases for materialized storefront snapshots"""
+
+    def get_snapshot(self, vendor_id):
+        from app.core.database import SessionLocal
+        from app.models.storefront_snapshot import StorefrontSnapshot
+
+        db = SessionLocal()
+        try:
+            return db.query(StorefrontSnapshot).filter(StorefrontSnapshot.user_id == vendor_id).first()
+        finally:
+            db.close()
+
+    def test_snapshot_written_on_product_change(self, client, vendor):
+        """Test creating a product materializes the storefront"""
+        product = create_product(client, vendor, name="Snapshot Product")
+
+        snapshot = self.get_snapshot(vendor["id"])
+        assert snapshot is not None
+        assert product["id"] in snapshot.body
+        assert snapshot.product_count == 1
+
+    def test_default_page_served_from_snapshot(self, client, vendor):
+        """Test the default page does not run the live query once materialized"""
+        create_product(client, vendor)
+        expected = client.get(f"/api/store/{vendor['username']}").json()
+        get_storefront_cache().clear()
+
+        with patch("app.api.store.load_storefront") as live_query:
+            response = client.get(f"/api/store/{vendor['username']}")
+
+        assert response.status_code == 200
+        assert response.json() == expected
+        assert not live_query.called
+
+    def test_snapshot_regenerated_on_store_update(self, client, vendor):
+        """Test store setting changes rewrite the snapshot"""
+        create_product(client, vendor)
+        client.put(
+            "/api/users/me/store",
+            json={"store_name": "Snapshot Store"},
+            headers=vendor["headers"]
+        )
+        get_storefront_cache().clear()
+
+        response = client.get(f"/api/store/{vendor['username']}")
+        assert response.json()["vendor_name"] == "Snapshot Store"
+        assert "Snapshot Store" in self.get_snapshot(vendor["id"]).body
+
+    def test_snapshot_backfilled_on_read(self, client, vendor):
+        """Test stores without a snapshot get one on first view"""
+        assert self.get_snapshot(vendor["id"]) is None
+
+        client.get(f"/api/store/{vendor['username']}")
+        assert self.get_snapshot(vendor["id"]) is not None
+
+    def test_refresh_locks_vendor_before_reading(self, vendor):
+        """Test the vendor row is locked before the page is rebuilt"""
+        from sqlalchemy import event
+        from app.core.database import SessionLocal
+        from app.services import storefront
+
+        calls = []
+        db = SessionLocal()
+
+        def capture(state):
+            if getattr(state.statement, "_for_update_arg", None) is not None:
+                calls.append(("lock", state.statement.compile().params))
+
+        real_load = storefront.load_storefront
+        def load(*args, **kwargs):
+            calls.append(("load", None))
+            return real_load(*args, **kwargs)
+
+        event.listen(db, "do_orm_execute", capture)
+        try:
+            with patch.object(storefront, "load_storefront", load):
+                storefront.refresh_storefront(db, vendor["id"])
+        finally:
+            event.remove(db, "do_orm_execute", capture)
+            db.close()
+
+        assert [name for name, _ in calls] == ["lock", "load"]
+        assert vendor["id"] in calls[0][1].values()
+        assert self.get_snapshot(vendor["id"]) is not None
+
+
+class TestStorefrontExport:
+    """Test cases for the static storefront export"""
+
+    def export(self, root, **kwargs):
+        from app.core.database import SessionLocal
+        from app.services.storefront_export import LocalExportTarget, export_storefronts
+
+        db = SessionLocal()
+        try:
+            return export_storefronts(db, LocalExportTarget(str(root)), **kwargs)
+        finally:
+            db.close()
+
+    def test_background_export_runs_in_one_process(self, tmp_path, monkeypatch):
+        """Test a worker skips the export while another holds the PostgreSQL lock"""
+        from app.core import database
+        from app.services import storefront_export
+
+        engine = MagicMock()
+        engine.dialect.name = "postgresql"
+        conn = engine.connect.return_value.__enter__.return_value
+        monkeypatch.setattr(database, "engine", engine)
+        monkeypatch.setattr(storefront_export, "get_export_target", lambda: storefront_export.LocalExportTarget(str(tmp_path)))
+        monkeypatch.setattr(storefront_export, "export_storefronts", lambda db, target, include_html: {"exported": 1})
+
+        conn.execute.return_value.scalar.return_value = False
+        assert storefront_export.run_configured_export() is None
+        assert conn.execute.call_count == 1
+
+        conn.execute.return_value.scalar.return_value = True
+        assert storefront_export.run_configured_export() == {"exported": 1}
+        assert "pg_advisory_unlock" in str(conn.execute.call_args.args[0])
+
+    def test_export_writes_storefront_json(self, client, vendor, tmp_path):
+        """Test export writes the same body the API serves"""
+        create_product(client, vendor, name="Exported Product")
+        self.export(tmp_path)
+
+        exported = tmp_path / "storefronts" / f"{vendor['username']}.json"
+        assert exported.exists()
+        assert exported.read_bytes() == client.get(f"/api/store/{vendor['username']}").content
+
+    def test_export_is_incremental(self, client, vendor, tmp_path):
+        """Test unchanged vendors are skipped and changed ones rewritten"""
+        create_product(client, vendor)
+        self.export(tmp_path)
+        exported = tmp_path / "storefronts" / f"{vendor['username']}.json"
+        first_mtime = exported.stat().st_mtime_ns
+
+        stats = self.export(tmp_path)
+        assert stats["exported"] == 0
+        assert exported.stat().st_mtime_ns == first_mtime
+
+        create_product(client, vendor, name="Second Product")
+        stats = self.export(tmp_path)
+        assert stats["exported"] == 1
+        assert "Second Product" in exported.read_text()
+
+    def test_export_removes_stale_slug(self, client, vendor, tmp_path):
+        """Test renaming a slug removes the old static file"""
+        slug = f"export-{uuid.uuid4().hex[:8]}"
+        response = client.put("/api/users/me/store", json={"store_slug": slug}, headers=vendor["headers"])
+        assert response.status_code == 200
+        self.export(tmp_path)
+        assert (tmp_path / "storefronts" / f"{slug}.json").exists()
+
+        client.put("/api/users/me/store", json={"store_slug": slug + "-new"}, headers=vendor["headers"])
+        self.export(tmp_path)
+        assert not (tmp_path / "storefronts" / f"{slug}.json").exists()
+        assert (tmp_path / "storefronts" / f"{slug}-new.json").exists()
+
+    def test_export_html(self, client, vendor, tmp_path):
+        """Test optional HTML pages escape vendor content"""
+        create_product(client, vendor, name="<b>Bold</b>")
+        self.export(tmp_path, include_html=True)
+
+        page = (tmp_path / "storefronts" / f"{vendor['username']}.html").read_text()
+        assert "&lt;b&gt;Bold&lt;/b&gt;" in page
+
+
+class TestStorefrontSearch:
+    """Test cases for per-store full-text search"""
+
+    def search(self, client, vendor, q, **params):
+        return client.get(f"/api/store/{vendor['username']}/search", params={"q": q, **params})
+
+    def test_search_ranks_matches(self, client, vendor):
+        """Test search finds products by name and description"""
+        create_product(client, vendor, name="Leather Boots", description="Brown leather, size 42")
+        create_product(client, vendor, name="Leather Belt")
+        create_product(client, vendor, name="Cotton Shirt")
+
+        response = self.search(client, vendor, "leath")
+        assert response.status_code == 200
+        names = [p["name"] for p in response.json()["products"]]
+        assert sorted(names) == ["Leather Belt", "Leather Boots"]
+
+        names = [p["name"] for p in self.search(client, vendor, "leather brown").json()["products"]]
+        assert names == ["Leather Boots"]
+
+    def test_search_is_per_store(self, client, vendor):
+        """Test other vendors' products never appear"""
+        create_product(client, vendor, name="Unique Searchable Lamp")
+        response = client.get("/api/store/nonexistent-store-xyz/search", params={"q": "lamp"})
+        assert response.status_code == 404
+
+        other_email = f"other_{uuid.uuid4().hex[:8]}@example.com"
+        client.post("/api/users/register", json={
+            "email": other_email, "password": "strongpassword123", "whatsapp_number": "2348012345678"
+        })
+        response = client.get(f"/api/store/{other_email.split('@')[0]}/search", params={"q": "lamp"})
+        assert response.json()["products"] == []
+
+    def test_search_stays_in_sync(self, client, vendor):
+        """Test updates and deletes are reflected in the index"""
+        product = create_product(client, vendor, name="Old Name Vase")
+        response = client.put(f"/api/products/{product['id']}", data={"name": "Ceramic Jug"}, headers=vendor["headers"])
+        assert response.status_code == 200
+
+        assert self.search(client, vendor, "vase").json()["products"] == []
+        assert len(self.search(client, vendor, "ceramic").json()["products"]) == 1
+
+        client.delete(f"/api/products/{product['id']}", headers=vendor["headers"])
+        assert self.search(client, vendor, "ceramic").json()["products"] == []
+
+    def test_search_pagination(self, client, vendor):
+        """Test cursor pagination returns every match once"""
+        for i in range(5):
+            create_product(client, vendor, name=f"Paged Mug {i}")
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            body = self.search(client, vendor, "mug", **params).json()
+            seen.extend(p["id"] for p in body["products"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+
+        assert len(seen) == 5
+        assert len(set(seen)) == 5
+
+    def test_search_pagination_with_tied_ranks(self, client, vendor):
+        """Test products sharing a rank are neither skipped nor repeated across pages"""
+        ids = [create_product(client, vendor, name="Tied Kettle")["id"] for _ in range(5)]
+
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            body = self.search(client, vendor, "kettle", **params).json()
+            seen.extend(p["id"] for p in body["products"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+
+        assert seen == sorted(ids)
+
+    def test_search_rejects_mistyped_cursors(self, client, vendor):
+        """Test cursors that are not (rank, product id) are rejected"""
+        for i in range(2):
+            create_product(client, vendor, name=f"Lamp {i}")
+        storefront_cursor = client.get(
+            f"/api/store/{vendor['username']}", params={"limit": 1}
+        ).json()["next_cursor"]
+
+        for cursor in (storefront_cursor, encode_cursor(["1.5", "product_x"]), encode_cursor([1.5, 7])):
+            assert self.search(client, vendor, "lamp", cursor=cursor).status_code == 400
+
+    def test_search_rank_is_double_precision_on_postgres(self):
+        """Test the PostgreSQL rank is cast so cursors round-trip exactly"""
+        from sqlalchemy.dialects import postgresql
+        from app.services.product_search import _ranked_products
+
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "postgresql"
+        sql = str(_ranked_products(db, "user_x", ["kettle"]).compile(dialect=postgresql.dialect()))
+        assert "CAST(-ts_rank(" in sql
+        assert "AS DOUBLE PRECISION) AS rank" in sql
+
+    def test_search_ignores_query_syntax(self, client, vendor):
+        """Test FTS operators in user input do not cause errors"""
+        create_product(client, vendor, name="Plain Cup")
+        assert self.search(client, vendor, '"cup OR * NEAR(').status_code == 200
+        assert self.search(client, vendor, "!!!").json()["products"] == []
+
+
+class TestStorefrontSorting:
+    """Test cases for storefront sort orders and price filters"""
+
+    def collect(self, client, vendor, **params):
+        """Follow next_cursor through every page and return product names."""
+        names, cursor = [], None
+        while True:
+            query = dict(params, limit=2)
+            if cursor:
+                query["cursor"] = cursor
+            response = client.get(f"/api/store/{vendor['username']}", params=query)
+            assert response.status_code == 200
+            body = response.json()
+            names.extend(p["name"] for p in body["products"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                return names
+
+    def test_price_sorts(self, client, vendor):
+        """Test price_asc and price_desc page through in price order"""
+        for name, price in [("B", 300), ("A", 100), ("D", 300), ("C", 200), ("E", 50)]:
+            create_product(client, vendor, name=name, price=price)
+
+        asc = self.collect(client, vendor, sort="price_asc")
+        assert asc[0] == "E" and asc[1] == "A" and asc[2] == "C"
+        assert sorted(asc[3:]) == ["B", "D"]
+        assert self.collect(client, vendor, sort="price_desc") == list(reversed(asc))
+
+    def test_popular_sort(self, client, vendor):
+        """Test popular orders by click count"""
+        create_product(client, vendor, name="Quiet")
+        busy = create_product(client, vendor, name="Busy")
+        medium = create_product(client, vendor, name="Medium")
+        for _ in range(3):
+            client.post(f"/api/products/{busy['id']}/track-click")
+        client.post(f"/api/products/{medium['id']}/track-click")
+        flush_product_clicks()
+        get_storefront_cache().clear()
+
+        assert self.collect(client, vendor, sort="popular") == ["Busy", "Medium", "Quiet"]
+
+    def test_popular_etag_tracks_clicks(self, client, vendor):
+        """Test flushed clicks change the popular page's ETag but not the default one"""
+        product = create_product(client, vendor)
+        url = f"/api/store/{vendor['username']}"
+        popular = client.get(url, params={"sort": "popular"}).headers["etag"]
+        newest = client.get(url).headers["etag"]
+
+        client.post(f"/api/products/{product['id']}/track-click")
+        flush_product_clicks()
+        get_storefront_cache().clear()
+
+        response = client.get(url, params={"sort": "popular"}, headers={"If-None-Match": popular})
+        assert response.status_code == 200
+        assert client.get(url, headers={"If-None-Match": newest}).status_code == 304
+
+    def test_price_range(self, client, vendor):
+        """Test min_price and max_price are inclusive"""
+        for price in (100, 200, 300, 400):
+            create_product(client, vendor, name=f"P{price}", price=price)
+
+        names = self.collect(client, vendor, sort="price_asc", min_price=200, max_price=300)
+        assert names == ["P200", "P300"]
+
+        response = client.get(f"/api/store/{vendor['username']}", params={"min_price": 5, "max_price": 1})
+        assert response.status_code == 400
+
+    def test_invalid_sort_and_cursor(self, client, vendor):
+        """Test unknown sorts and cursors from another sort are rejected"""
+        for i in range(3):
+            create_product(client, vendor, name=f"Item {i}", price=100 + i)
+
+        response = client.get(f"/api/store/{vendor['username']}", params={"sort": "cheapest"})
+        assert response.status_code == 422
+
+        cursor = client.get(f"/api/store/{vendor['username']}", params={"limit": 1}).json()["next_cursor"]
+        response = client.get(
+            f"/api/store/{vendor['username']}",
+            params={"limit": 1, "cursor": cursor, "sort": "price_asc"}
+        )
+        assert response.status_code == 400
+
+
+class TestStorefrontBatch:
+    """Test cases for the batch storefront endpoint"""
+
+    def test_batch_returns_each_store(self, client, vendor):
+        """Test the batch matches the single-store endpoint and marks unknown stores"""
+        for i in range(3):
+            create_product(client, vendor, name=f"Batch Product {i}")
+
+        response = client.post("/api/store/batch", json={
+            "identifiers": [vendor["username"], "no-such-store-abc", vendor["username"]],
+            "limit": 2
+        })
+        assert response.status_code == 200
+        stores = response.json()["stores"]
+
+        assert stores["no-such-store-abc"] is None
+        single = client.get(f"/api/store/{vendor['username']}", params={"limit": 2}).json()
+        assert stores[vendor["username"]] == single
+
+    def test_batch_pages_each_vendor_separately(self, client, vendor):
+        """Test every vendor gets its own newest products, however many others have"""
+        email = f"batch_{uuid.uuid4().hex[:8]}@example.com"
+        client.post("/api/users/register", json={
+            "email": email, "password": "strongpassword123", "whatsapp_number": "2348012345678"
+        })
+        token = client.post("/api/auth/login", json={"email": email, "password": "strongpassword123"}).json()["access_token"]
+        other = {"username": email.split("@")[0], "headers": {"Authorization": f"Bearer {token}"}}
+
+        for i in range(5):
+            create_product(client, vendor, name=f"Many {i}")
+        create_product(client, other, name="Only")
+
+        stores = client.post("/api/store/batch", json={
+            "identifiers": [vendor["username"], other["username"]], "limit": 3
+        }).json()["stores"]
+        for store in (vendor, other):
+            single = client.get(f"/api/store/{store['username']}", params={"limit": 3}).json()
+            assert stores[store["username"]] == single
+        assert len(stores[vendor["username"]]["products"]) == 3
+        assert stores[vendor["username"]]["next_cursor"] is not None
+        assert [p["name"] for p in stores[other["username"]]["products"]] == ["Only"]
+
+    def test_batch_uses_lateral_on_postgres(self):
+        """Test PostgreSQL reads a top-N per vendor instead of numbering whole catalogs"""
+        from sqlalchemy.dialects import postgresql
+        from app.services.storefront import _first_pages_query
+
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "postgresql"
+        sql = str(_first_pages_query(db, ["user_a", "user_b"], 13).compile(dialect=postgresql.dialect()))
+        assert "JOIN LATERAL" in sql
+        assert "row_number" not in sql
+
+    def test_batch_prefers_slug(self, client, vendor):
+        """Test a slug wins over another vendor's matching handle"""
+        other_email = f"batch_{uuid.uuid4().hex[:8]}@example.com"
+        client.post("/api/users/register", json={
+            "email": other_email, "password": "strongpassword123", "whatsapp_number": "2348012345678"
+        })
+        other_handle = other_email.split("@")[0]
+        client.put("/api/users/me/store", json={"store_slug": other_handle.replace("_", "-")}, headers=vendor["headers"])
+
+        stores = client.post("/api/store/batch", json={
+            "identifiers": [other_handle.replace("_", "-"), other_handle]
+        }).json()["stores"]
+        assert stores[other_handle.replace("_", "-")]["store_slug"] == other_handle.replace("_", "-")
+        assert stores[other_handle]["store_slug"] is None
+
+    def test_batch_limits(self, client):
+        """Test the identifier count is bounded"""
+        assert client.post("/api/store/batch", json={"identifiers": []}).status_code == 422
+        identifiers = [f"store-{i}" for i in range(101)]
+        assert client.post("/api/store/batch", json={"identifiers": identifiers}).status_code == 422
+
+
+class TestStorefrontViews:
+    """Test cases for aggregated storefront view analytics"""
+
+    def test_aggregator_coalesces_per_minute(self):
+        """Test views in the same minute share one bucket"""
+        from datetime import datetime
+        from app.services.storefront_views import ViewAggregator
+
+        aggregator = ViewAggregator()
+        aggregator.record("vendor_1", datetime(2025, 7, 24, 10, 30, 5))
+        aggregator.record("vendor_1", datetime(2025, 7, 24, 10, 30, 59))
+        aggregator.record("vendor_1", datetime(2025, 7, 24, 10, 31, 0))
+        aggregator.record("vendor_2", datetime(2025, 7, 24, 10, 30, 5))
+
+        stats = aggregator.stats()
+        assert stats["pending_buckets"] == 3
+        assert stats["pending_views"] == 4
+
+    def test_views_flushed_and_reported(self, client, vendor):
+        """Test storefront views are counted, flushed and readable by the vendor"""
+        from app.services.storefront_views import flush_storefront_views
+
+        flush_storefront_views()
+        for _ in range(3):
+            client.get(f"/api/store/{vendor['username']}")
+        assert flush_storefront_views() == 3
+
+        response = client.get("/api/users/me/storefront-views?days=7", headers=vendor["headers"])
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["days"]) == 7
+        assert body["days"][-1]["views"] == 3
+        assert body["total"] == 3
+
+        # A second flush adds to the same minute rather than overwriting it
+        client.get(f"/api/store/{vendor['username']}")
+        flush_storefront_views()
+        response = client.get("/api/users/me/storefront-views?days=1", headers=vendor["headers"])
+        assert response.json()["total"] == 4
+
+    def test_views_bucketed_in_utc(self):
+        """Test minutes are stored aware and PostgreSQL groups days in UTC"""
+        from datetime import datetime, timedelta, timezone
+        from sqlalchemy.dialects import postgresql
+        from app.services.storefront_views import StorefrontViewRollup, _minute_bucket, _utc_date
+
+        local = datetime(2025, 7, 24, 1, 30, 5, tzinfo=timezone(timedelta(hours=3)))
+        assert _minute_bucket(local) == datetime(2025, 7, 23, 22, 30, tzinfo=timezone.utc)
+        assert _minute_bucket(datetime(2025, 7, 24, 10, 30, 5)).tzinfo == timezone.utc
+
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "postgresql"
+        sql = str(_utc_date(db, StorefrontViewRollup.minute).compile(dialect=postgresql.dialect()))
+        assert "date(timezone(" in sql
+
+    def test_views_not_sent_to_sentry(self, client, vendor):
+        """Test storefront views no longer emit a Sentry event each"""
+        with patch("app.core.sentry.capture_message_with_context") as capture:
+            client.get(f"/api/store/{vendor['username']}")
+        assert not capture.called
+
+    def test_views_require_auth(self, test_app):
+        """Test the analytics endpoint is private"""
+        from fastapi.testclient import TestClient
+
+        # A fresh client: the shared one carries the login cookie
+        anonymous = TestClient(test_app)
+        assert anonymous.get("/api/users/me/storefront-views").status_code == 401
+
+
+class TestStoreDirectory:
+    """Test cases for the streamed sitemap and store directory"""
+
+    def test_sitemap_index(self, client):
+        """Test the index links to the first sitemap file"""
+        response = client.get("/api/store/sitemap.xml")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/xml")
+        assert "/api/store/sitemap-0.xml</loc>" in response.text
+
+    def test_sitemap_lists_stores(self, client, vendor):
+        """Test every store appears in the sitemap with its public URL"""
+        response = client.get("/api/store/sitemap-0.xml")
+        assert response.status_code == 200
+        assert f"/api/store/{vendor['username']}</loc>" in response.text
+        assert "<lastmod>" in response.text
+
+        assert client.get("/api/store/sitemap-99.xml").status_code == 404
+
+    def test_sitemap_split_at_limit(self, client, vendor):
+        """Test stores are split across files at the URL limit"""
+        from app.services import store_directory
+
+        with patch.object(store_directory, "SITEMAP_MAX_URLS", 2):
+            index = client.get("/api/store/sitemap.xml").text
+            pages = index.count("<sitemap>")
+            assert pages > 1
+
+            seen = []
+            for page in range(pages):
+                body = client.get(f"/api/store/sitemap-{page}.xml").text
+                assert 1 <= body.count("<url>") <= 2
+                seen.extend(body.split("<loc>")[1:])
+        client.get("/api/store/sitemap.xml")
+
+        directory = client.get("/api/store/directory.json").json()["stores"]
+        assert len(seen) == len(set(seen)) == len(directory)
+
+    def test_sitemap_pages_seek_without_offset(self, client, vendor):
+        """Test pages are served from cached boundaries and keep stores added since"""
+        from sqlalchemy import event
+        from app.core.database import engine
+        from app.services import store_directory
+
+        with patch.object(store_directory, "SITEMAP_MAX_URLS", 2):
+            pages = client.get("/api/store/sitemap.xml").text.count("<sitemap>")
+
+            # A store registered after the boundaries were computed
+            email = f"late_{uuid.uuid4().hex[:8]}@example.com"
+            client.post("/api/users/register", json={
+                "email": email, "password": "strongpassword123", "whatsapp_number": "2348012345678"
+            })
+
+            statements = []
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                statements.append((statement, parameters))
+
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                seen = []
+                for page in range(pages):
+                    seen.extend(client.get(f"/api/store/sitemap-{page}.xml").text.split("<loc>")[1:])
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+        client.get("/api/store/sitemap.xml")
+
+        # SQLite renders every LIMIT as LIMIT ? OFFSET ?; the offset must stay 0
+        assert all(parameters[-1] == 0 for statement, parameters in statements if "OFFSET" in statement)
+        assert not [statement for statement, _ in statements if "row_number" in statement]
+        assert len(seen) == len(set(seen))
+        assert sum(f"/api/store/{email.split('@')[0]}</loc>" in loc for loc in seen) == 1
+        directory = client.get("/api/store/directory.json").json()["stores"]
+        assert len(seen) == len(directory)
+
+    def test_directory(self, client, vendor):
+        """Test the JSON directory streams every store"""
+        response = client.get("/api/store/directory.json")
+        assert response.status_code == 200
+        stores = {store["identifier"]: store for store in response.json()["stores"]}
+        assert vendor["username"] in stores
+        assert stores[vendor["username"]]["url"].endswith(f"/api/store/{vendor['username']}")
+
+    def test_iterator_batches(self, client, vendor):
+        """Test keyset batching visits each vendor once"""
+        from app.core.database import SessionLocal
+        from app.services.store_directory import iter_public_stores, public_store_count
+
+        db = SessionLocal()
+        try:
+            ids = [row[0] for row in iter_public_stores(db, batch_size=3)]
+            assert len(ids) == len(set(ids)) == public_store_count(db)
+            assert ids == sorted(ids)
+        finally:
+            db.close()
+
+
+class TestStorefrontStaleWhileRevalidate:
+    """Test cases for stale-while-revalidate and single-flight loads"""
+
+    def test_stale_entries(self):
+        """Test expired entries are served stale until the stale window ends"""
+        cache = StorefrontCache(max_entries=10, ttl_seconds=0.05, stale_seconds=0.2)
+        cache.set("store-a", "vendor_1", {"body": b"a"})
+
+        assert cache.get_entry("store-a") == ({"body": b"a"}, True)
+        time.sleep(0.06)
+        assert cache.get_entry("store-a") == ({"body": b"a"}, False)
+        assert cache.get("store-a") is None
+        time.sleep(0.2)
+        assert cache.get_entry("store-a") is None
+
+    def test_invalidated_entries_never_served_stale(self):
+        """Test invalidation removes entries and discards in-progress fills"""
+        cache = StorefrontCache(max_entries=10, ttl_seconds=60, stale_seconds=60)
+        cache.set("store-a", "vendor_1", {"body": b"a"})
+        generation = cache.generation
+
+        cache.invalidate_vendor("vendor_1")
+        assert cache.get_entry("store-a") is None
+
+        # A fill that started before the invalidation is dropped
+        cache.set("store-a", "vendor_1", {"body": b"old"}, generation=generation)
+        assert cache.get_entry("store-a") is None
+
+    def test_invalidation_only_drops_fills_of_that_vendor(self):
+        """Test writes by other vendors do not discard an in-progress fill"""
+        cache = StorefrontCache(max_entries=2, ttl_seconds=60)
+        generation = cache.generation
+
+        cache.invalidate_vendor("vendor_2")
+        cache.set("store-a", "vendor_1", {"body": b"a"}, generation=generation)
+        assert cache.get("store-a") == {"body": b"a"}
+
+        # Once the invalidation record overflows, older fills are dropped
+        generation = cache.generation
+        for vendor_id in ("vendor_3", "vendor_4", "vendor_5"):
+            cache.invalidate_vendor(vendor_id)
+        cache.set("store-b", "vendor_1", {"body": b"b"}, generation=generation)
+        assert cache.get("store-b") is None
+
+        generation = cache.generation
+        cache.set("store-b", "vendor_1", {"body": b"b"}, generation=generation)
+        assert cache.get("store-b") == {"body": b"b"}
+
+    def test_invalidate_store_drops_identifier_of_any_vendor(self):
+        """Test an identifier is dropped whichever vendor its entries and fills were loaded for"""
+        cache = StorefrontCache(max_entries=10, ttl_seconds=60)
+        cache.set("shop?a", "vendor_1", 1, store_identifier="shop")
+        cache.set("shop?b", "vendor_1", 2, store_identifier="shop")
+        cache.set("other?a", "vendor_1", 3, store_identifier="other")
+        generation = cache.generation
+
+        assert cache.invalidate_store("shop") == 2
+        assert cache.get("shop?a") is None and cache.get("other?a") == 3
+        cache.set("shop?a", "vendor_1", 1, generation=generation, store_identifier="shop")
+        assert cache.get("shop?a") is None
+
+        # The vendor index no longer refers to the dropped keys
+        assert cache.invalidate_vendor("vendor_1") == 1
+
+    def test_slug_takeover_replaces_cached_store(self, client, vendor):
+        """Test taking a slug that matched another vendor's handle serves the new owner at once"""
+        email = f"shop-{uuid.uuid4().hex[:8]}@example.com"
+        handle = email.split("@")[0]
+        assert client.post("/api/users/register", json={
+            "email": email, "password": "strongpassword123", "whatsapp_number": "2348012345678"
+        }).status_code == 201
+        assert client.get(f"/api/store/{handle}").json()["store_slug"] is None
+
+        client.put("/api/users/me/store", json={"store_slug": handle}, headers=vendor["headers"])
+        assert client.get(f"/api/store/{handle}").json()["store_slug"] == handle
+
+    def test_single_flight_shares_one_call(self):
+        """Test concurrent runs for one key execute the computation once"""
+        from app.services.storefront_cache import SingleFlight
+
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return "result"
+
+        async def main():
+            flight = SingleFlight()
+            results = await asyncio.gather(*[flight.run("key", compute) for _ in range(10)])
+            other = await flight.run("other", compute)
+            return results, other
+
+        results, other = asyncio.run(main())
+        assert results == ["result"] * 10
+        assert other == "result"
+        assert len(calls) == 2
+
+    def test_single_flight_schedule_deduplicates(self):
+        """Test only one background refresh per key runs at a time"""
+        from app.services.storefront_cache import SingleFlight
+
+        async def main():
+            flight = SingleFlight()
+            started = [flight.schedule("key", lambda: time.sleep(0.05)) for _ in range(3)]
+            await asyncio.sleep(0.1)
+            return started, flight.in_flight()
+
+        started, in_flight = asyncio.run(main())
+        assert started == [True, False, False]
+        assert in_flight == 0
+
+    def test_stale_storefront_served_then_refreshed(self, client, vendor):
+        """Test an expired storefront is served immediately and refreshed in the background"""
+        from app.core.database import SessionLocal
+        from app.models.user import User
+
+        url = f"/api/store/{vendor['username']}"
+        assert client.get(url).json()["vendor_name"] != "Renamed Quietly"
+
+        # Change the store behind the cache's back and expire the entry
+        db = SessionLocal()
+        db.query(User).filter(User.id == vendor["id"]).update({"store_name": "Renamed Quietly"})
+        db.commit()
+        db.close()
+        cache = get_storefront_cache()
+        for key, (vendor_id, store_identifier, value, _) in list(cache._entries.items()):
+            if vendor_id == vendor["id"]:
+                cache._entries[key] = (vendor_id, store_identifier, value, time.monotonic() - 1)
+
+        # The snapshot still holds the old name, so clear it to observe the refresh
+        from app.models.storefront_snapshot import StorefrontSnapshot
+        db = SessionLocal()
+        db.query(StorefrontSnapshot).filter(StorefrontSnapshot.user_id == vendor["id"]).delete()
+        db.commit()
+        db.close()
+
+        assert client.get(url).json()["vendor_name"] != "Renamed Quietly"
+
+        deadline = time.monotonic() + 2
+        while time.monotonic() < deadline:
+            entry = cache.get_entry(f"{vendor['username']}?limit=50&cursor=")
+            if entry and entry[1]:
+                break
+            time.sleep(0.02)
+        assert client.get(url).json()["vendor_name"] == "Renamed Quietly"
+
+
+class TestStorefrontFields:
+    """Test cases for sparse fieldsets on the storefront"""
+
+    def test_fields_projection(self, client, vendor):
+        """Test only requested product fields are returned"""
+        create_product(client, vendor, name="Sparse", description="Long text " * 50)
+
+        response = client.get(f"/api/store/{vendor['username']}", params={"fields": "name,price"})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["products"] == [{"name": "Sparse", "price": 5000.0}]
+        assert body["vendor_name"]
+
+    def test_fields_pagination(self, client, vendor):
+        """Test cursors work without the id field being requested"""
+        for i in range(3):
+            create_product(client, vendor, name=f"Sparse {i}")
+
+        first = client.get(f"/api/store/{vendor['username']}", params={"fields": "name", "limit": 2}).json()
+        second = client.get(
+            f"/api/store/{vendor['username']}",
+            params={"fields": "name", "limit": 2, "cursor": first["next_cursor"]}
+        ).json()
+        names = [p["name"] for p in first["products"] + second["products"]]
+        assert sorted(names) == ["Sparse 0", "Sparse 1", "Sparse 2"]
+
+    def test_unknown_or_private_fields_rejected(self, client, vendor):
+        """Test non-public fields cannot be requested on the storefront"""
+        for fields in ("name,click_count", "user_id", ","):
+            response = client.get(f"/api/store/{vendor['username']}", params={"fields": fields})
+            assert response.status_code == 400
+
+
+class TestStorefrontNdjson:
+    """Test cases for NDJSON streaming of storefront catalogs"""
+
+    NDJSON = {"Accept": "application/x-ndjson"}
+
+    def test_streams_whole_catalog(self, client, vendor):
+        """Test every available product is streamed, one per line, ignoring limit"""
+        for i in range(5):
+            create_product(client, vendor, name=f"Streamed {i}", price=100 + i)
+        create_product(client, vendor, name="Hidden", is_available=False)
+
+        response = client.get(
+            f"/api/store/{vendor['username']}",
+            params={"limit": 2, "sort": "price_asc"},
+            headers=self.NDJSON
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [p["name"] for p in lines] == [f"Streamed {i}" for i in range(5)]
+        assert set(lines[0]) == {"id", "name", "price", "image_urls", "image_variants", "description", "is_available"}
+
+    def test_streams_fields_and_filters(self, client, vendor):
+        """Test fields and price filters apply to the stream"""
+        for price in (100, 200, 300):
+            create_product(client, vendor, name=f"P{price}", price=price)
+
+        response = client.get(
+            f"/api/store/{vendor['username']}",
+            params={"fields": "name", "min_price": 150},
+            headers=self.NDJSON
+        )
+        lines = sorted(response.text.splitlines())
+        assert lines == ['{"name":"P200"}', '{"name":"P300"}']
+
+    def test_unknown_store(self, client):
+        """Test streaming an unknown store is a 404"""
+        response = client.get("/api/store/no-such-store-ndjson", headers=self.NDJSON)
+        assert response.status_code == 404
+
+    def test_output_is_chunked(self):
+        """Test lines are grouped into bounded chunks"""
+        from app.services import streaming
+
+        items = lambda db: ({"n": i} for i in range(1000))
+        with patch.object(streaming, "STREAM_CHUNK_BYTES", 100):
+            chunks = list(streaming.stream_ndjson(MagicMock, items))
+
+        assert len(chunks) > 10
+        assert all(len(chunk) < 200 for chunk in chunks)
+        assert b"".join(chunks).count(b"\n") == 1000